@@ -0,0 +1,243 @@
+"""
+Retención de logs: archivo en frío de SystemLog por mes.
+
+Los logs de meses completos anteriores a SYSTEM_LOG_RETENTION_DAYS se
+escriben en ``systemlog-AAAA-MM.jsonl.gz`` (un JSON por línea, en orden
+descendente) dentro de SYSTEM_LOG_ARCHIVE_DIR y luego se eliminan de la tabla
+por lotes. Cada registro guarda además el RUN, nombre y rol del usuario, para
+que el archivo siga siendo legible aunque el usuario se elimine.
+
+El archivado es idempotente: si el archivo del mes ya existe (logs que
+llegaron tarde o una ejecución interrumpida antes del borrado), solo se
+agregan los ids que no estaban, como un nuevo miembro gzip al final.
+
+La vista de logs busca en un mes archivado descomprimiendo el archivo
+línea a línea, sin cargarlo completo en memoria.
+"""
+import gzip
+import json
+import os
+import re
+import shutil
+from collections import deque
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.paginacion import PaginaCursor
+from core.purge import eliminar_por_pks
+from users.models import CustomUser
+from .models import SystemLog
+
+# Valor por defecto si no está definido en settings
+SYSTEM_LOG_RETENTION_DAYS = 365
+
+NOMBRE_ARCHIVO = 'systemlog-{anio:04d}-{mes:02d}.jsonl.gz'
+PATRON_ARCHIVO = re.compile(r'^systemlog-(\d{4})-(\d{2})\.jsonl\.gz$')
+
+CAMPOS = (
+    'id', 'timestamp', 'tipo', 'accion', 'descripcion', 'ip_address', 'metadata', 'usuario_id',
+    'usuario__run', 'usuario__first_name', 'usuario__last_name', 'usuario__role',
+)
+
+
+def directorio_archivo():
+    return getattr(settings, 'SYSTEM_LOG_ARCHIVE_DIR', None) or os.path.join(settings.BASE_DIR, 'logs', 'archivo')
+
+
+def ruta_mes(anio, mes):
+    return os.path.join(directorio_archivo(), NOMBRE_ARCHIVO.format(anio=anio, mes=mes))
+
+
+def meses_archivados():
+    """Meses con archivo, del más reciente al más antiguo: [(anio, mes), ...]"""
+    try:
+        nombres = os.listdir(directorio_archivo())
+    except FileNotFoundError:
+        return []
+    meses = [tuple(map(int, m.groups())) for m in map(PATRON_ARCHIVO.match, nombres) if m]
+    return sorted(meses, reverse=True)
+
+
+def _inicio_mes(anio, mes):
+    return timezone.make_aware(datetime(anio, mes, 1))
+
+
+def _mes_siguiente(anio, mes):
+    return (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+
+
+def limite_retencion(dias=None, ahora=None):
+    """
+    Inicio del mes que contiene ``ahora - dias``: se archivan solo los meses
+    completos anteriores, para que cada mes se archive una sola vez.
+    """
+    if dias is None:
+        dias = getattr(settings, 'SYSTEM_LOG_RETENTION_DAYS', SYSTEM_LOG_RETENTION_DAYS)
+    fecha = timezone.localtime(ahora or timezone.now()) - timedelta(days=dias)
+    return _inicio_mes(fecha.year, fecha.month)
+
+
+def meses_por_archivar(limite):
+    """Meses (anio, mes) con logs anteriores a ``limite``, del más antiguo al más reciente."""
+    meses = []
+    desde = None
+    while True:
+        # Se salta directo al mes del siguiente log: los meses vacíos no cuestan consultas
+        logs = SystemLog.objects.filter(timestamp__lt=limite)
+        if desde:
+            logs = logs.filter(timestamp__gte=desde)
+        siguiente = logs.order_by('timestamp').values_list('timestamp', flat=True).first()
+        if siguiente is None:
+            return meses
+        local = timezone.localtime(siguiente)
+        meses.append((local.year, local.month))
+        desde = _inicio_mes(*_mes_siguiente(local.year, local.month))
+
+
+def leer_mes(anio, mes):
+    """Registros archivados del mes (dicts), descomprimidos en streaming."""
+    with gzip.open(ruta_mes(anio, mes), 'rt', encoding='utf-8') as f:
+        for linea in f:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+def _fsync(ruta):
+    with open(ruta, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def archivar_mes(anio, mes, batch_size=None, progreso=None):
+    """
+    Archiva los logs del mes y los elimina de la tabla.
+
+    Los logs solo se borran después de que el archivo quedó escrito en disco.
+
+    Returns:
+        tuple: (archivados, eliminados)
+    """
+    desde = _inicio_mes(anio, mes)
+    hasta = _inicio_mes(*_mes_siguiente(anio, mes))
+    logs = SystemLog.objects.filter(timestamp__gte=desde, timestamp__lt=hasta)
+
+    ruta = ruta_mes(anio, mes)
+    existe = os.path.exists(ruta)
+    ya_archivados = {registro['id'] for registro in leer_mes(anio, mes)} if existe else set()
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+    parcial = f'{ruta}.parcial'
+    archivados = 0
+    leidos = []
+    with gzip.open(parcial, 'wt', encoding='utf-8') as f:
+        filas = logs.order_by('-timestamp', '-id').values(*CAMPOS).iterator(chunk_size=2000)
+        for fila in filas:
+            leidos.append(fila['id'])
+            if fila['id'] in ya_archivados:
+                continue
+            f.write(json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+            archivados += 1
+
+    if not archivados:
+        os.remove(parcial)
+    elif existe:
+        # Un archivo gzip puede tener varios miembros concatenados
+        with open(parcial, 'rb') as origen, open(ruta, 'ab') as destino:
+            shutil.copyfileobj(origen, destino)
+            destino.flush()
+            os.fsync(destino.fileno())
+        os.remove(parcial)
+    else:
+        _fsync(parcial)
+        os.replace(parcial, ruta)
+
+    # Solo lo leído: un log que llegue durante el archivado queda para la próxima vez
+    eliminados = eliminar_por_pks(SystemLog, leidos, batch_size, progreso=progreso, using=logs.db)
+    return archivados, eliminados
+
+
+# ---------------------------------------------------------------------------
+# Búsqueda en el archivo
+# ---------------------------------------------------------------------------
+
+def _coincide(registro, role, tipo, q):
+    if tipo and registro['tipo'] != tipo:
+        return False
+    if role and registro['usuario__role'] != role:
+        return False
+    if q:
+        texto = ' '.join(filter(None, (
+            registro['accion'], registro['descripcion'],
+            registro['usuario__first_name'], registro['usuario__last_name'],
+        )))
+        return q in texto.lower()
+    return True
+
+
+def _a_log(registro):
+    """SystemLog sin guardar, con su usuario, para mostrarlo con la misma plantilla."""
+    log = SystemLog(
+        id=registro['id'],
+        timestamp=parse_datetime(registro['timestamp']),
+        tipo=registro['tipo'],
+        accion=registro['accion'],
+        descripcion=registro['descripcion'],
+        ip_address=registro['ip_address'],
+        metadata=registro['metadata'] or {},
+    )
+    if registro['usuario_id'] is not None:
+        log.usuario = CustomUser(
+            id=registro['usuario_id'],
+            run=registro['usuario__run'] or '',
+            first_name=registro['usuario__first_name'] or '',
+            last_name=registro['usuario__last_name'] or '',
+            role=registro['usuario__role'] or '',
+        )
+    return log
+
+
+def buscar_en_archivo(anio, mes, params):
+    """Logs archivados del mes que cumplen los filtros role, tipo y q."""
+    role = params.get('role')
+    tipo = params.get('tipo')
+    q = (params.get('q') or '').strip().lower()
+    for registro in leer_mes(anio, mes):
+        if _coincide(registro, role, tipo, q):
+            yield registro
+
+
+def pagina_archivo(anio, mes, params, por_pagina, despues=None, antes=None, ultima=False):
+    """
+    Página de un mes archivado. Los cursores son la posición entre los
+    resultados filtrados, ya que el archivo solo se puede recorrer en orden.
+
+    Raises:
+        ValueError: Si el cursor no es un número
+    """
+    resultados = buscar_en_archivo(anio, mes, params)
+    if ultima:
+        total = 0
+        cola = deque(maxlen=por_pagina)
+        for registro in resultados:
+            cola.append(registro)
+            total += 1
+        inicio, filas, hay_mas = total - len(cola), list(cola), False
+    else:
+        if antes is not None and antes != '':
+            inicio = max(int(antes) - por_pagina, 0)
+        else:
+            inicio = int(despues or 0)
+        filas = list(islice(resultados, inicio, inicio + por_pagina + 1))
+        hay_mas = len(filas) > por_pagina
+        filas = filas[:por_pagina]
+
+    pagina = PaginaCursor([_a_log(r) for r in filas], es_primera=inicio == 0, es_ultima=not hay_mas)
+    if not pagina.es_ultima:
+        pagina.siguiente = str(inicio + len(filas))
+    if not pagina.es_primera:
+        pagina.anterior = str(inicio)
+    return pagina
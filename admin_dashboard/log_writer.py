@@ -0,0 +1,212 @@
+"""
+Escritura diferida de los logs de auditoría (SystemLog).
+
+``registrar_log`` ya no inserta dentro del request: el log se agrega a un
+buffer en memoria del proceso y un hilo lo escribe con ``bulk_create`` cuando
+se acumulan AUDIT_LOG_BUFFER_SIZE entradas, cada AUDIT_LOG_FLUSH_SECONDS y al
+terminar el worker (atexit).
+
+Si la base de datos no está disponible, el lote se agrega como JSON Lines a
+AUDIT_LOG_FALLBACK_FILE y se reintenta después del siguiente lote que se
+escriba correctamente.
+
+Los logs registrados dentro de una transacción (``transaction.atomic``) se
+siguen guardando en el momento, para que se confirmen o reviertan junto con
+ella. Con AUDIT_LOG_BUFFER_SIZE = 0 se desactiva el buffer.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connection
+from django.utils.dateparse import parse_datetime
+
+from .models import SystemLog
+
+logger = logging.getLogger(__name__)
+
+# Valores por defecto si no están definidos en settings
+AUDIT_LOG_BUFFER_SIZE = 50
+AUDIT_LOG_FLUSH_SECONDS = 2.0
+
+CAMPOS = ('usuario_id', 'tipo', 'accion', 'descripcion', 'ip_address', 'metadata')
+
+
+def _a_dict(log):
+    datos = {campo: getattr(log, campo) for campo in CAMPOS}
+    datos['timestamp'] = log.timestamp
+    return datos
+
+
+def _desde_dict(datos, usuarios_existentes):
+    log = SystemLog(**{campo: datos.get(campo) for campo in CAMPOS})
+    log.timestamp = parse_datetime(datos['timestamp'])
+    log.metadata = log.metadata or {}
+    # El usuario pudo eliminarse mientras el log esperaba en el respaldo
+    if log.usuario_id not in usuarios_existentes:
+        log.usuario_id = None
+    return log
+
+
+class EscritorLogs:
+    """Buffer de SystemLog por proceso, vaciado por un hilo en segundo plano."""
+
+    def __init__(self, tamano=None, intervalo=None, respaldo=None):
+        self._tamano = tamano
+        self._intervalo = intervalo
+        self._respaldo = respaldo
+        self._lock = threading.Lock()
+        self._lock_respaldo = threading.Lock()
+        self._pendientes = []
+        self._despertar = threading.Event()
+        self._pid = None
+
+    @property
+    def tamano(self):
+        if self._tamano is not None:
+            return self._tamano
+        return getattr(settings, 'AUDIT_LOG_BUFFER_SIZE', AUDIT_LOG_BUFFER_SIZE)
+
+    @property
+    def intervalo(self):
+        if self._intervalo is not None:
+            return self._intervalo
+        return getattr(settings, 'AUDIT_LOG_FLUSH_SECONDS', AUDIT_LOG_FLUSH_SECONDS)
+
+    @property
+    def respaldo(self):
+        if self._respaldo is not None:
+            return self._respaldo
+        return getattr(settings, 'AUDIT_LOG_FALLBACK_FILE', None) or os.path.join(
+            settings.BASE_DIR, 'logs', 'auditoria_pendiente.jsonl'
+        )
+
+    def registrar(self, log):
+        """
+        Encola un SystemLog sin guardar.
+
+        Returns:
+            SystemLog: El mismo objeto; sin ``pk`` hasta que se vacíe el buffer
+        """
+        if self.tamano <= 0 or connection.in_atomic_block:
+            log.save()
+            return log
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._iniciar_en_proceso()
+            self._pendientes.append(log)
+            lleno = len(self._pendientes) >= self.tamano
+        if lleno:
+            self._despertar.set()
+        return log
+
+    def _iniciar_en_proceso(self):
+        # Tras un fork (gunicorn --preload) el hilo del padre no existe en el
+        # hijo, y lo que estaba en el buffer ya lo escribe el padre.
+        self._pid = os.getpid()
+        self._pendientes = []
+        threading.Thread(target=self._bucle, name='escritor-logs', daemon=True).start()
+
+    def _bucle(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            try:
+                self.vaciar()
+            except Exception:
+                logger.exception('Error inesperado al escribir logs de auditoría')
+            finally:
+                # El hilo no pasa por el ciclo request/response de Django
+                connection.close()
+
+    def vaciar(self):
+        """
+        Escribe el buffer con bulk_create; si falla, lo guarda en el respaldo.
+
+        Returns:
+            int: Logs escritos en la base de datos
+        """
+        with self._lock:
+            lote, self._pendientes = self._pendientes, []
+        if not lote:
+            return 0
+
+        try:
+            SystemLog.objects.bulk_create(lote, batch_size=500)
+        except DatabaseError:
+            logger.exception(f'No se pudieron guardar {len(lote)} logs de auditoría; se respaldan en disco')
+            self._respaldar(lote)
+            return 0
+        return len(lote) + self.recuperar_respaldo()
+
+    def _respaldar(self, lote):
+        lineas = ''.join(json.dumps(_a_dict(log), cls=DjangoJSONEncoder) + '\n' for log in lote)
+        ruta = self.respaldo
+        try:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            with self._lock_respaldo, open(ruta, 'a', encoding='utf-8') as f:
+                f.write(lineas)
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            # Último recurso: que al menos queden en el log de la aplicación
+            logger.exception(f'No se pudo escribir el respaldo {ruta}; logs perdidos:\n{lineas}')
+
+    def recuperar_respaldo(self):
+        """
+        Reintenta guardar los logs respaldados en disco.
+
+        Returns:
+            int: Logs recuperados
+        """
+        ruta = self.respaldo
+        if not os.path.exists(ruta):
+            return 0
+
+        # Se renombra primero para que otro worker no procese el mismo archivo
+        procesando = f'{ruta}.{os.getpid()}'
+        try:
+            with self._lock_respaldo:
+                os.replace(ruta, procesando)
+        except FileNotFoundError:
+            return 0
+
+        datos = []
+        with open(procesando, encoding='utf-8') as f:
+            for numero, linea in enumerate(f, start=1):
+                if not linea.strip():
+                    continue
+                try:
+                    datos.append(json.loads(linea))
+                except ValueError:
+                    logger.warning(f'Línea {numero} inválida en el respaldo de logs: {linea[:200]}')
+
+        try:
+            ids = {d.get('usuario_id') for d in datos} - {None}
+            usuarios = set(
+                SystemLog._meta.get_field('usuario').related_model.objects
+                .filter(pk__in=ids).values_list('pk', flat=True)
+            )
+            logs = [_desde_dict(d, usuarios) for d in datos]
+            SystemLog.objects.bulk_create(logs, batch_size=500)
+        except DatabaseError:
+            logger.exception('No se pudo recuperar el respaldo de logs; se reintentará')
+            with self._lock_respaldo, open(procesando, encoding='utf-8') as origen, \
+                    open(ruta, 'a', encoding='utf-8') as destino:
+                destino.write(origen.read())
+            os.remove(procesando)
+            return 0
+
+        os.remove(procesando)
+        logger.info(f'Recuperados {len(logs)} logs de auditoría desde {ruta}')
+        return len(logs)
+
+
+escritor = EscritorLogs()
+# Lo que quede en el buffer se escribe al detener el worker
+atexit.register(escritor.vaciar)
@@ -0,0 +1,63 @@
+"""
+Archiva los logs del sistema más antiguos que el período de retención.
+Ejecutar con: python manage.py archivar_logs [--dias 365] [--simular]
+
+Cada mes completo anterior al límite se comprime en un archivo JSON Lines
+(gzip) en SYSTEM_LOG_ARCHIVE_DIR y luego se elimina de la tabla por lotes.
+Los meses archivados se siguen pudiendo consultar desde la vista de logs.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_dashboard.archivo import (
+    SYSTEM_LOG_RETENTION_DAYS, archivar_mes, limite_retencion, meses_por_archivar, ruta_mes,
+)
+from admin_dashboard.utils import registrar_log
+
+
+class Command(BaseCommand):
+    help = 'Mueve los logs antiguos a archivos mensuales comprimidos y los elimina de la tabla'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=getattr(settings, 'SYSTEM_LOG_RETENTION_DAYS', SYSTEM_LOG_RETENTION_DAYS),
+            help='Días de logs que se mantienen en la tabla (por defecto SYSTEM_LOG_RETENTION_DAYS)',
+        )
+        parser.add_argument('--batch-size', type=int, help='Filas por lote de borrado')
+        parser.add_argument('--simular', action='store_true', help='Solo informar qué meses se archivarían')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 1:
+            raise CommandError('--dias debe ser mayor que 0')
+
+        limite = limite_retencion(options['dias'])
+        meses = meses_por_archivar(limite)
+        if not meses:
+            self.stdout.write(self.style.SUCCESS(f'✅ No hay logs anteriores a {limite:%d/%m/%Y}'))
+            return
+
+        total_archivados = total_eliminados = 0
+        for anio, mes in meses:
+            if options['simular']:
+                self.stdout.write(f'   {mes:02d}/{anio} → {ruta_mes(anio, mes)}')
+                continue
+            archivados, eliminados = archivar_mes(anio, mes, options['batch_size'])
+            total_archivados += archivados
+            total_eliminados += eliminados
+            self.stdout.write(f'📦 {mes:02d}/{anio}: {archivados} archivados, {eliminados} eliminados')
+
+        if options['simular']:
+            return
+
+        registrar_log(
+            usuario=None,
+            tipo='SYSTEM',
+            accion='Archivo de logs',
+            descripcion=f'{total_archivados} logs anteriores a {limite:%d/%m/%Y} archivados en {len(meses)} meses',
+            metadata={'meses': [f'{anio}-{mes:02d}' for anio, mes in meses], 'eliminados': total_eliminados},
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {total_archivados} logs archivados y {total_eliminados} eliminados de la tabla'
+        ))
@@ -0,0 +1,44 @@
+"""
+Genera un respaldo ante desastres (base de datos + archivos media) en disco.
+Ejecutar con: python manage.py respaldar_sistema [--incremental] [--salida DIR]
+
+Pensado para programarse cada noche con --incremental: el ZIP trae la base de
+datos completa y solo los archivos media nuevos o modificados desde el
+respaldo anterior guardado en el mismo directorio (cada directorio de salida
+lleva su propia cadena). Para restaurar se suben el último completo y todos
+los incrementales posteriores.
+"""
+from django.core.management.base import BaseCommand
+
+from admin_dashboard.respaldo import respaldar_en_directorio, INCREMENTAL
+from admin_dashboard.utils import registrar_log
+
+
+class Command(BaseCommand):
+    help = 'Genera un respaldo completo o incremental del sistema en SYSTEM_BACKUP_DIR'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Incluir solo los archivos media nuevos o modificados desde el último respaldo',
+        )
+        parser.add_argument('--salida', help='Directorio destino (por defecto SYSTEM_BACKUP_DIR)')
+
+    def handle(self, *args, **options):
+        ruta, resumen = respaldar_en_directorio(options['salida'], options['incremental'])
+
+        if options['incremental'] and resumen['tipo'] != INCREMENTAL:
+            self.stdout.write(self.style.WARNING('⚠️ No había un respaldo anterior: se generó uno completo'))
+
+        registrar_log(
+            usuario=None,
+            tipo='SYSTEM',
+            accion='Respaldo programado',
+            descripcion=f"Respaldo {resumen['tipo']} generado en {ruta}",
+            metadata=resumen,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Respaldo {resumen['tipo']}: {resumen['objetos']} registros, {resumen['archivos']} archivos "
+            f"({resumen['eliminados']} eliminados), {resumen['tamano'] / (1024 * 1024):.1f} MB "
+            f"en {resumen['segundos']} s → {ruta}"
+        ))
@@ -0,0 +1,45 @@
+"""
+Índices trigram para la búsqueda de texto en los logs (solo PostgreSQL).
+
+``accion__icontains`` se traduce en PostgreSQL a
+``UPPER("accion"::text) LIKE UPPER('%...%')``; un índice GIN con
+``gin_trgm_ops`` sobre esa misma expresión permite resolverlo sin recorrer
+la tabla. Se crean con CONCURRENTLY para no bloquear las escrituras de logs
+mientras se construyen. En otros motores la migración no hace nada.
+"""
+from django.db import migrations
+
+CAMPOS = ('accion', 'descripcion')
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    tabla = apps.get_model('admin_dashboard', 'SystemLog')._meta.db_table
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for campo in CAMPOS:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS systemlog_{campo}_trgm '
+            f'ON {tabla} USING gin (UPPER({campo}::text) gin_trgm_ops)'
+        )
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for campo in CAMPOS:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS systemlog_{campo}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('admin_dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
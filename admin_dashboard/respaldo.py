@@ -0,0 +1,549 @@
+"""
+Respaldo ante desastres: base de datos y archivos media en un ZIP.
+
+El respaldo se genera como tarea en segundo plano (core.jobs) directamente
+en disco, sin mantenerlo en memoria:
+
+- Cada tabla se serializa con un iterador por lotes a su propio archivo
+  temporal y luego se copia por bloques a ``database.json`` dentro del ZIP
+  (un único arreglo JSON, el mismo formato de ``dumpdata``).
+- Las claves foráneas hacia modelos con clave natural (usuarios, grupos,
+  permisos) se cargan con select_related/prefetch_related, en vez de una
+  consulta por objeto.
+- Los archivos de MEDIA_ROOT se agregan leyéndolos por bloques; los formatos
+  ya comprimidos (PDF, imágenes, Office) se guardan con ZIP_STORED.
+
+Respaldos incrementales: cada respaldo guarda en el ZIP un manifiesto con
+(ruta, tamaño, mtime, sha256) de todos los archivos media. Un respaldo
+incremental trae la base de datos completa pero solo los archivos nuevos o
+modificados desde el respaldo base y la lista de eliminados. Para restaurar
+se aplican el completo y luego cada incremental en orden (``ordenar_cadena``).
+
+La cadena vive junto a los ZIP: cada directorio de respaldos (SYSTEM_BACKUP_DIR
+o el ``--salida`` de respaldar_sistema) tiene su ``manifiesto_media.json`` con
+el último respaldo guardado ahí, y ``respaldar_en_directorio`` lo avanza con
+un bloqueo de archivo para que dos respaldos simultáneos no partan del mismo
+manifiesto. Los respaldos descargados desde el panel quedan solo en el
+directorio temporal de la tarea: usan la cadena de SYSTEM_BACKUP_DIR como
+base, pero no la avanzan.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+import zipfile
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from core.jobs import archivo_resultado, artifact_path
+
+logger = logging.getLogger(__name__)
+
+# Mismas exclusiones que el respaldo original con dumpdata, más el estado efímero de las tareas
+EXCLUIDOS = ('contenttypes', 'auth.permission', 'admin.logentry', 'sessions.session', 'asistencia', 'core.tarea')
+
+TAMANO_LOTE = 2000
+TAMANO_BLOQUE = 1024 * 1024
+
+# Formatos que ya vienen comprimidos: deflate no reduce su tamaño y solo gasta CPU
+EXTENSIONES_COMPRIMIDAS = {
+    '.pdf', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.zip', '.gz', '.7z', '.rar',
+    '.xlsx', '.xls', '.docx', '.pptx', '.odt', '.ods', '.mp4', '.mp3',
+}
+
+NOMBRE_BASE_DATOS = 'database.json'
+NOMBRE_MANIFIESTO = 'respaldo.json'
+PREFIJO_MEDIA = 'media'
+
+COMPLETO = 'completo'
+INCREMENTAL = 'incremental'
+
+
+def modelos_respaldo():
+    """Modelos a respaldar, en orden de dependencias (como dumpdata con claves naturales)."""
+    excluidos = set()
+    apps_excluidas = set()
+    for etiqueta in EXCLUIDOS:
+        if '.' in etiqueta:
+            excluidos.add(apps.get_model(etiqueta))
+        else:
+            apps_excluidas.add(etiqueta)
+
+    app_list = {
+        config: None for config in apps.get_app_configs()
+        if config.models_module is not None and config.label not in apps_excluidas
+    }
+    return [
+        modelo for modelo in serializers.sort_dependencies(app_list.items(), allow_cycles=True)
+        if modelo not in excluidos and not modelo._meta.proxy
+    ]
+
+
+def _claves_naturales(modelo):
+    """Claves foráneas de ``modelo`` que se serializan con la clave natural del destino."""
+    return [
+        campo.name for campo in modelo._meta.concrete_fields
+        if campo.is_relation and hasattr(campo.related_model, 'natural_key')
+    ]
+
+
+def queryset_respaldo(modelo):
+    """
+    Queryset de la tabla con las relaciones que necesita el serializador.
+
+    Sin esto, cada clave natural (p. ej. ``usuario.natural_key()``) y cada
+    relación muchos a muchos (grupos y permisos de cada usuario) cuesta una
+    consulta por objeto.
+    """
+    queryset = modelo._default_manager.order_by(modelo._meta.pk.name)
+    relacionados = _claves_naturales(modelo)
+    if relacionados:
+        queryset = queryset.select_related(*relacionados)
+    for campo in modelo._meta.many_to_many:
+        if not campo.remote_field.through._meta.auto_created:
+            continue
+        destino = campo.related_model
+        queryset = queryset.prefetch_related(Prefetch(
+            campo.name, queryset=destino._default_manager.select_related(*_claves_naturales(destino)),
+        ))
+    return queryset
+
+
+def _volcar_tabla(modelo, ruta):
+    """
+    Serializa la tabla en ``ruta`` como arreglo JSON.
+
+    Returns:
+        int: Objetos escritos
+    """
+    contador = 0
+
+    def objetos():
+        nonlocal contador
+        for objeto in queryset_respaldo(modelo).iterator(chunk_size=TAMANO_LOTE):
+            contador += 1
+            yield objeto
+
+    with open(ruta, 'w', encoding='utf-8') as f:
+        serializers.serialize(
+            'json', objetos(), stream=f,
+            use_natural_foreign_keys=True, use_natural_primary_keys=True,
+        )
+    return contador
+
+
+def _copiar_contenido(ruta, destino):
+    """Copia el arreglo JSON de ``ruta`` a ``destino`` sin los corchetes exteriores."""
+    restante = os.path.getsize(ruta) - 2
+    with open(ruta, 'rb') as f:
+        f.seek(1)
+        while restante > 0:
+            bloque = f.read(min(TAMANO_BLOQUE, restante))
+            destino.write(bloque)
+            restante -= len(bloque)
+
+
+def escribir_base_datos(zf, progreso=None):
+    """
+    Agrega ``database.json`` al ZIP tabla por tabla.
+
+    Args:
+        zf: ZipFile abierto para escritura
+        progreso: Callable opcional ``(indice, total, modelo, objetos)``
+
+    Returns:
+        int: Objetos respaldados
+    """
+    modelos = modelos_respaldo()
+    total = 0
+    with tempfile.TemporaryDirectory(prefix='respaldo-') as directorio, \
+            zf.open(NOMBRE_BASE_DATOS, 'w', force_zip64=True) as destino:
+        destino.write(b'[')
+        primero = True
+        for indice, modelo in enumerate(modelos, start=1):
+            ruta = os.path.join(directorio, f'{modelo._meta.label_lower}.json')
+            objetos = _volcar_tabla(modelo, ruta)
+            if objetos:
+                if not primero:
+                    destino.write(b', ')
+                _copiar_contenido(ruta, destino)
+                primero = False
+            os.remove(ruta)
+            total += objetos
+            if progreso:
+                progreso(indice, len(modelos), modelo, objetos)
+        destino.write(b']')
+    return total
+
+
+def directorio_respaldos():
+    return getattr(settings, 'SYSTEM_BACKUP_DIR', None) or os.path.join(settings.BASE_DIR, 'logs', 'respaldos')
+
+
+def ruta_manifiesto(directorio=None):
+    """Manifiesto del último respaldo guardado en ``directorio``: base de sus incrementales."""
+    return os.path.join(directorio or directorio_respaldos(), 'manifiesto_media.json')
+
+
+def cargar_manifiesto(directorio=None):
+    try:
+        with open(ruta_manifiesto(directorio), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def guardar_manifiesto(manifiesto, directorio=None):
+    ruta = ruta_manifiesto(directorio)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    parcial = f'{ruta}.parcial'
+    with open(parcial, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f)
+    os.replace(parcial, ruta)
+
+
+@contextmanager
+def bloqueo_cadena(directorio=None):
+    """
+    Bloqueo exclusivo de la cadena de ``directorio``.
+
+    Un segundo respaldo hacia el mismo directorio (otro worker o un comando en
+    paralelo) espera a que termine el primero y parte de su manifiesto.
+    """
+    ruta = f'{ruta_manifiesto(directorio)}.lock'
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _copiar(origen, destino):
+    """Copia por bloques y retorna el sha256 del contenido."""
+    digest = hashlib.sha256()
+    for bloque in iter(lambda: origen.read(TAMANO_BLOQUE), b''):
+        digest.update(bloque)
+        if destino is not None:
+            destino.write(bloque)
+    return digest.hexdigest()
+
+
+def _sha256(ruta):
+    with open(ruta, 'rb') as f:
+        return _copiar(f, None)
+
+
+def archivos_media(raiz=None):
+    """Archivos bajo MEDIA_ROOT: [(ruta relativa con '/', ruta absoluta, tamaño, mtime)]."""
+    raiz = raiz or settings.MEDIA_ROOT
+    archivos = []
+    if not os.path.isdir(raiz):
+        return archivos
+    for directorio, _subdirectorios, nombres in os.walk(raiz):
+        for nombre in nombres:
+            ruta = os.path.join(directorio, nombre)
+            estado = os.stat(ruta)
+            relativa = os.path.relpath(ruta, raiz).replace(os.sep, '/')
+            archivos.append((relativa, ruta, estado.st_size, estado.st_mtime))
+    archivos.sort()
+    return archivos
+
+
+def planificar_media(archivos, anterior=None):
+    """
+    Decide qué archivos van en el respaldo.
+
+    Sin ``anterior`` van todos. Con el manifiesto del respaldo anterior solo
+    van los nuevos y los modificados: un archivo con el mismo tamaño y mtime
+    se da por igual sin leerlo, y uno con el mismo tamaño pero otro mtime se
+    compara por sha256.
+
+    Returns:
+        tuple: (archivos a incluir, estado {ruta: [tamaño, mtime, sha256]},
+        rutas eliminadas desde el respaldo anterior). El sha256 de los
+        archivos a incluir queda en None y se calcula al copiarlos.
+    """
+    previos = anterior['archivos'] if anterior else {}
+    incluir = []
+    estado = {}
+    for relativa, ruta, tamano, mtime in archivos:
+        previo = previos.get(relativa)
+        if previo and previo[0] == tamano and (previo[1] == mtime or _sha256(ruta) == previo[2]):
+            estado[relativa] = [tamano, mtime, previo[2]]
+            continue
+        incluir.append((relativa, ruta, tamano, mtime))
+        estado[relativa] = [tamano, mtime, None]
+    eliminados = sorted(set(previos) - set(estado))
+    return incluir, estado, eliminados
+
+
+def compresion(nombre):
+    """ZIP_STORED para formatos ya comprimidos, ZIP_DEFLATED para el resto."""
+    if os.path.splitext(nombre)[1].lower() in EXTENSIONES_COMPRIMIDAS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def escribir_media(zf, archivos, progreso=None):
+    """
+    Agrega los archivos al ZIP bajo ``media/``, leyéndolos por bloques.
+
+    Args:
+        archivos: Lista de ``archivos_media``
+        progreso: Callable opcional ``(bytes_procesados, bytes_totales)``
+
+    Returns:
+        dict: sha256 de cada archivo copiado, por ruta relativa
+    """
+    total = sum(archivo[2] for archivo in archivos)
+    procesados = 0
+    hashes = {}
+    for relativa, ruta, tamano, _mtime in archivos:
+        info = zipfile.ZipInfo.from_file(ruta, f'{PREFIJO_MEDIA}/{relativa}')
+        info.compress_type = compresion(relativa)
+        with open(ruta, 'rb') as origen, zf.open(info, 'w', force_zip64=True) as destino:
+            hashes[relativa] = _copiar(origen, destino)
+        procesados += tamano
+        if progreso:
+            progreso(procesados, total)
+    return hashes
+
+
+def _mb(valor):
+    return valor / (1024 * 1024)
+
+
+def crear_respaldo(ruta, base=None, progreso=None):
+    """
+    Escribe en ``ruta`` un ZIP con la base de datos completa y los archivos media.
+
+    Con ``base`` (el manifiesto de un respaldo anterior) el respaldo es
+    incremental e incluye solo los archivos nuevos o modificados desde ese
+    respaldo; sin ella es completo. Cada ZIP lleva su manifiesto en
+    ``respaldo.json``, con su id y el id del respaldo en que se basa, para
+    restaurar la cadena en orden. Esta función no avanza ninguna cadena (ver
+    ``respaldar_en_directorio``).
+
+    Args:
+        progreso: Callable opcional ``(actual, total, mensaje)``
+
+    Returns:
+        dict: tipo, id, base, objetos, archivos, eliminados, bytes, tamano,
+        segundos y mb_por_segundo
+    """
+    return _escribir_respaldo(ruta, base, progreso)[0]
+
+
+def _escribir_respaldo(ruta, anterior, progreso):
+    progreso = progreso or (lambda actual, total, mensaje: None)
+    inicio = time.perf_counter()
+    tipo = INCREMENTAL if anterior else COMPLETO
+
+    archivos, estado, eliminados = planificar_media(archivos_media(), anterior)
+
+    def progreso_tabla(indice, total, modelo, objetos):
+        progreso(indice, total, f'Base de datos: {modelo._meta.label} ({objetos} registros)')
+
+    with zipfile.ZipFile(ruta, 'w', zipfile.ZIP_DEFLATED) as zf:
+        progreso(0, None, 'Respaldando base de datos...')
+        objetos = escribir_base_datos(zf, progreso_tabla)
+
+        inicio_media = time.perf_counter()
+
+        def progreso_media(procesados, total):
+            velocidad = _mb(procesados) / max(time.perf_counter() - inicio_media, 1e-6)
+            progreso(
+                procesados, total,
+                f'Archivos: {_mb(procesados):.1f} de {_mb(total):.1f} MB ({velocidad:.1f} MB/s)',
+            )
+
+        for relativa, sha256 in escribir_media(zf, archivos, progreso_media).items():
+            estado[relativa][2] = sha256
+        duracion_media = time.perf_counter() - inicio_media
+
+        manifiesto = {
+            'id': uuid.uuid4().hex,
+            'tipo': tipo,
+            'base': anterior['id'] if anterior else None,
+            'fecha': timezone.now().isoformat(),
+            'archivos': estado,
+            'eliminados': eliminados,
+        }
+        zf.writestr(NOMBRE_MANIFIESTO, json.dumps(manifiesto))
+
+    leidos = sum(archivo[2] for archivo in archivos)
+    resultado = {
+        'tipo': tipo,
+        'id': manifiesto['id'],
+        'base': manifiesto['base'],
+        'objetos': objetos,
+        'archivos': len(archivos),
+        'eliminados': len(eliminados),
+        'bytes': leidos,
+        'tamano': os.path.getsize(ruta),
+        'segundos': round(time.perf_counter() - inicio, 1),
+        'mb_por_segundo': round(_mb(leidos) / duracion_media, 1) if duracion_media else None,
+    }
+    logger.info(
+        f"Respaldo {tipo} del sistema: {objetos} objetos, {len(archivos)} archivos ({_mb(leidos):.1f} MB), "
+        f"ZIP de {_mb(resultado['tamano']):.1f} MB en {resultado['segundos']} s"
+    )
+    return resultado, manifiesto
+
+
+def nombre_respaldo(tipo, respaldo_id=''):
+    sufijo = '_incremental' if tipo == INCREMENTAL else ''
+    if respaldo_id:
+        sufijo = f'_{respaldo_id[:8]}{sufijo}'
+    return f"sgpal_disaster_recovery_{timezone.localtime():%Y%m%d_%H%M%S}{sufijo}.zip"
+
+
+def respaldar_en_directorio(directorio=None, incremental=False, progreso=None):
+    """
+    Genera un respaldo guardado en ``directorio`` y lo deja como base de la cadena.
+
+    Un incremental parte del último respaldo guardado en ese mismo directorio
+    (si no hay uno, se genera un completo). El manifiesto se actualiza recién
+    cuando el ZIP ya tiene su nombre definitivo, y todo ocurre bajo
+    ``bloqueo_cadena``.
+
+    Returns:
+        tuple: (ruta del ZIP, resumen de ``crear_respaldo``)
+    """
+    directorio = directorio or directorio_respaldos()
+    os.makedirs(directorio, exist_ok=True)
+    with bloqueo_cadena(directorio):
+        base = cargar_manifiesto(directorio) if incremental else None
+        descriptor, parcial = tempfile.mkstemp(prefix='respaldo_en_curso_', suffix='.zip.parcial', dir=directorio)
+        os.close(descriptor)
+        try:
+            resumen, manifiesto = _escribir_respaldo(parcial, base, progreso)
+            ruta = os.path.join(directorio, nombre_respaldo(resumen['tipo'], resumen['id']))
+            os.replace(parcial, ruta)
+        except BaseException:
+            if os.path.exists(parcial):
+                os.remove(parcial)
+            raise
+        guardar_manifiesto(manifiesto, directorio)
+    return ruta, resumen
+
+
+def generar_respaldo(reporter, incremental=False):
+    """
+    Tarea: genera el ZIP de respaldo en el archivo resultado de la tarea.
+
+    Publica el avance por tabla y por archivo, con la velocidad en MB/s. El
+    ZIP vive solo en el directorio temporal de la tarea, así que un
+    incremental parte del último respaldo de SYSTEM_BACKUP_DIR pero no pasa a
+    ser la base de los siguientes.
+
+    Returns:
+        dict: Resultado de archivo de la tarea más el resumen de ``crear_respaldo``
+    """
+    base = cargar_manifiesto() if incremental else None
+    resumen = crear_respaldo(artifact_path(reporter.job_id), base, reporter.progress)
+    resultado = archivo_resultado(reporter.job_id, nombre_respaldo(resumen['tipo']), 'application/zip')
+    resultado.update(resumen)
+    reporter.update(mensaje=f"Respaldo listo: {_mb(resultado['tamano']):.1f} MB en {resultado['segundos']} s")
+    return resultado
+
+
+# ---------------------------------------------------------------------------
+# Restauración de archivos media
+# ---------------------------------------------------------------------------
+
+def leer_manifiesto(zf):
+    """Manifiesto del ZIP, o None si es un respaldo anterior a los manifiestos (completo)."""
+    try:
+        return json.loads(zf.read(NOMBRE_MANIFIESTO))
+    except KeyError:
+        return None
+
+
+def ordenar_cadena(respaldos):
+    """
+    Ordena un respaldo completo y sus incrementales en el orden de aplicación.
+
+    Args:
+        respaldos: Lista de (ruta, manifiesto)
+
+    Raises:
+        ValueError: Si no hay exactamente un completo o la cadena está incompleta
+    """
+    completos = [r for r in respaldos if r[1] is None or r[1]['tipo'] == COMPLETO]
+    if len(completos) != 1:
+        raise ValueError('Debe incluir exactamente un respaldo completo y, opcionalmente, sus incrementales.')
+    incrementales = {r[1]['base']: r for r in respaldos if r not in completos}
+    if len(incrementales) != len(respaldos) - 1:
+        raise ValueError('Hay dos respaldos incrementales generados a partir del mismo respaldo.')
+
+    cadena = completos
+    while incrementales:
+        actual = cadena[-1][1]
+        siguiente = incrementales.pop(actual['id'], None) if actual else None
+        if siguiente is None:
+            raise ValueError(
+                'Faltan respaldos incrementales intermedios: la cadena debe partir del completo sin saltos.'
+            )
+        cadena.append(siguiente)
+    return cadena
+
+
+def restaurar_media(zf, manifiesto, raiz=None):
+    """
+    Aplica los archivos media del ZIP sobre MEDIA_ROOT.
+
+    Los archivos eliminados desde el respaldo base se borran, y cada archivo
+    extraído se verifica contra el sha256 del manifiesto antes de reemplazar
+    el existente.
+
+    Returns:
+        int: Archivos restaurados
+
+    Raises:
+        ValueError: Si un archivo no coincide con el manifiesto o su ruta
+        sale de MEDIA_ROOT
+    """
+    raiz = os.path.realpath(raiz or settings.MEDIA_ROOT)
+    estado = manifiesto['archivos'] if manifiesto else {}
+
+    def destino_de(relativa):
+        destino = os.path.realpath(os.path.join(raiz, relativa))
+        if not destino.startswith(raiz + os.sep):
+            raise ValueError(f'Ruta inválida en el respaldo: {relativa}')
+        return destino
+
+    for relativa in (manifiesto or {}).get('eliminados', []):
+        try:
+            os.remove(destino_de(relativa))
+        except FileNotFoundError:
+            pass
+
+    restaurados = 0
+    for info in zf.infolist():
+        if info.is_dir() or not info.filename.startswith(f'{PREFIJO_MEDIA}/'):
+            continue
+        relativa = info.filename[len(PREFIJO_MEDIA) + 1:]
+        destino = destino_de(relativa)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        parcial = f'{destino}.parcial'
+        with zf.open(info) as origen, open(parcial, 'wb') as f:
+            sha256 = _copiar(origen, f)
+        esperado = estado.get(relativa)
+        if esperado and esperado[2] and esperado[2] != sha256:
+            os.remove(parcial)
+            raise ValueError(f'El archivo {relativa} no coincide con el manifiesto del respaldo')
+        os.replace(parcial, destino)
+        restaurados += 1
+    return restaurados
@@ -0,0 +1,421 @@
+"""
+Restauración del respaldo ante desastres sin cargarlo completo en memoria.
+
+``database.json`` se lee directamente desde el ZIP y se decodifica objeto por
+objeto (``leer_objetos``); los objetos se filtran al vuelo y se insertan por
+lotes, tabla por tabla, en el orden en que vienen en el archivo, que es el
+orden de dependencias de ``modelos_respaldo``.
+
+Las inserciones usan la misma ruta que ``loaddata`` (``raw=True``): no se
+ejecutan ``save()`` ni señales, y los campos ``auto_now`` conservan la fecha
+del respaldo. Las claves naturales (usuarios por correo, grupos, permisos) se
+resuelven con un mapa por modelo cargado con una sola consulta, en vez de un
+``get_by_natural_key`` por referencia.
+"""
+import codecs
+import json
+import logging
+import shutil
+import time
+import zipfile
+from collections import defaultdict
+from datetime import date
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+
+from core.cache import bump_data_version, LICENCIAS, PERMISOS, USUARIOS
+from licencias.models import LicenciaMedica
+from .respaldo import (
+    NOMBRE_BASE_DATOS, TAMANO_BLOQUE, TAMANO_LOTE, _claves_naturales, leer_manifiesto, modelos_respaldo,
+    restaurar_media,
+)
+from .utils import registrar_log
+
+logger = logging.getLogger(__name__)
+
+# Tablas que la restauración no vacía (la de usuarios se limpia aparte, sin el admin actual)
+TABLAS_CONSERVADAS = (
+    'django_migrations', 'django_content_type', 'auth_permission',
+    'django_session', 'axes_accessattempt', 'axes_accesslog',
+    # Estado de las tareas, incluida la propia restauración en curso
+    'core_tarea',
+    'users_customuser', 'users_customuser_groups', 'users_customuser_user_permissions',
+)
+
+
+def leer_objetos(archivo, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Objetos de un arreglo JSON, uno a uno, leyendo ``archivo`` (binario) por bloques.
+
+    Raises:
+        ValueError: Si el contenido no es un arreglo JSON válido
+    """
+    texto = codecs.getincrementaldecoder('utf-8')()
+    decodificador = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    fin = False
+
+    def leer():
+        nonlocal buffer, pos, fin
+        bloque = archivo.read(tamano_bloque)
+        fin = not bloque
+        buffer = buffer[pos:] + texto.decode(bloque, final=fin)
+        pos = 0
+
+    def siguiente_caracter():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or fin:
+                return buffer[pos:pos + 1]
+            leer()
+
+    leer()
+    if siguiente_caracter() != '[':
+        raise ValueError('database.json no contiene un arreglo JSON')
+    pos += 1
+    if siguiente_caracter() == ']':
+        return
+
+    while True:
+        siguiente_caracter()
+        while True:
+            try:
+                objeto, pos = decodificador.raw_decode(buffer, pos)
+                break
+            except json.JSONDecodeError:
+                # El objeto quedó cortado al final del bloque
+                if fin:
+                    raise ValueError('database.json está incompleto o dañado')
+                leer()
+        yield objeto
+
+        separador = siguiente_caracter()
+        pos += 1
+        if separador == ']':
+            return
+        if separador != ',':
+            raise ValueError('database.json está incompleto o dañado')
+
+
+def filtrar_objetos(objetos, admin):
+    """
+    Descarta la asistencia y al administrador que restaura (por id, correo,
+    RUN o nombre de usuario), que se conserva tal como está. Completa la
+    fecha de término de licencias de respaldos anteriores a ese campo.
+    """
+    protegidos = {
+        'email': (admin.email or '').strip().lower(),
+        'run': (getattr(admin, 'run', '') or '').strip().lower(),
+        'username': (admin.username or '').strip().lower(),
+    }
+    for objeto in objetos:
+        etiqueta = str(objeto.get('model', '')).lower()
+        if etiqueta.startswith('asistencia.'):
+            continue
+        if etiqueta == 'users.customuser':
+            campos = objeto.get('fields', {})
+            if objeto.get('pk') == admin.pk or any(
+                valor and str(campos.get(campo) or '').strip().lower() == valor
+                for campo, valor in protegidos.items()
+            ):
+                continue
+        if etiqueta == 'licencias.licenciamedica':
+            campos = objeto.get('fields', {})
+            if not campos.get('fecha_termino') and campos.get('fecha_inicio') and campos.get('dias') is not None:
+                campos['fecha_termino'] = LicenciaMedica.calcular_fecha_termino(
+                    date.fromisoformat(campos['fecha_inicio']), campos['dias'],
+                ).isoformat()
+        yield objeto
+
+
+class CargadorRespaldo:
+    """
+    Inserta objetos serializados por lotes, un modelo a la vez.
+
+    Args:
+        progreso: Callable opcional ``(indice del modelo, total de modelos, mensaje)``
+    """
+
+    def __init__(self, using='default', progreso=None, tamano_lote=TAMANO_LOTE):
+        self.using = using
+        self.conexion = connections[using]
+        self.progreso = progreso or (lambda actual, total, mensaje: None)
+        self.tamano_lote = tamano_lote
+        self.orden = {modelo: i for i, modelo in enumerate(modelos_respaldo(), start=1)}
+        self.conteos = {}
+        self._naturales = {}
+        self._modelo = None
+        self._lote = []
+        self._pendientes = []
+
+    # -- Claves naturales ---------------------------------------------------
+
+    def _mapa_natural(self, modelo):
+        if modelo not in self._naturales:
+            objetos = modelo._default_manager.db_manager(self.using).select_related(*_claves_naturales(modelo))
+            self._naturales[modelo] = {tuple(o.natural_key()): o.pk for o in objetos.iterator(chunk_size=TAMANO_LOTE)}
+        return self._naturales[modelo]
+
+    def _resolver(self, campo, valor):
+        """Valor de la clave foránea; None si es una referencia hacia adelante a la misma tabla."""
+        modelo = campo.related_model
+        if valor is None:
+            return None
+        if not (isinstance(valor, list) and hasattr(modelo._default_manager, 'get_by_natural_key')):
+            return campo.target_field.to_python(valor)
+
+        clave = tuple(valor)
+        pk = self._mapa_natural(modelo).get(clave)
+        if pk is None and modelo is self._modelo:
+            # Puede estar en el lote en curso o más adelante en la misma tabla
+            self._insertar_lote()
+            pk = self._mapa_natural(modelo).get(clave)
+            if pk is None:
+                return None
+        if pk is None:
+            raise ValueError(f'No existe {modelo._meta.label} con clave natural {valor}')
+        return pk
+
+    # -- Construcción e inserción -------------------------------------------
+
+    def _construir(self, modelo, objeto):
+        datos = {}
+        m2m = {}
+        diferidos = {}
+        if 'pk' in objeto:
+            datos[modelo._meta.pk.attname] = modelo._meta.pk.to_python(objeto['pk'])
+        for nombre, valor in objeto['fields'].items():
+            campo = modelo._meta.get_field(nombre)
+            if campo.many_to_many:
+                m2m[campo] = [self._resolver(campo, v) for v in valor]
+                if None in m2m[campo]:
+                    raise ValueError(f'Referencia no resuelta en {modelo._meta.label}.{nombre}: {valor}')
+            elif campo.is_relation:
+                datos[campo.attname] = self._resolver(campo, valor)
+                if datos[campo.attname] is None and valor is not None:
+                    diferidos[campo] = valor
+            else:
+                datos[campo.attname] = campo.to_python(valor)
+        return modelo(**datos), m2m, diferidos
+
+    def agregar(self, objeto):
+        modelo = self._modelo_de(objeto)
+        if modelo is not self._modelo:
+            self._terminar_modelo()
+            self._modelo = modelo
+            self.conteos.setdefault(modelo._meta.label, 0)
+        instancia, m2m, diferidos = self._construir(modelo, objeto)
+        self._lote.append((instancia, m2m))
+        if diferidos:
+            self._pendientes.append((instancia, diferidos))
+        if len(self._lote) >= self.tamano_lote:
+            self._insertar_lote()
+
+    def _modelo_de(self, objeto):
+        try:
+            return apps.get_model(objeto['model'])
+        except (LookupError, KeyError, TypeError, ValueError):
+            raise ValueError(f"Modelo desconocido en el respaldo: {objeto.get('model')!r}")
+
+    def _insertar_lote(self):
+        if not self._lote:
+            return
+        modelo = self._modelo
+        lote, self._lote = self._lote, []
+        instancias = [instancia for instancia, _m2m in lote]
+        naturales = hasattr(modelo, 'natural_key') and hasattr(modelo._default_manager, 'get_by_natural_key')
+
+        nuevas = []
+        for instancia in instancias:
+            if instancia.pk is None and naturales:
+                clave = tuple(instancia.natural_key())
+                existente = None if None in clave else self._mapa_natural(modelo).get(clave)
+                if existente is not None:
+                    # Ya existe (como loaddata): se actualiza en vez de duplicarla
+                    instancia.pk = existente
+                    instancia.save_base(raw=True, using=self.using)
+                    continue
+            nuevas.append(instancia)
+        self._insertar(modelo, nuevas)
+
+        if naturales:
+            mapa = self._mapa_natural(modelo)
+            for instancia in instancias:
+                mapa[tuple(instancia.natural_key())] = instancia.pk
+
+        for campo in {campo for _instancia, m2m in lote for campo in m2m}:
+            through = campo.remote_field.through
+            origen = through._meta.get_field(campo.m2m_field_name()).attname
+            destino = through._meta.get_field(campo.m2m_reverse_field_name()).attname
+            through._base_manager.using(self.using).bulk_create(
+                [
+                    through(**{origen: instancia.pk, destino: pk})
+                    for instancia, m2m in lote for pk in m2m.get(campo, ())
+                ],
+                batch_size=self.tamano_lote,
+            )
+
+        self.conteos[modelo._meta.label] += len(lote)
+        self.progreso(
+            self.orden.get(modelo, 0), len(self.orden),
+            f'Restaurando {modelo._meta.label}: {self.conteos[modelo._meta.label]} registros',
+        )
+
+    def _insertar(self, modelo, instancias):
+        """INSERT por lotes con ``raw=True``, igual que save_base en loaddata."""
+        if not instancias:
+            return
+        meta = modelo._meta
+        queryset = modelo._base_manager.using(self.using)
+        operaciones = self.conexion.ops
+        campos = [f for f in meta.local_concrete_fields if not f.generated]
+
+        con_pk = [i for i in instancias if i.pk is not None]
+        sin_pk = [i for i in instancias if i.pk is None]
+        if con_pk:
+            lote = max(operaciones.bulk_batch_size(campos, con_pk), 1)
+            for inicio in range(0, len(con_pk), lote):
+                queryset._insert(con_pk[inicio:inicio + lote], fields=campos, raw=True)
+        if sin_pk:
+            campos = [f for f in campos if f is not meta.auto_field]
+            retorno = meta.db_returning_fields
+            lote = max(operaciones.bulk_batch_size(campos, sin_pk), 1)
+            if not self.conexion.features.can_return_rows_from_bulk_insert:
+                lote = 1
+            for inicio in range(0, len(sin_pk), lote):
+                parte = sin_pk[inicio:inicio + lote]
+                filas = queryset._insert(parte, fields=campos, returning_fields=retorno, raw=True)
+                for instancia, fila in zip(parte, filas):
+                    for campo, valor in zip(retorno, fila):
+                        setattr(instancia, campo.attname, valor)
+        for instancia in instancias:
+            instancia._state.adding = False
+            instancia._state.db = self.using
+
+    def _terminar_modelo(self):
+        self._insertar_lote()
+        # Referencias hacia adelante dentro de la misma tabla (p. ej. blocked_by)
+        por_campo = defaultdict(list)
+        for instancia, diferidos in self._pendientes:
+            for campo, valor in diferidos.items():
+                pk = self._mapa_natural(campo.related_model).get(tuple(valor))
+                if pk is None:
+                    raise ValueError(f'No existe {campo.related_model._meta.label} con clave natural {valor}')
+                setattr(instancia, campo.attname, pk)
+                por_campo[campo.name].append(instancia)
+        for nombre, instancias in por_campo.items():
+            self._modelo._base_manager.using(self.using).bulk_update(instancias, [nombre], batch_size=self.tamano_lote)
+        self._pendientes = []
+
+    def terminar(self):
+        """
+        Inserta lo pendiente y ajusta las secuencias de las tablas cargadas.
+
+        Returns:
+            dict: Registros restaurados por modelo
+        """
+        self._terminar_modelo()
+        modelos = [modelo for modelo in self.orden if modelo._meta.label in self.conteos]
+        with self.conexion.cursor() as cursor:
+            for sql in self.conexion.ops.sequence_reset_sql(no_style(), modelos):
+                cursor.execute(sql)
+        return self.conteos
+
+
+def cargar_objetos(objetos, using='default', progreso=None):
+    """
+    Inserta los objetos (dicts en formato de dumpdata) con CargadorRespaldo.
+
+    Returns:
+        dict: Registros restaurados por modelo
+    """
+    cargador = CargadorRespaldo(using, progreso)
+    for objeto in objetos:
+        cargador.agregar(objeto)
+    return cargador.terminar()
+
+
+def _vaciar_tablas(admin):
+    """Vacía las tablas de la aplicación y los usuarios, salvo al admin que restaura."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tablename FROM pg_tables WHERE schemaname = 'public' AND NOT (tablename = ANY(%s))",
+                [list(TABLAS_CONSERVADAS)],
+            )
+            tablas = [fila[0] for fila in cursor.fetchall()]
+            if tablas:
+                tablas_sql = ', '.join(f'"{t}"' for t in tablas)
+                cursor.execute(f'TRUNCATE TABLE {tablas_sql} RESTART IDENTITY CASCADE;')
+    else:
+        # Otros motores (desarrollo y tests): borrado en orden inverso de dependencias
+        for modelo in reversed(modelos_respaldo()):
+            if modelo is get_user_model():
+                continue
+            for campo in modelo._meta.many_to_many:
+                if campo.remote_field.through._meta.auto_created:
+                    campo.remote_field.through._base_manager.all()._raw_delete(connection.alias)
+            modelo._base_manager.all()._raw_delete(connection.alias)
+    get_user_model().objects.exclude(pk=admin.pk).delete()
+
+
+def restaurar_respaldo(reporter, rutas, admin_id, ip_address=None, directorio=None):
+    """
+    Tarea: restaura la base de datos y los archivos media de una cadena de respaldos.
+
+    Args:
+        rutas: ZIP ya ordenados (completo y luego incrementales); la base de
+            datos se toma del último
+        admin_id: Administrador que restaura; se conserva y no se sobrescribe
+        directorio: Directorio temporal con los ZIP, que se elimina al terminar
+
+    Returns:
+        dict: Registros por modelo, archivos media y segundos
+    """
+    inicio = time.perf_counter()
+    try:
+        admin = get_user_model().objects.get(pk=admin_id)
+        if not getattr(admin, 'run', ''):
+            raise ValueError('No se pudo identificar de forma única al administrador logueado.')
+
+        reporter.progress(0, mensaje='Vaciando tablas...')
+        with transaction.atomic():
+            _vaciar_tablas(admin)
+            with zipfile.ZipFile(rutas[-1]) as zf, zf.open(NOMBRE_BASE_DATOS) as archivo:
+                conteos = cargar_objetos(filtrar_objetos(leer_objetos(archivo), admin), progreso=reporter.progress)
+        duracion_bd = time.perf_counter() - inicio
+
+        archivos = 0
+        for indice, ruta in enumerate(rutas, start=1):
+            reporter.progress(indice - 1, len(rutas), f'Restaurando archivos media ({indice} de {len(rutas)})...')
+            with zipfile.ZipFile(ruta) as zf:
+                archivos += restaurar_media(zf, leer_manifiesto(zf))
+    finally:
+        if directorio:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    for dominio in (PERMISOS, LICENCIAS, USUARIOS):
+        bump_data_version(dominio)
+
+    segundos = round(time.perf_counter() - inicio, 1)
+    total = sum(conteos.values())
+    registrar_log(
+        usuario=admin,
+        tipo='SYSTEM',
+        accion='Restauración Nacional Crítica',
+        descripcion=f'Admin restauró el sistema completo (Base de Datos + Media): {total} registros en {segundos} s',
+        ip_address=ip_address,
+        metadata={'modelos': conteos, 'archivos': archivos, 'respaldos': len(rutas), 'segundos': segundos},
+    )
+    logger.info(
+        f'Restauración del sistema: {total} registros en {duracion_bd:.1f} s, '
+        f'{archivos} archivos media, {segundos} s en total'
+    )
+    reporter.update(mensaje=f'Sistema restaurado: {total} registros y {archivos} archivos en {segundos} s')
+    return {'modelos': conteos, 'registros': total, 'archivos': archivos, 'segundos': segundos}
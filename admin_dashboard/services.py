@@ -0,0 +1,116 @@
+"""
+Resumen del panel de administración.
+
+El dashboard muestra conteos de usuarios y solicitudes y la planificación de
+permisos y licencias de esta semana y la próxima. Todo se calcula en un solo
+diccionario que se guarda en la caché por pocos segundos y bajo las versiones
+de datos de permisos, licencias y usuarios (core.cache): las señales que
+incrementan esas versiones lo dejan obsoleto apenas cambian los datos, así
+que una carga con la caché tibia no hace consultas.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from core.cache import get_or_compute, PERMISOS, LICENCIAS, USUARIOS
+from core.ocupacion import semana_habil
+from licencias.models import LicenciaMedica
+from permisos.models import SolicitudPermiso
+from users.models import CustomUser
+
+# Valor por defecto si no está definido en settings
+DASHBOARD_CACHE_SECONDS = 60
+
+DOMINIOS_DASHBOARD = (PERMISOS, LICENCIAS, USUARIOS)
+
+
+def _conteos_usuarios():
+    funcionario = Q(role='FUNCIONARIO')
+    return CustomUser.objects.aggregate(
+        total_usuarios=Count('pk'),
+        total_funcionarios=Count('pk', filter=funcionario),
+        total_directivos=Count('pk', filter=Q(role__in=['DIRECTOR', 'DIRECTIVO', 'SECRETARIA'])),
+        dias_totales_disponibles=Sum('dias_disponibles', filter=funcionario),
+        usuarios_saldo_bajo=Count('pk', filter=funcionario & Q(dias_disponibles__lt=2.0)),
+    )
+
+
+def calcular_resumen(hoy):
+    """
+    Datos del dashboard para la fecha ``hoy`` (sin caché).
+
+    Returns:
+        dict: Variables de contexto de la plantilla del dashboard
+    """
+    # Lunes y domingo de la semana actual y de la próxima
+    lunes_actual = hoy - timedelta(days=hoy.weekday())
+    domingo_actual = lunes_actual + timedelta(days=6)
+    lunes_proximo = lunes_actual + timedelta(days=7)
+    domingo_proximo = lunes_proximo + timedelta(days=6)
+
+    resumen = _conteos_usuarios()
+    resumen['dias_totales_disponibles'] = resumen['dias_totales_disponibles'] or 0
+    resumen['promedio_dias_disponibles'] = (
+        resumen['dias_totales_disponibles'] / resumen['total_funcionarios']
+        if resumen['total_funcionarios'] else 0
+    )
+    resumen.update(SolicitudPermiso.objects.aggregate(
+        solicitudes_pendientes=Count('pk', filter=Q(estado='PENDIENTE')),
+        solicitudes_aprobadas_mes=Count('pk', filter=Q(
+            estado='APROBADO', updated_at__gte=timezone.now() - timedelta(days=30),
+        )),
+    ))
+
+    # Permisos aprobados de ambas semanas en una sola consulta
+    permisos = list(SolicitudPermiso.objects.select_related('usuario').filter(
+        estado='APROBADO',
+        fecha_inicio__lte=domingo_proximo,
+        fecha_termino__gte=lunes_actual,
+    ).order_by('usuario__first_name', 'usuario__last_name'))
+    permisos_actual = [p for p in permisos if p.fecha_inicio <= domingo_actual]
+    permisos_proxima = [p for p in permisos if p.fecha_termino >= lunes_proximo]
+
+    # Licencias que se traslapan con alguna de las dos semanas
+    licencias = []
+    for lic in LicenciaMedica.objects.select_related('usuario').filter(
+        LicenciaMedica.filtro_traslape(lunes_actual, domingo_proximo)
+    ):
+        licencias.append({
+            'usuario': lic.usuario,
+            'fecha_inicio': lic.fecha_inicio,
+            'fecha_termino': lic.fecha_termino,
+            'dias': lic.dias,
+            'fecha_retorno': lic.fecha_termino + timedelta(days=1),
+        })
+    licencias.sort(key=lambda x: x['usuario'].get_full_name())
+    licencias_actual = [
+        {**l, 'es_activa': l['fecha_inicio'] <= hoy <= l['fecha_termino']}
+        for l in licencias if l['fecha_inicio'] <= domingo_actual
+    ]
+    licencias_proxima = [l for l in licencias if l['fecha_termino'] >= lunes_proximo]
+
+    # Personas fuera por día hábil: el barrido recorta cada intervalo a la semana
+    ausencias = [(p.fecha_inicio, p.fecha_termino, p.usuario.get_full_name()) for p in permisos] + [
+        (l['fecha_inicio'], l['fecha_termino'], l['usuario'].get_full_name()) for l in licencias
+    ]
+    resumen.update({
+        'permisos_semana_actual': permisos_actual,
+        'permisos_semana_proxima': permisos_proxima,
+        'licencias_semana_actual': licencias_actual,
+        'licencias_semana_proxima': licencias_proxima,
+        'daily_stats_actual': semana_habil(ausencias, lunes_actual, hoy),
+        'daily_stats_proxima': semana_habil(ausencias, lunes_proximo, hoy),
+    })
+    return resumen
+
+
+def resumen_dashboard(hoy=None):
+    """Datos del dashboard desde la caché (se recalculan si cambió algún dominio o expiró el TTL)."""
+    hoy = hoy or timezone.localdate()
+    return get_or_compute(
+        'dashboard:resumen', DOMINIOS_DASHBOARD, (hoy.isoformat(),),
+        lambda: calcular_resumen(hoy),
+        timeout=getattr(settings, 'DASHBOARD_CACHE_SECONDS', DASHBOARD_CACHE_SECONDS),
+    )
@@ -1,3 +1,336 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import date, datetime
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from licencias.models import LicenciaMedica
+from permisos.models import SolicitudPermiso
+from users.models import CustomUser
+from .archivo import leer_mes, meses_archivados
+from .log_writer import EscritorLogs
+from .models import SystemLog
+from .services import resumen_dashboard
+
+
+class EscritorLogsTest(TransactionTestCase):
+    """Tests para la escritura diferida de logs de auditoría"""
+
+    def setUp(self):
+        self.usuario = CustomUser.objects.create_user(username='auditor', run='11111111-1', password='x')
+        directorio = tempfile.mkdtemp()
+        self.respaldo = os.path.join(directorio, 'pendientes.jsonl')
+        # Intervalo largo: en los tests el buffer se vacía explícitamente
+        self.escritor = EscritorLogs(tamano=10, intervalo=3600, respaldo=self.respaldo)
+
+    def log(self, accion='Prueba'):
+        return SystemLog(usuario=self.usuario, tipo='SYSTEM', accion=accion, descripcion='-')
+
+    def test_escribe_por_lotes(self):
+        self.escritor.registrar(self.log())
+        self.escritor.registrar(self.log())
+        self.assertEqual(SystemLog.objects.count(), 0)
+        self.assertEqual(self.escritor.vaciar(), 2)
+        self.assertEqual(SystemLog.objects.count(), 2)
+        self.assertEqual(self.escritor.vaciar(), 0)
+
+    def test_dentro_de_transaccion_escribe_directo(self):
+        with transaction.atomic():
+            log = self.escritor.registrar(self.log())
+        self.assertIsNotNone(log.pk)
+
+    def test_respaldo_si_falla_la_base_de_datos(self):
+        self.escritor.registrar(self.log('Respaldado'))
+        with mock.patch.object(SystemLog.objects, 'bulk_create', side_effect=DatabaseError('caída')):
+            self.assertEqual(self.escritor.vaciar(), 0)
+        self.assertTrue(os.path.exists(self.respaldo))
+        self.assertEqual(SystemLog.objects.count(), 0)
+
+        # El usuario se elimina mientras el log espera en el respaldo
+        self.usuario.delete()
+        self.escritor.registrar(SystemLog(tipo='SYSTEM', accion='Siguiente', descripcion='-'))
+        self.assertEqual(self.escritor.vaciar(), 2)
+        self.assertFalse(os.path.exists(self.respaldo))
+        recuperado = SystemLog.objects.get(accion='Respaldado')
+        self.assertIsNone(recuperado.usuario_id)
+
+
+@override_settings(SYSTEM_LOG_ARCHIVE_DIR=tempfile.mkdtemp())
+class ArchivoLogsTest(TestCase):
+    """Tests para el archivo mensual de logs antiguos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            username='admin_logs', run='22222222-2', password='x', role='ADMIN', first_name='Ana',
+        )
+
+    def crear(self, accion, anio, mes, dia=10):
+        return SystemLog.objects.create(
+            usuario=self.admin, tipo='UPDATE', accion=accion, descripcion='Detalle',
+            timestamp=timezone.make_aware(datetime(anio, mes, dia)),
+        )
+
+    def test_archiva_por_mes_y_busca(self):
+        self.crear('Antiguo enero', 2020, 1)
+        self.crear('Antiguo febrero', 2020, 2)
+        reciente = SystemLog.objects.create(usuario=self.admin, tipo='UPDATE', accion='Reciente', descripcion='-')
+
+        call_command('archivar_logs', dias=30, stdout=io.StringIO())
+        self.assertEqual(meses_archivados()[-2:], [(2020, 2), (2020, 1)])
+        self.assertFalse(SystemLog.objects.filter(accion__startswith='Antiguo').exists())
+        self.assertTrue(SystemLog.objects.filter(pk=reciente.pk).exists())
+
+        # Un log que llega tarde a un mes ya archivado se agrega sin duplicar
+        self.crear('Tardío enero', 2020, 1, dia=20)
+        call_command('archivar_logs', dias=30, stdout=io.StringIO())
+        self.assertEqual([r['accion'] for r in leer_mes(2020, 1)], ['Antiguo enero', 'Tardío enero'])
+
+        self.client.force_login(self.admin)
+        respuesta = self.client.get(reverse('admin_dashboard:logs'), {'archivo': '2020-01', 'q': 'tardío'})
+        self.assertEqual([log.accion for log in respuesta.context['logs']], ['Tardío enero'])
+        self.assertEqual(respuesta.context['logs'].objetos[0].usuario.get_full_name(), 'Ana')
+
+
+class ExportSystemLogsTest(TestCase):
+    """Tests para la exportación de logs sin límite de filas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(username='admin_export', run='33333333-3', password='x', role='ADMIN')
+        SystemLog.objects.bulk_create(
+            SystemLog(usuario=cls.admin, tipo='UPDATE' if i % 2 else 'CREATE', accion=f'Acción {i}', descripcion='-')
+            for i in range(2500)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_csv_sin_limite_y_con_filtros(self):
+        respuesta = self.client.get(reverse('admin_dashboard:system_logs_export'), {'formato': 'csv'})
+        lineas = b''.join(respuesta.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lineas), 2501)
+        self.assertTrue(lineas[0].startswith('Fecha y Hora;'))
+
+        respuesta = self.client.get(reverse('admin_dashboard:system_logs_export'), {'formato': 'csv', 'tipo': 'CREATE'})
+        self.assertEqual(len(b''.join(respuesta.streaming_content).splitlines()), 1251)
+
+    def test_excel_reparte_en_hojas(self):
+        from openpyxl import load_workbook
+        with mock.patch('core.excel.FILAS_MAXIMAS_HOJA', 1000):
+            respuesta = self.client.get(reverse('admin_dashboard:system_logs_export'))
+        libro = load_workbook(io.BytesIO(b''.join(respuesta.streaming_content)))
+        self.assertEqual(libro.sheetnames, ['Logs de Actividad', 'Logs de Actividad 2', 'Logs de Actividad 3'])
+        self.assertEqual(sum(hoja.max_row - 1 for hoja in libro.worksheets), 2500)
+
+
+@override_settings(
+    JOBS_RUN_SYNC=True, MEDIA_ROOT=tempfile.mkdtemp(), JOB_ARTIFACTS_DIR=tempfile.mkdtemp(),
+    SYSTEM_BACKUP_DIR=tempfile.mkdtemp(),
+)
+class RespaldoSistemaTest(TestCase):
+    """Tests para el respaldo ante desastres generado en segundo plano"""
+
+    def test_genera_zip_en_disco(self):
+        from django.conf import settings
+        from core.jobs import artifact_path, get_job
+
+        admin = CustomUser.objects.create_user(username='admin_respaldo', run='44444444-4', password='x', role='ADMIN')
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, 'liquidaciones'), exist_ok=True)
+        with open(os.path.join(settings.MEDIA_ROOT, 'liquidaciones', 'enero.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.4' * 100)
+        with open(os.path.join(settings.MEDIA_ROOT, 'notas.txt'), 'w') as f:
+            f.write('texto ' * 100)
+
+        self.client.force_login(admin)
+        respuesta = self.client.get(reverse('admin_dashboard:system_backup_export'))
+        job_id = respuesta.url.rstrip('/').split('/')[-2]
+        job = get_job(job_id)
+        self.assertEqual(job['estado'], 'COMPLETADO')
+        self.assertEqual(job['resultado']['archivos'], 2)
+
+        with zipfile.ZipFile(artifact_path(job_id)) as zf:
+            datos = json.loads(zf.read('database.json'))
+            self.assertEqual(zf.getinfo('media/liquidaciones/enero.pdf').compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(zf.getinfo('media/notas.txt').compress_type, zipfile.ZIP_DEFLATED)
+        usuario = next(o for o in datos if o['model'] == 'users.customuser')
+        self.assertEqual(usuario['fields']['username'], 'admin_respaldo')
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp(), SYSTEM_BACKUP_DIR=tempfile.mkdtemp())
+    def test_incremental_y_restauracion_en_orden(self):
+        from django.conf import settings
+        from .respaldo import leer_manifiesto, ordenar_cadena, respaldar_en_directorio, restaurar_media
+
+        media = settings.MEDIA_ROOT
+        salida = tempfile.mkdtemp()
+
+        def escribir(nombre, contenido):
+            with open(os.path.join(media, nombre), 'w') as f:
+                f.write(contenido)
+
+        def respaldar():
+            return respaldar_en_directorio(salida, incremental=True)
+
+        escribir('a.txt', 'uno')
+        escribir('b.txt', 'dos')
+        completo, resumen = respaldar()
+        self.assertEqual((resumen['tipo'], resumen['archivos']), ('completo', 2))
+
+        escribir('a.txt', 'uno modificado')
+        escribir('c.txt', 'tres')
+        os.remove(os.path.join(media, 'b.txt'))
+        delta1, resumen = respaldar()
+        self.assertEqual((resumen['tipo'], resumen['archivos'], resumen['eliminados']), ('incremental', 2, 1))
+
+        # Solo cambia la fecha: se compara por sha256 y no se vuelve a copiar
+        os.utime(os.path.join(media, 'c.txt'), (1, 1))
+        delta2, resumen = respaldar()
+        self.assertEqual(resumen['archivos'], 0)
+        with zipfile.ZipFile(delta1) as zf:
+            self.assertEqual(sorted(n for n in zf.namelist() if n.startswith('media/')), ['media/a.txt', 'media/c.txt'])
+
+        respaldos = []
+        for ruta in (delta2, completo, delta1):
+            with zipfile.ZipFile(ruta) as zf:
+                respaldos.append((ruta, leer_manifiesto(zf)))
+        cadena = ordenar_cadena(respaldos)
+        self.assertEqual([ruta for ruta, _m in cadena], [completo, delta1, delta2])
+        with self.assertRaises(ValueError):
+            ordenar_cadena([r for r in respaldos if r[0] != delta1])
+
+        destino = tempfile.mkdtemp()
+        with open(os.path.join(destino, 'b.txt'), 'w') as f:
+            f.write('dos')
+        for ruta, manifiesto in cadena:
+            with zipfile.ZipFile(ruta) as zf:
+                restaurar_media(zf, manifiesto, raiz=destino)
+        self.assertEqual(sorted(os.listdir(destino)), ['a.txt', 'c.txt'])
+        with open(os.path.join(destino, 'a.txt')) as f:
+            self.assertEqual(f.read(), 'uno modificado')
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp(), SYSTEM_BACKUP_DIR=tempfile.mkdtemp())
+    def test_cadena_por_directorio(self):
+        from django.conf import settings
+        from core.jobs import get_job
+        from .respaldo import cargar_manifiesto, respaldar_en_directorio
+
+        with open(os.path.join(settings.MEDIA_ROOT, 'a.txt'), 'w') as f:
+            f.write('uno')
+        _ruta, nocturno = respaldar_en_directorio(incremental=True)
+        self.assertEqual(cargar_manifiesto()['id'], nocturno['id'])
+
+        # La descarga desde el panel parte de la cadena, pero no la avanza
+        admin = CustomUser.objects.create_user(username='admin_cadena', run='33333333-3', password='x', role='ADMIN')
+        self.client.force_login(admin)
+        respuesta = self.client.get(reverse('admin_dashboard:system_backup_export') + '?modo=incremental')
+        job = get_job(respuesta.url.rstrip('/').split('/')[-2])
+        self.assertEqual((job['resultado']['tipo'], job['resultado']['base']), ('incremental', nocturno['id']))
+        self.assertEqual(cargar_manifiesto()['id'], nocturno['id'])
+
+        # Otro directorio de salida lleva su propia cadena
+        _ruta, otro = respaldar_en_directorio(tempfile.mkdtemp(), incremental=True)
+        self.assertEqual(otro['tipo'], 'completo')
+        _ruta, siguiente = respaldar_en_directorio(incremental=True)
+        self.assertEqual(siguiente['base'], nocturno['id'])
+
+
+@override_settings(
+    JOBS_RUN_SYNC=True, MEDIA_ROOT=tempfile.mkdtemp(), SYSTEM_BACKUP_DIR=tempfile.mkdtemp(), AUDIT_LOG_BUFFER_SIZE=0,
+)
+class RestauracionSistemaTest(TestCase):
+    """Tests para la restauración por lotes del respaldo"""
+
+    def test_lee_arreglo_por_bloques(self):
+        from .restauracion import leer_objetos
+
+        objetos = [{'texto': 'ñandú, [corchetes] y "comillas"', 'n': i} for i in range(50)]
+        contenido = json.dumps(objetos, ensure_ascii=False).encode()
+        self.assertEqual(list(leer_objetos(io.BytesIO(contenido), tamano_bloque=7)), objetos)
+        self.assertEqual(list(leer_objetos(io.BytesIO(b' [ ] '))), [])
+        with self.assertRaises(ValueError):
+            list(leer_objetos(io.BytesIO(contenido[:-20])))
+
+    def test_restaura_respaldo_completo(self):
+        from users.models import GrupoCorreo
+        from .respaldo import crear_respaldo
+
+        admin = CustomUser.objects.create_user(
+            username='admin_rest', email='admin@example.com', run='55555555-5', password='x', role='ADMIN',
+        )
+        bloqueado = CustomUser.objects.create_user(username='bloqueado', email='b@example.com', run='66666666-6')
+        # Referencia hacia adelante: quien bloqueó se crea después
+        bloqueador = CustomUser.objects.create_user(username='bloqueador', email='c@example.com', run='77777777-7')
+        CustomUser.objects.filter(pk=bloqueado.pk).update(blocked_by=bloqueador, is_blocked=True)
+        grupo = GrupoCorreo.objects.create(nombre='Docentes', correo='docentes@example.com', creado_por=bloqueador)
+        grupo.miembros.add(bloqueado, bloqueador)
+        creado = timezone.make_aware(datetime(2020, 1, 1))
+        GrupoCorreo.objects.filter(pk=grupo.pk).update(fecha_creacion=creado, fecha_actualizacion=creado)
+
+        ruta = os.path.join(tempfile.mkdtemp(), 'respaldo.zip')
+        crear_respaldo(ruta)
+        GrupoCorreo.objects.all().delete()
+        CustomUser.objects.exclude(pk=admin.pk).delete()
+
+        self.client.force_login(admin)
+        with open(ruta, 'rb') as f:
+            respuesta = self.client.post(reverse('admin_dashboard:system_backup_restore'), {'backup_zip': f})
+        self.assertRedirects(respuesta, reverse('admin_dashboard:system_backup'), fetch_redirect_response=False)
+
+        self.assertEqual(CustomUser.objects.get(email='b@example.com').blocked_by.email, 'c@example.com')
+        grupo = GrupoCorreo.objects.get(nombre='Docentes')
+        self.assertEqual(grupo.creado_por.email, 'c@example.com')
+        self.assertEqual(grupo.fecha_actualizacion, creado)
+        self.assertEqual(sorted(grupo.miembros.values_list('email', flat=True)), ['b@example.com', 'c@example.com'])
+        self.assertTrue(CustomUser.objects.filter(pk=admin.pk, email='admin@example.com').exists())
+        log = SystemLog.objects.get(accion='Restauración Nacional Crítica')
+        self.assertEqual(log.metadata['modelos']['users.GrupoCorreo'], 1)
+
+
+class ResumenDashboardTest(TestCase):
+    """Tests para el resumen cacheado del dashboard de administración"""
+
+    # Miércoles: semana actual del 9 al 15 y próxima del 16 al 22 de junio
+    HOY = date(2025, 6, 11)
+
+    def setUp(self):
+        cache.clear()
+        self.funcionario = CustomUser.objects.create_user(
+            username='func_dash', run='88888888-8', password='x', role='FUNCIONARIO', dias_disponibles=1.5,
+        )
+        SolicitudPermiso.objects.create(
+            usuario=self.funcionario, fecha_inicio=date(2025, 6, 13), fecha_termino=date(2025, 6, 16),
+            dias_solicitados=2.0, estado='APROBADO',
+        )
+        # Licencia antigua que ya terminó: no debe aparecer
+        LicenciaMedica.objects.create(usuario=self.funcionario, fecha_inicio=date(2024, 1, 1), dias=10)
+
+    def test_semanas_y_conteos(self):
+        resumen = resumen_dashboard(self.HOY)
+        self.assertEqual(resumen['total_funcionarios'], 1)
+        self.assertEqual(resumen['usuarios_saldo_bajo'], 1)
+        self.assertEqual(len(resumen['permisos_semana_actual']), 1)
+        self.assertEqual(len(resumen['permisos_semana_proxima']), 1)
+        self.assertEqual(resumen['licencias_semana_actual'], [])
+        self.assertEqual([d['total'] for d in resumen['daily_stats_actual']], [0, 0, 0, 0, 1])
+        self.assertEqual([d['total'] for d in resumen['daily_stats_proxima']], [1, 0, 0, 0, 0])
+        self.assertTrue(resumen['daily_stats_actual'][2]['es_hoy'])
+
+    def test_carga_tibia_sin_consultas_y_senal_invalida(self):
+        resumen_dashboard(self.HOY)
+        with self.assertNumQueries(0):
+            resumen_dashboard(self.HOY)
+
+        LicenciaMedica.objects.create(usuario=self.funcionario, fecha_inicio=date(2025, 6, 10), dias=3)
+        resumen = resumen_dashboard(self.HOY)
+        self.assertEqual(len(resumen['licencias_semana_actual']), 1)
+        self.assertTrue(resumen['licencias_semana_actual'][0]['es_activa'])
+        self.assertEqual([d['total'] for d in resumen['daily_stats_actual']], [0, 1, 1, 1, 1])
@@ -1,14 +1,19 @@
+from .log_writer import escritor
 from .models import SystemLog
 
 def registrar_log(usuario, tipo, accion, descripcion, ip_address=None, metadata=None):
-    return SystemLog.objects.create(
+    """
+    Registra un log de auditoría. Se escribe en segundo plano (ver
+    log_writer), salvo dentro de una transacción o con el buffer desactivado.
+    """
+    return escritor.registrar(SystemLog(
         usuario=usuario,
         tipo=tipo,
         accion=accion,
         descripcion=descripcion,
         ip_address=ip_address or '127.0.0.1',
         metadata=metadata or {}
-    )
+    ))
 
 def get_client_ip(request):
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
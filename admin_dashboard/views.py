@@ -1,26 +1,25 @@
 from django.shortcuts import render, get_object_or_404, redirect  # Force reload triggering
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import TemplateView, View
-from django.db.models import Count, Q, Sum
+from django.db.models import Q
 from django.utils import timezone
 from django.contrib import messages
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.http import FileResponse, HttpResponse
-from datetime import timedelta
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
 import os
 import zipfile
 import tempfile
-import io
 import shutil
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from django.conf import settings
-from django.core.management import call_command
 
+from core.excel import dividir_en_hojas, respuesta_csv, respuesta_excel
+from core.jobs import submit_job, job_message_tags
+from core.paginacion import conteo_aproximado, paginar_por_cursor
 from users.models import CustomUser
-from permisos.models import SolicitudPermiso
-from licencias.models import LicenciaMedica
+from .archivo import buscar_en_archivo, meses_archivados, pagina_archivo
 from .models import SystemLog
+from .services import resumen_dashboard
+from .respaldo import NOMBRE_BASE_DATOS, generar_respaldo, leer_manifiesto, ordenar_cadena
+from .restauracion import restaurar_respaldo
 from .utils import registrar_log, get_client_ip
 
 
@@ -34,124 +33,7 @@ class AdminDashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        context['total_usuarios'] = CustomUser.objects.count()
-        context['total_funcionarios'] = CustomUser.objects.filter(role='FUNCIONARIO').count()
-        context['total_directivos'] = CustomUser.objects.filter(
-            role__in=['DIRECTOR', 'DIRECTIVO', 'SECRETARIA']
-        ).count()
-        
-        context['solicitudes_pendientes'] = SolicitudPermiso.objects.filter(
-            estado='PENDIENTE'
-        ).count()
-        context['solicitudes_aprobadas_mes'] = SolicitudPermiso.objects.filter(
-            estado='APROBADO',
-            updated_at__gte=timezone.now() - timedelta(days=30)
-        ).count()
-        
-        # Licencias activas: cálculo eficiente (compatible con todas las DB)
-        # --- Lógica de Planificación Semanal y Diaria ---
-        hoy = timezone.now().date()
-        # Lunes de la semana actual
-        lunes_actual = hoy - timedelta(days=hoy.weekday())
-        domingo_actual = lunes_actual + timedelta(days=6)
-        # Próxima semana
-        lunes_proximo = lunes_actual + timedelta(days=7)
-        domingo_proximo = lunes_proximo + timedelta(days=6)
-
-        # 1. Permisos Semana Actual
-        permisos_actual = SolicitudPermiso.objects.select_related('usuario').filter(
-            estado='APROBADO',
-            fecha_inicio__lte=domingo_actual,
-            fecha_termino__gte=lunes_actual
-        ).order_by('usuario__first_name', 'usuario__last_name')
-        context['permisos_semana_actual'] = permisos_actual
-
-        # 2. Permisos Semana Próxima
-        permisos_proxima = SolicitudPermiso.objects.select_related('usuario').filter(
-            estado='APROBADO',
-            fecha_inicio__lte=domingo_proximo,
-            fecha_termino__gte=lunes_proximo
-        ).order_by('usuario__first_name', 'usuario__last_name')
-        context['permisos_semana_proxima'] = permisos_proxima
-
-        # 3. Licencias Semana Actual
-        licencias_actual_raw = LicenciaMedica.objects.select_related('usuario').filter(
-            fecha_inicio__lte=domingo_actual
-        )
-        licencias_semana_actual = []
-        for lic in licencias_actual_raw:
-            fecha_retorno = lic.fecha_inicio + timedelta(days=lic.dias)
-            if fecha_retorno >= lunes_actual:
-                licencias_semana_actual.append({
-                    'usuario': lic.usuario,
-                    'fecha_inicio': lic.fecha_inicio,
-                    'dias': lic.dias,
-                    'fecha_retorno': fecha_retorno,
-                    'es_activa': lic.fecha_inicio <= hoy <= fecha_retorno
-                })
-        context['licencias_semana_actual'] = sorted(licencias_semana_actual, key=lambda x: x['usuario'].get_full_name())
-
-        # 4. Licencias Semana Próxima
-        licencias_proxima_raw = LicenciaMedica.objects.select_related('usuario').filter(
-            fecha_inicio__lte=domingo_proximo
-        )
-        licencias_semana_proxima = []
-        for lic in licencias_proxima_raw:
-            fecha_retorno = lic.fecha_inicio + timedelta(days=lic.dias)
-            if fecha_retorno >= lunes_proximo:
-                licencias_semana_proxima.append({
-                    'usuario': lic.usuario,
-                    'fecha_inicio': lic.fecha_inicio,
-                    'dias': lic.dias,
-                    'fecha_retorno': fecha_retorno,
-                })
-        context['licencias_semana_proxima'] = sorted(licencias_semana_proxima, key=lambda x: x['usuario'].get_full_name())
-
-        # --- Cálculo de Impacto Diario (Conteo de Personas Fuera - Solo Diás Hábiles) ---
-        def get_diario_stats(inicio_semana, permisos_qs, licencias_list):
-            stats = []
-            dias_nombre = ['Lun', 'Mar', 'Mié', 'Jue', 'Vie']
-            for i in range(5):
-                dia = inicio_semana + timedelta(days=i)
-                # Contar permisos en este día
-                count_permisos = 0
-                for p in permisos_qs:
-                    if p.fecha_inicio <= dia <= p.fecha_termino:
-                        count_permisos += 1
-                
-                # Contar licencias en este día
-                count_licencias = 0
-                for l in licencias_list:
-                    if l['fecha_inicio'] <= dia <= l['fecha_retorno']:
-                        count_licencias += 1
-                
-                stats.append({
-                    'dia': dia,
-                    'nombre': dias_nombre[i],
-                    'total': count_permisos + count_licencias,
-                    'is_today': dia == hoy
-                })
-            return stats
-
-        context['daily_stats_actual'] = get_diario_stats(lunes_actual, permisos_actual, licencias_semana_actual)
-        context['daily_stats_proxima'] = get_diario_stats(lunes_proximo, permisos_proxima, licencias_semana_proxima)
-
-        # Metas generales
-        usuarios_stats = CustomUser.objects.filter(role='FUNCIONARIO').aggregate(
-            total_disponibles=Sum('dias_disponibles'),
-            total_usuarios=Count('id')
-        )
-        context['dias_totales_disponibles'] = usuarios_stats['total_disponibles'] or 0
-        context['promedio_dias_disponibles'] = (
-            (usuarios_stats['total_disponibles'] / usuarios_stats['total_usuarios'])
-            if usuarios_stats['total_usuarios'] > 0 else 0
-        )
-        
-        context['usuarios_saldo_bajo'] = CustomUser.objects.filter(
-            role='FUNCIONARIO',
-            dias_disponibles__lt=2.0
-        ).count()
-        
+        context.update(resumen_dashboard())
         return context
 
 
@@ -306,9 +188,42 @@ class BlockedUsersView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
         return redirect('admin_dashboard:blocked_users')
 
 
+def filtrar_logs(params):
+    """
+    Logs filtrados por rol, tipo y texto (parámetros role, tipo y q).
+
+    La búsqueda de texto usa ``icontains`` sobre acción y descripción, que en
+    PostgreSQL resuelven los índices trigram de la migración 0002. Los
+    usuarios que coinciden por nombre se buscan aparte (tabla pequeña) para
+    que la condición sobre el log sea ``usuario_id IN (...)`` y use el índice
+    por usuario en vez de un join con OR.
+    """
+    logs_queryset = SystemLog.objects.all()
+    role = params.get('role')
+    tipo = params.get('tipo')
+    q = (params.get('q') or '').strip()
+
+    if role:
+        logs_queryset = logs_queryset.filter(usuario__role=role)
+    if tipo:
+        logs_queryset = logs_queryset.filter(tipo=tipo)
+    if q:
+        usuarios = list(
+            CustomUser.objects.filter(Q(first_name__icontains=q) | Q(last_name__icontains=q))
+            .values_list('id', flat=True)
+        )
+        logs_queryset = logs_queryset.filter(
+            Q(accion__icontains=q) |
+            Q(descripcion__icontains=q) |
+            Q(usuario_id__in=usuarios)
+        )
+    return logs_queryset
+
+
 class SystemLogsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
-    """Vista avanzada de logs del sistema con filtros y paginación"""
+    """Vista avanzada de logs del sistema con filtros y paginación por cursor"""
     template_name = 'admin_dashboard/logs.html'
+    paginate_by = 30
     
     def test_func(self):
         # ADMIN, DIRECTOR, DIRECTIVO y SECRETARIA pueden ver los logs
@@ -316,125 +231,104 @@ class SystemLogsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        
-        # Filtros
-        role = self.request.GET.get('role')
-        tipo = self.request.GET.get('tipo')
-        q = self.request.GET.get('q')
-        
-        logs_queryset = SystemLog.objects.select_related('usuario').order_by('-timestamp')
-        
-        if role:
-            logs_queryset = logs_queryset.filter(usuario__role=role)
-        if tipo:
-            logs_queryset = logs_queryset.filter(tipo=tipo)
-        if q:
-            logs_queryset = logs_queryset.filter(
-                Q(accion__icontains=q) | 
-                Q(descripcion__icontains=q) | 
-                Q(usuario__first_name__icontains=q) | 
-                Q(usuario__last_name__icontains=q)
-            )
-            
-        # Paginación (30 por página)
-        page = self.request.GET.get('page', 1)
-        paginator = Paginator(logs_queryset, 30)
-        
-        try:
-            logs_paginados = paginator.page(page)
-        except PageNotAnInteger:
-            logs_paginados = paginator.page(1)
-        except EmptyPage:
-            logs_paginados = paginator.page(paginator.num_pages)
-            
-        context['logs'] = logs_paginados
+        params = self.request.GET
+        navegacion = {
+            'despues': params.get('despues'),
+            'antes': params.get('antes'),
+            'ultima': params.get('ultima') == '1',
+        }
+
+        # Meses archivados (manage.py archivar_logs) disponibles para consulta
+        archivados = [f'{anio:04d}-{mes:02d}' for anio, mes in meses_archivados()]
+        archivo = params.get('archivo') if params.get('archivo') in archivados else None
+
+        if archivo:
+            anio, mes = map(int, archivo.split('-'))
+            try:
+                logs = pagina_archivo(anio, mes, params, self.paginate_by, **navegacion)
+            except ValueError:
+                logs = pagina_archivo(anio, mes, params, self.paginate_by)
+            context['total_logs'] = None
+        else:
+            logs_queryset = filtrar_logs(params)
+            # Paginación por (timestamp, id): sin OFFSET ni COUNT(*) completo
+            consulta = logs_queryset.select_related('usuario')
+            try:
+                logs = paginar_por_cursor(consulta, self.paginate_by, **navegacion)
+            except ValueError:
+                logs = paginar_por_cursor(consulta, self.paginate_by)
+            context['total_logs'] = conteo_aproximado(logs_queryset)
+
+        filtros = {k: params[k] for k in ('role', 'tipo', 'q') if params.get(k)}
+        if archivo:
+            filtros['archivo'] = archivo
+        context['logs'] = logs
+        context['filtros_query'] = urlencode(filtros)
+        context['meses_archivados'] = archivados
+        context['current_archivo'] = archivo
         context['role_choices'] = CustomUser.ROLE_CHOICES
         context['tipo_choices'] = SystemLog.TIPO_CHOICES
-        context['current_role'] = role
-        context['current_tipo'] = tipo
-        context['current_q'] = q
+        context['current_role'] = params.get('role')
+        context['current_tipo'] = params.get('tipo')
+        context['current_q'] = params.get('q')
         
         return context
 
 
 class ExportSystemLogsView(LoginRequiredMixin, UserPassesTestMixin, View):
-    """Exporta los logs actuales a formato Excel"""
+    """
+    Exporta los logs filtrados, sin límite de filas, a Excel o CSV (?formato=csv).
+
+    Las filas se leen con ``values().iterator()`` y se escriben a medida que
+    llegan: el Excel en un libro write-only sobre archivo temporal (una hoja
+    adicional cada 1.048.575 filas) y el CSV directo en la respuesta.
+    """
+    ENCABEZADOS = ["Fecha y Hora", "Usuario", "Rol", "Tipo", "Acción", "Descripción", "IP"]
+    ANCHOS = [20, 25, 15, 15, 30, 60, 15]
+    CAMPOS = (
+        'timestamp', 'tipo', 'accion', 'descripcion', 'ip_address',
+        'usuario__first_name', 'usuario__last_name', 'usuario__role',
+    )
     
     def test_func(self):
         return self.request.user.role in ['ADMIN', 'DIRECTOR', 'DIRECTIVO', 'SECRETARIA']
-        
-    def get(self, request):
+
+    def registros(self, params):
+        """Registros filtrados como dicts con los CAMPOS, del más reciente al más antiguo."""
+        archivo = params.get('archivo')
+        if archivo and archivo in {f'{a:04d}-{m:02d}' for a, m in meses_archivados()}:
+            anio, mes = map(int, archivo.split('-'))
+            for registro in buscar_en_archivo(anio, mes, params):
+                registro['timestamp'] = parse_datetime(registro['timestamp'])
+                yield registro
+            return
         # Mismos filtros que en la vista principal
-        role = request.GET.get('role')
-        tipo = request.GET.get('tipo')
-        q = request.GET.get('q')
-        
-        logs_queryset = SystemLog.objects.select_related('usuario').order_by('-timestamp')
-        
-        if role:
-            logs_queryset = logs_queryset.filter(usuario__role=role)
-        if tipo:
-            logs_queryset = logs_queryset.filter(tipo=tipo)
-        if q:
-            logs_queryset = logs_queryset.filter(
-                Q(accion__icontains=q) | 
-                Q(descripcion__icontains=q) | 
-                Q(usuario__first_name__icontains=q) | 
-                Q(usuario__last_name__icontains=q)
-            )
-            
-        # Limitar a los últimos 2000 logs para exportación para evitar problemas de memoria
-        logs_queryset = logs_queryset[:2000]
-        
-        # Crear Workbook de Excel
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Logs de Actividad"
-        
-        # Estilos para encabezados
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="1E293B", end_color="1E293B", fill_type="solid")
-        alignment = Alignment(horizontal="center", vertical="center")
-        
-        # Encabezados
-        headers = ["Fecha y Hora", "Usuario", "Rol", "Tipo", "Acción", "Descripción", "IP"]
-        ws.append(headers)
-        
-        for cell in ws[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = alignment
-            
-        # Agregar datos
-        for log in logs_queryset:
-            fecha_local = timezone.localtime(log.timestamp).strftime("%d/%m/%Y %H:%M:%S")
-            usuario_str = log.usuario.get_full_name() if log.usuario else "Sistema"
-            rol_str = log.usuario.get_role_display() if log.usuario else "-"
-            tipo_str = log.get_tipo_display()
-            
-            ws.append([
-                fecha_local,
-                usuario_str,
-                rol_str,
-                tipo_str,
-                log.accion,
-                log.descripcion,
-                log.ip_address or "-"
-            ])
-            
-        # Ajustar anchos de columna
-        column_widths = [20, 25, 15, 15, 30, 60, 15]
-        for i, width in enumerate(column_widths, 1):
-            ws.column_dimensions[chr(64 + i)].width = width
-            
-        # Crear respuesta HTTP
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        )
-        response['Content-Disposition'] = f'attachment; filename=logs_actividad_{timezone.now().strftime("%Y%m%d_%H%M")}.xlsx'
-        
-        wb.save(response)
-        return response
+        logs = filtrar_logs(params).order_by('-timestamp', '-id').values(*self.CAMPOS)
+        yield from logs.iterator(chunk_size=2000)
+
+    def filas(self, params):
+        roles = dict(CustomUser.ROLE_CHOICES)
+        tipos = dict(SystemLog.TIPO_CHOICES)
+        for r in self.registros(params):
+            nombre = f"{r['usuario__first_name'] or ''} {r['usuario__last_name'] or ''}".strip()
+            yield [
+                timezone.localtime(r['timestamp']).strftime("%d/%m/%Y %H:%M:%S"),
+                nombre or "Sistema",
+                roles.get(r['usuario__role'], r['usuario__role'] or "-"),
+                tipos.get(r['tipo'], r['tipo']),
+                r['accion'],
+                r['descripcion'],
+                r['ip_address'] or "-",
+            ]
+
+    def get(self, request):
+        nombre = f'logs_actividad_{timezone.now().strftime("%Y%m%d_%H%M")}'
+        filas = self.filas(request.GET)
+
+        if request.GET.get('formato') == 'csv':
+            return respuesta_csv(self.ENCABEZADOS, filas, f'{nombre}.csv')
+        hojas = dividir_en_hojas("Logs de Actividad", self.ENCABEZADOS, filas, self.ANCHOS)
+        return respuesta_excel(hojas, f'{nombre}.xlsx')
 
 
 class SystemBackupView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
@@ -446,53 +340,30 @@ class SystemBackupView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
 
 
 class SystemBackupExportView(LoginRequiredMixin, UserPassesTestMixin, View):
-    """Genera y descarga en vivo el archivo ZIP (Restauración Ante Desastres)"""
+    """Genera en segundo plano el archivo ZIP (Restauración Ante Desastres)"""
     
     def test_func(self):
         return self.request.user.role == 'ADMIN'
         
     def get(self, request):
+        incremental = request.GET.get('modo') == 'incremental'
         registrar_log(
             usuario=request.user,
             tipo='SYSTEM',
             accion='Exportar Respaldo Nacional',
-            descripcion='Admin descargó una copia completa del sistema',
+            descripcion=(
+                'Admin descargó un respaldo incremental del sistema' if incremental
+                else 'Admin descargó una copia completa del sistema'
+            ),
             ip_address=get_client_ip(request)
         )
         
-        # 1. Volcar Base de Datos y excluir cosas problemáticas
-        db_out = io.StringIO()
-        call_command(
-            'dumpdata', 
-            format='json', 
-            natural_foreign=True, 
-            natural_primary=True,
-            exclude=['contenttypes', 'auth.permission', 'admin.logentry', 'sessions.session', 'asistencia'],
-            stdout=db_out
-        )
-        
-        # 2. Generar archivo comprimido ZIP
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Adjuntar Base Cruda
-            zip_file.writestr('database.json', db_out.getvalue())
-            
-            # Recopilar todo el repositorio de la carpeta "media/"
-            media_root = settings.MEDIA_ROOT
-            if os.path.exists(media_root):
-                for root, dirs, files in os.walk(media_root):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.join('media', os.path.relpath(file_path, media_root))
-                        zip_file.write(file_path, arcname)
-                        
-        zip_buffer.seek(0)
-        
-        from datetime import datetime
-        fecha_str = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        response = FileResponse(zip_buffer, as_attachment=True, filename=f'sgpal_disaster_recovery_{fecha_str}.zip')
-        return response
+        # El ZIP se escribe en disco por tabla y por archivo; la página de
+        # espera muestra el avance y lo descarga al terminar
+        job_id = submit_job('respaldo_sistema', generar_respaldo, incremental, owner=request.user)
+        return redirect('job_wait', job_id=job_id)
+
+
 class SystemBackupRestoreView(LoginRequiredMixin, UserPassesTestMixin, View):
     """Instala a la fuerza un archivo ZIP y rescata el sistema SIN borrar datos actuales primero"""
     
@@ -504,118 +375,42 @@ class SystemBackupRestoreView(LoginRequiredMixin, UserPassesTestMixin, View):
             messages.error(request, 'No se ha subido ningún archivo ZIP.')
             return redirect('admin_dashboard:system_backup')
             
-        zip_file = request.FILES['backup_zip']
-        # 🛡️ BLINDAJE QUIRÚRGICO (v5): Capturar datos del admin actual para protección total
-        current_admin = request.user
-        admin_id = current_admin.id
-        admin_run = getattr(current_admin, 'run', '')
-        admin_email = current_admin.email
-        admin_username = current_admin.username
-        
+        # 🛡️ VALIDACIÓN DE SEGURIDAD (No proceder si no detectamos al admin)
+        if not getattr(request.user, 'run', ''):
+            messages.error(request, '💥 Fallo en el despliegue del Respaldo Nacional: No se pudo identificar de forma única al administrador logueado.')
+            return redirect('admin_dashboard:system_backup')
+
+        # Los ZIP quedan en un directorio temporal que la tarea elimina al terminar
+        temp_dir = tempfile.mkdtemp(prefix='restauracion-')
         try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # 1. Extraer ZIP
-                zip_path = os.path.join(temp_dir, 'backup.zip')
+            # 1. Guardar los ZIP (un completo y, opcionalmente, sus incrementales) y ordenarlos
+            respaldos = []
+            for indice, zip_file in enumerate(request.FILES.getlist('backup_zip')):
+                zip_path = os.path.join(temp_dir, f'backup_{indice}.zip')
                 with open(zip_path, 'wb+') as f:
                     for chunk in zip_file.chunks():
                         f.write(chunk)
                 with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                    zip_ref.extractall(temp_dir)
-                    
-                json_path = os.path.join(temp_dir, 'database.json')
-                if not os.path.exists(json_path):
-                    messages.error(request, 'Archivo inválido: falta database.json')
-                    return redirect('admin_dashboard:system_backup')
-
-                from django.db import connection, transaction
-                from django.contrib.auth import get_user_model
-                import json as json_lib
-                
-                # 🛡️ VALIDACIÓN DE SEGURIDAD (No proceder si no detectamos al admin)
-                if not admin_id or not admin_run:
-                    raise Exception("No se pudo identificar de forma única al administrador logueado.")
-
-                # 2. SANEAMIENTO QUIRÚRGICO DEL JSON: Eliminar al admin y asistencia del backup
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    backup_data = json_lib.load(f)
-                
-                clean_data = []
-                for obj in backup_data:
-                    model_label = str(obj.get('model', '')).lower()
-                    
-                    # Ignorar registros de asistencia por completo
-                    if model_label.startswith('asistencia.'):
-                        continue
-                    
-                    # Ignorar al administrador actual en el backup
-                    if model_label == 'users.customuser':
-                        fields = obj.get('fields', {})
-                        bk_email = str(fields.get('email', '')).strip().lower()
-                        bk_run = str(fields.get('run', '')).strip().lower()
-                        bk_username = str(obj.get('username', '')).strip().lower()
-                        
-                        if obj.get('pk') == admin_id or \
-                           bk_email == admin_email.strip().lower() or \
-                           bk_run == admin_run.strip().lower() or \
-                           bk_username == admin_username.strip().lower():
-                            continue
-                            
-                    clean_data.append(obj)
-                
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json_lib.dump(clean_data, f)
+                    respaldos.append((zip_path, leer_manifiesto(zip_ref)))
+            respaldos = ordenar_cadena(respaldos)
 
-                # 3. RESTAURACIÓN CONTROLADA
-                with transaction.atomic():
-                    with connection.cursor() as cursor:
-                        # Truncar tablas aplicación EXCEPTO usuarios y sesiones
-                        # Esta vez INCLUIMOS asistencia para que queden vacías si el usuario no las quiere
-                        cursor.execute("""
-                            SELECT tablename FROM pg_tables 
-                            WHERE schemaname = 'public' 
-                            AND tablename NOT IN (
-                                'django_migrations', 'django_content_type', 'auth_permission', 
-                                'django_session', 'axes_accessattempt', 'axes_accesslog',
-                                'users_customuser', 'users_customuser_groups', 'users_customuser_user_permissions'
-                            )
-                        """)
-                        tables = [row[0] for row in cursor.fetchall()]
-                        if tables:
-                            tables_sql = ', '.join([f'"{t}"' for t in tables])
-                            cursor.execute(f'TRUNCATE TABLE {tables_sql} RESTART IDENTITY CASCADE;')
-                    
-                    # 4. LIMPIEZA QUIRÚRGICA DE USUARIOS: Borrar todos menos al admin actual
-                    User = get_user_model()
-                    User.objects.exclude(id=admin_id).delete()
-                    
-                    # 5. CARGA DE DATOS SANEADOS
-                    call_command('loaddata', json_path)
-                    
-                # 4. Restauración de archivos físicos (Media)
-                extracted_media = os.path.join(temp_dir, 'media')
-                if os.path.exists(extracted_media):
-                    media_root = settings.MEDIA_ROOT
-                    for root, dirs, files in os.walk(extracted_media):
-                        rel_path = os.path.relpath(root, extracted_media)
-                        dest_dir = os.path.join(media_root, rel_path) if rel_path != '.' else media_root
-                        os.makedirs(dest_dir, exist_ok=True)
-                        for file in files:
-                            src_file = os.path.join(root, file)
-                            dst_file = os.path.join(dest_dir, file)
-                            shutil.copy2(src_file, dst_file)
-                            
-            registrar_log(
-                usuario=request.user,
-                tipo='SYSTEM',
-                accion='Restauración Nacional Crítica',
-                descripcion='Admin restauró el sistema completo (Base de Datos + Media)',
-                ip_address=get_client_ip(request)
-            )
-            
-            messages.success(request, '✅ SISTEMA RECUPERADO EXITOSAMENTE. Se han restaurado todos los registros y archivos media.')
-            return redirect('admin_dashboard:dashboard')
-            
-        except Exception as e:
+            # La base de datos se restaura desde el respaldo más reciente de la cadena
+            with zipfile.ZipFile(respaldos[-1][0], 'r') as zip_ref:
+                if NOMBRE_BASE_DATOS not in zip_ref.namelist():
+                    raise ValueError('Archivo inválido: falta database.json')
+        except (ValueError, zipfile.BadZipFile) as e:
+            shutil.rmtree(temp_dir, ignore_errors=True)
             messages.error(request, f'💥 Fallo en el despliegue del Respaldo Nacional: {str(e)}')
             return redirect('admin_dashboard:system_backup')
 
+        # 2. Vaciado, carga por lotes y archivos media en segundo plano, con avance por tabla
+        job_id = submit_job(
+            'restauracion_sistema', restaurar_respaldo, [ruta for ruta, _manifiesto in respaldos], request.user.pk,
+            ip_address=get_client_ip(request), directorio=temp_dir, owner=request.user,
+        )
+        messages.info(
+            request,
+            'Se inició la restauración del sistema (Base de Datos + Media).',
+            extra_tags=job_message_tags(job_id)
+        )
+        return redirect('admin_dashboard:system_backup')
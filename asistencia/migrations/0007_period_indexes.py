@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-19 17:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asistencia', '0006_registroasistencia_fecha_justificacion_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registroasistencia',
+            index=models.Index(fields=['estado', 'fecha'], name='asistencia_estado_fecha_idx'),
+        ),
+    ]
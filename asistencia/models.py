@@ -1,7 +1,6 @@
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
-from datetime import timedelta
 from django.core.exceptions import ValidationError
 
 
@@ -202,6 +201,10 @@ class RegistroAsistencia(models.Model):
         verbose_name_plural = "Registros de Asistencia"
         ordering = ["-fecha", "funcionario__last_name"]
         unique_together = ["funcionario", "fecha"]
+        # (funcionario, fecha) ya queda indexado por unique_together
+        indexes = [
+            models.Index(fields=["estado", "fecha"], name="asistencia_estado_fecha_idx"),
+        ]
 
     def __str__(self):
         return f"{self.funcionario.get_full_name()} - {self.fecha} - {self.get_estado_display()}"
@@ -295,19 +298,11 @@ class RegistroAsistencia(models.Model):
         """Verifica si el funcionario tiene una licencia médica que cubra esta fecha"""
         try:
             from licencias.models import LicenciaMedica
-            # Verificar si hay una licencia médica que cubra esta fecha
-            licencias = LicenciaMedica.objects.filter(
+            # Licencias que cubren esta fecha, por el índice (usuario, fecha_inicio, fecha_termino)
+            return LicenciaMedica.objects.filter(
+                LicenciaMedica.filtro_traslape(self.fecha),
                 usuario=self.funcionario,
-                fecha_inicio__lte=self.fecha,
-                fecha_inicio__gte=self.fecha - timedelta(days=30)  # Considerar hasta 30 días antes
-            )
-
-            for licencia in licencias:
-                fecha_fin = licencia.fecha_inicio + timedelta(days=licencia.dias - 1)
-                if self.fecha <= fecha_fin:
-                    return True
-
-            return False
+            ).exists()
         except ImportError:
             # Si no existe el modelo de licencias, retornar False
             return False
@@ -0,0 +1,50 @@
+"""
+Servicios de negocio para el módulo de asistencia.
+"""
+
+import logging
+
+from core.purge import purgar_en_lotes, eliminar_archivos
+from .models import RegistroAsistencia, AlegacionAsistencia
+
+logger = logging.getLogger(__name__)
+
+
+def purgar_asistencia(reporter):
+    """
+    Elimina todos los registros de asistencia y sus alegaciones.
+
+    Cada lote borra primero las alegaciones asociadas (relación CASCADE que
+    el DELETE directo no resuelve) y acumula las rutas de sus evidencias,
+    que se eliminan del storage al final.
+
+    Args:
+        reporter: JobReporter de la tarea en segundo plano
+
+    Returns:
+        Dict con registros, funcionarios y archivos eliminados
+    """
+    total = RegistroAsistencia.objects.count()
+    total_funcionarios = RegistroAsistencia.objects.values('funcionario').distinct().count()
+    evidencias = []
+
+    def borrar_alegaciones(pks):
+        alegaciones = AlegacionAsistencia.objects.filter(registro_asistencia_id__in=pks)
+        evidencias.extend(alegaciones.exclude(evidencia='').exclude(evidencia__isnull=True).values_list('evidencia', flat=True))
+        alegaciones._raw_delete(alegaciones.db)
+
+    reporter.progress(0, total, 'Eliminando registros de asistencia...')
+    eliminados = purgar_en_lotes(
+        RegistroAsistencia.objects.all(),
+        antes_de_borrar=borrar_alegaciones,
+        progreso=lambda n: reporter.progress(n, total),
+    )
+
+    reporter.progress(0, len(evidencias), 'Eliminando evidencias de alegaciones...')
+    archivos = eliminar_archivos(
+        evidencias,
+        progreso=lambda n: reporter.progress(n, len(evidencias)),
+    )
+
+    logger.info(f"Purga de asistencia: {eliminados} registros de {total_funcionarios} funcionarios, {archivos} archivos")
+    return {'eliminados': eliminados, 'funcionarios': total_funcionarios, 'archivos': archivos}
@@ -135,3 +135,39 @@ class DiaFestivoTest(TestCase):
         
         self.assertTrue(DiaFestivo.es_dia_festivo(fecha))
         self.assertFalse(DiaFestivo.es_dia_festivo(fecha - timedelta(days=1)))
+
+
+class PurgaAsistenciaTest(TestCase):
+    """Tests para la purga masiva de registros de asistencia"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='purga',
+            email='purga@test.com',
+            run='11111111-1',
+            first_name='Purga',
+            last_name='User',
+            password='testpass123'
+        )
+
+    def test_purga_elimina_registros_y_alegaciones(self):
+        """Test que la purga borra alegaciones antes que los registros"""
+        from unittest import mock
+        from core import purge
+        from core.jobs import JobReporter
+        from asistencia.models import AlegacionAsistencia
+        from asistencia.services import purgar_asistencia
+
+        hoy = timezone.now().date()
+        for i in range(5):
+            registro = RegistroAsistencia.objects.create(funcionario=self.user, fecha=hoy - timedelta(days=i))
+        AlegacionAsistencia.objects.create(registro_asistencia=registro, motivo='Error de marcación')
+
+        reporter = JobReporter('test', {'nombre': 'purga_asistencia'})
+        with mock.patch.object(purge, 'PURGE_BATCH_SIZE', 2):
+            resultado = purgar_asistencia(reporter)
+
+        self.assertEqual(resultado['eliminados'], 5)
+        self.assertEqual(resultado['funcionarios'], 1)
+        self.assertFalse(RegistroAsistencia.objects.exists())
+        self.assertFalse(AlegacionAsistencia.objects.exists())
@@ -6,7 +6,6 @@ from django.contrib import messages
 from django.db import transaction
 from django.db.models import Q, Avg, Sum
 from django.http import HttpResponse
-import openpyxl
 from datetime import datetime, time, timedelta
 import zipfile
 import io
@@ -14,32 +13,27 @@ import re
 import logging
 
 # PDF generation
-from weasyprint import HTML, CSS
+from core.pdf import render_pdf
 from django.template.loader import render_to_string
 
-# Import xlrd conditionally
-try:
-    import xlrd
-    from xlrd import XLRDError
-    XLRD_AVAILABLE = True
-except ImportError:
-    XLRD_AVAILABLE = False
-    xlrd = None
-    XLRDError = Exception
-
-# Import pypdf for PDF processing (like payroll system)
-try:
-    import pypdf
-    PYPDF_AVAILABLE = True
-except ImportError:
-    PYPDF_AVAILABLE = False
-    pypdf = None
+# Lectores de planillas y PDF: se importan en el primer uso (ver core.lazy).
+# xlrd y pypdf son opcionales; se verifica que estén instalados sin importarlos.
+from core.lazy import disponible, importar_diferido
+openpyxl = importar_diferido('openpyxl')
+xlrd = importar_diferido('xlrd')
+XLRD_AVAILABLE = disponible('xlrd')
+pypdf = importar_diferido('pypdf')
+PYPDF_AVAILABLE = disponible('pypdf')
 from .models import HorarioFuncionario, RegistroAsistencia, DiaFestivo, AlegacionAsistencia
 from .forms import CargaHorariosForm, HorarioFuncionarioForm, CargaRegistrosAsistenciaForm
 from django.shortcuts import get_object_or_404, redirect
 from users.models import CustomUser
+from permisos.models import SolicitudPermiso
 from core.utils import normalize_rut
+from core.periods import filtro_periodo
 from admin_dashboard.utils import registrar_log, get_client_ip
+from core.jobs import submit_job, job_message_tags
+from .services import purgar_asistencia
 
 logger = logging.getLogger(__name__)
 
@@ -347,9 +341,8 @@ class MiAsistenciaView(LoginRequiredMixin, TemplateView):
 
         # Filtrar registros del usuario actual
         registros = RegistroAsistencia.objects.filter(
-            funcionario=self.request.user,
-            fecha__year=anio,
-            fecha__month=mes
+            filtro_periodo('fecha', anio, mes),
+            funcionario=self.request.user
         ).order_by('-fecha')
 
         # Agregar horas trabajadas a cada registro para el template
@@ -368,9 +361,8 @@ class MiAsistenciaView(LoginRequiredMixin, TemplateView):
                 mes = str(ultimo_registro.fecha.month)
                 anio = str(ultimo_registro.fecha.year)
                 registros = RegistroAsistencia.objects.filter(
-                    funcionario=self.request.user,
-                    fecha__year=anio,
-                    fecha__month=mes
+                    filtro_periodo('fecha', anio, mes),
+                    funcionario=self.request.user
                 ).order_by('-fecha')
 
         # Estadísticas del período
@@ -1039,10 +1031,7 @@ class DescargarAsistenciaView(LoginRequiredMixin, View):
 
         if usuario_id:
             queryset = queryset.filter(funcionario_id=usuario_id)
-        if anio:
-            queryset = queryset.filter(fecha__year=anio)
-        if mes:
-            queryset = queryset.filter(fecha__month=mes)
+        queryset = queryset.filter(filtro_periodo('fecha', anio, mes))
         if estado:
             queryset = queryset.filter(estado=estado)
 
@@ -1186,42 +1175,44 @@ class DetalleUsuarioAsistenciaView(LoginRequiredMixin, UserPassesTestMixin, Temp
         user_id = self.kwargs.get('user_id')
         usuario = get_object_or_404(CustomUser, pk=user_id)
 
-        # Obtener todos los registros del usuario
-        registros_usuario = RegistroAsistencia.objects.filter(
+        # Todos los registros del usuario en una sola consulta (con su alegación);
+        # los totales por año y mes se calculan en memoria
+        registros_usuario = list(RegistroAsistencia.objects.filter(
             funcionario=usuario
-        ).select_related('horario_asignado', 'procesado_por').order_by('-fecha')
+        ).select_related('horario_asignado', 'procesado_por', 'alegacion').order_by('fecha'))
+
+        def contar(registros, estado):
+            return sum(1 for r in registros if r.estado == estado)
 
         # Estadísticas generales del usuario
-        total_registros = registros_usuario.count()
-        registros_puntuales = registros_usuario.filter(estado='PUNTUAL').count()
-        registros_retraso = registros_usuario.filter(estado='RETRASO').count()
-        registros_ausentes = registros_usuario.filter(estado='AUSENTE').count()
+        total_registros = len(registros_usuario)
+        registros_puntuales = contar(registros_usuario, 'PUNTUAL')
+        registros_retraso = contar(registros_usuario, 'RETRASO')
+        registros_ausentes = contar(registros_usuario, 'AUSENTE')
 
-        # Agrupar registros por año
-        registros_por_anio = {}
-        anios_disponibles = registros_usuario.values_list('fecha__year', flat=True).distinct().order_by('-fecha__year')
+        # Agrupar registros por año (más reciente primero) y por mes dentro del año
+        agrupados = {}
+        for registro in registros_usuario:
+            agrupados.setdefault(registro.fecha.year, {}).setdefault(registro.fecha.month, []).append(registro)
+        anios_disponibles = sorted(agrupados, reverse=True)
 
+        registros_por_anio = {}
         for anio in anios_disponibles:
-            registros_anio = registros_usuario.filter(fecha__year=anio).order_by('-fecha')
-
-            # Agrupar por mes dentro del año
             registros_por_mes = {}
-            meses_con_datos = registros_anio.values_list('fecha__month', flat=True).distinct().order_by('fecha__month')
-
-            for mes in meses_con_datos:
-                registros_mes = registros_anio.filter(fecha__month=mes).order_by('fecha')
+            for mes, registros_mes in sorted(agrupados[anio].items()):
                 registros_por_mes[mes] = {
                     'registros': registros_mes,
-                    'total': registros_mes.count(),
-                    'puntuales': registros_mes.filter(estado='PUNTUAL').count(),
-                    'retrasos': registros_mes.filter(estado='RETRASO').count(),
-                    'ausentes': registros_mes.filter(estado='AUSENTE').count(),
+                    'total': len(registros_mes),
+                    'puntuales': contar(registros_mes, 'PUNTUAL'),
+                    'retrasos': contar(registros_mes, 'RETRASO'),
+                    'ausentes': contar(registros_mes, 'AUSENTE'),
                 }
 
+            registros_anio = [r for registros_mes in agrupados[anio].values() for r in registros_mes]
             registros_por_anio[anio] = {
                 'registros_por_mes': registros_por_mes,
-                'total_anio': registros_anio.count(),
-                'puntuales_anio': registros_anio.filter(estado='PUNTUAL').count(),
+                'total_anio': len(registros_anio),
+                'puntuales_anio': contar(registros_anio, 'PUNTUAL'),
             }
 
         # Horario asignado
@@ -1501,16 +1492,13 @@ class EliminarTodasAsistenciasView(LoginRequiredMixin, UserPassesTestMixin, View
             messages.error(request, 'Confirmación incorrecta. No se realizó la eliminación.')
             return redirect('asistencia:gestion_asistencia')
 
-        # Contar registros antes de eliminar
-        total_registros = RegistroAsistencia.objects.count()
-        total_funcionarios = RegistroAsistencia.objects.values('funcionario').distinct().count()
-
-        # Eliminar todos los registros
-        RegistroAsistencia.objects.all().delete()
+        # Eliminar por lotes en segundo plano; el progreso se consulta desde la UI
+        job_id = submit_job('purga_asistencia', purgar_asistencia, owner=request.user)
 
-        messages.success(
+        messages.info(
             request,
-            f'Se eliminaron {total_registros} registros de asistencia de {total_funcionarios} funcionarios.'
+            'Se inició la eliminación de todos los registros de asistencia.',
+            extra_tags=job_message_tags(job_id)
         )
         return redirect('asistencia:gestion_asistencia')
 
@@ -1547,8 +1535,7 @@ class ReporteAsistenciaMensualView(LoginRequiredMixin, UserPassesTestMixin, View
 
         # Obtener datos del mes
         registros_mes = RegistroAsistencia.objects.filter(
-            fecha__year=anio,
-            fecha__month=mes
+            filtro_periodo('fecha', anio, mes)
         ).select_related('funcionario', 'horario_asignado')
 
         # Crear mapa de registros por funcionario
@@ -1590,9 +1577,16 @@ class ReporteAsistenciaMensualView(LoginRequiredMixin, UserPassesTestMixin, View
                     }
                     func_data['inasistencias'].append(inasistencia_info)
                 elif registro.estado == 'JUSTIFICADO':
+                    permiso = SolicitudPermiso.objects.filter(
+                        usuario=registro.funcionario,
+                        estado='APROBADO',
+                        fecha_inicio__lte=registro.fecha,
+                        fecha_termino__gte=registro.fecha,
+                    ).order_by('-fecha_inicio').first()
                     justificado_info = {
                         'fecha': registro.fecha,
-                        'tipo': 'permiso' if registro.tiene_permiso_aprobado() else 'licencia' if registro.tiene_licencia_medica() else 'otro',
+                        'tipo': 'permiso' if permiso else 'licencia' if registro.tiene_licencia_medica() else 'otro',
+                        'permiso': permiso,
                     }
                     func_data['justificados'].append(justificado_info)
 
@@ -1621,7 +1615,7 @@ class ReporteAsistenciaMensualView(LoginRequiredMixin, UserPassesTestMixin, View
         })
 
         # Generar PDF
-        pdf_file = HTML(string=html_content).write_pdf()
+        pdf_file = render_pdf(html_content)
 
         # Crear respuesta HTTP
         response = HttpResponse(pdf_file, content_type='application/pdf')
@@ -1682,9 +1676,8 @@ class ReporteAsistenciaIndividualView(LoginRequiredMixin, View):
     def get(self, request, anio, mes):
         # Obtener datos del usuario actual para el mes
         registros_mes = RegistroAsistencia.objects.filter(
-            funcionario=request.user,
-            fecha__year=anio,
-            fecha__month=mes
+            filtro_periodo('fecha', anio, mes),
+            funcionario=request.user
         ).select_related('horario_asignado').order_by('fecha')
 
         # Recopilar detalles de atrasos, inasistencias y justificaciones
@@ -1741,7 +1734,7 @@ class ReporteAsistenciaIndividualView(LoginRequiredMixin, View):
         })
 
         # Generar PDF
-        pdf_file = HTML(string=html_content).write_pdf()
+        pdf_file = render_pdf(html_content)
 
         # Crear respuesta HTTP
         response = HttpResponse(pdf_file, content_type='application/pdf')
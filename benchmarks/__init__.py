@@ -0,0 +1,11 @@
+"""
+Benchmarks de las rutas críticas del sistema.
+
+Se ejecutan con ``python manage.py run_benchmarks`` sobre el conjunto de datos
+sintético (``generate_synthetic_data``). Cada escenario registra tiempo de
+pared, cantidad de consultas, tiempo en base de datos, memoria máxima y filas
+por segundo, y el resultado se compara contra una línea base guardada.
+
+- ``runner``: medición, resultados en JSON y comparación con la línea base
+- ``scenarios``: definición de los escenarios (vistas, importaciones, ZIP)
+"""
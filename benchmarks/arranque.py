@@ -0,0 +1,74 @@
+"""
+Costo de arranque de un worker: tiempo de importación y memoria residente.
+
+Se lanza un intérprete nuevo con ``python -X importtime`` que hace lo mismo
+que un worker de gunicorn antes de atender su primer request: importar
+``config.wsgi`` (django.setup, modelos y admin) y cargar el URLconf, que
+importa todas las vistas. De la salida de importtime se agrega el tiempo
+propio de cada paquete de primer nivel para ver qué dependencias pesan.
+"""
+import json
+import os
+import subprocess
+import sys
+from collections import Counter
+
+# Dependencias que no deberían cargarse hasta que una vista las use
+PESADAS = ('weasyprint', 'openpyxl', 'xlrd', 'pypdf', 'psutil', 'sentry_sdk')
+
+_HIJO = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+from config.wsgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+segundos = time.perf_counter() - inicio
+print(json.dumps({
+    'segundos': segundos,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modulos': len(sys.modules),
+    'cargadas': [m for m in %r if m in sys.modules],
+}))
+""" % (PESADAS,)
+
+
+def _por_paquete(importtime):
+    """Suma el tiempo propio (µs) de cada paquete de primer nivel."""
+    totales = Counter()
+    for linea in importtime.splitlines():
+        if not linea.startswith('import time:') or '[us]' in linea:
+            continue
+        try:
+            propio, _acumulado, modulo = linea[len('import time:'):].split('|')
+            totales[modulo.strip().split('.')[0]] += int(propio)
+        except ValueError:
+            continue
+    return totales
+
+
+def medir_arranque(top=10, directorio=None):
+    """
+    Mide el arranque de un worker en un proceso nuevo.
+
+    Returns:
+        dict: wall_s, peak_mem_mb, modulos, pesadas_cargadas y los ``top``
+        paquetes con más tiempo de importación (ms)
+    """
+    entorno = dict(os.environ)
+    entorno.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _HIJO],
+        capture_output=True, text=True, env=entorno, cwd=directorio,
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(proceso.stderr.strip().splitlines()[-1] if proceso.stderr else 'error al arrancar')
+
+    datos = json.loads(proceso.stdout.strip().splitlines()[-1])
+    paquetes = _por_paquete(proceso.stderr)
+    return {
+        'wall_s': round(datos['segundos'], 4),
+        'peak_mem_mb': round(datos['rss_kb'] / 1024, 2),
+        'modulos': datos['modulos'],
+        'pesadas_cargadas': datos['cargadas'],
+        'paquetes_ms': {nombre: round(us / 1000, 1) for nombre, us in paquetes.most_common(top)},
+    }
@@ -0,0 +1,179 @@
+"""
+Medición de escenarios y comparación contra la línea base.
+"""
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import django
+from django.db import connection, transaction
+from django.utils import timezone
+
+# Métricas comparadas contra la línea base y si un aumento es una regresión
+METRICAS_COMPARADAS = ('wall_s', 'queries', 'peak_mem_mb')
+
+
+class ContadorConsultas:
+    """
+    Cuenta consultas y tiempo en base de datos con ``execute_wrapper``.
+
+    A diferencia de ``connection.queries`` no depende de DEBUG ni del límite
+    de 9000 consultas registradas, y no guarda el SQL.
+    """
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+@dataclass
+class Escenario:
+    """
+    Un caso a medir.
+
+    Attributes:
+        nombre: Identificador (clave en el JSON de resultados)
+        ejecutar: Callable sin argumentos; lo que se mide
+        filas: Filas procesadas por ejecución (para filas/s); int o callable
+        preparar: Callable opcional antes de cada ejecución (no se mide)
+        limpiar: Callable opcional tras cada ejecución, dentro de la transacción
+    """
+    nombre: str
+    ejecutar: Callable
+    filas: object = 0
+    preparar: Optional[Callable] = None
+    limpiar: Optional[Callable] = None
+
+
+def _una_vez(escenario, con_memoria=False):
+    """
+    Ejecuta el escenario una vez dentro de una transacción que se revierte,
+    para que importaciones y cargas no alteren el conjunto de datos.
+    """
+    if escenario.preparar:
+        escenario.preparar()
+
+    with transaction.atomic():
+        if con_memoria:
+            tracemalloc.start()
+        contador = ContadorConsultas()
+        with connection.execute_wrapper(contador):
+            inicio = time.perf_counter()
+            escenario.ejecutar()
+            duracion = time.perf_counter() - inicio
+        pico = 0
+        if con_memoria:
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        if escenario.limpiar:
+            escenario.limpiar()
+        transaction.set_rollback(True)
+
+    return {
+        'wall_s': duracion,
+        'queries': contador.consultas,
+        'db_s': contador.segundos,
+        'peak_mem_mb': pico / (1024 * 1024),
+    }
+
+
+def medir(escenario, repeticiones=3):
+    """
+    Mide un escenario.
+
+    Una ejecución de calentamiento no se cuenta; el tiempo reportado es la
+    mediana de ``repeticiones``. La memoria se mide en una ejecución aparte
+    con tracemalloc, que ralentiza el código y distorsionaría el tiempo.
+
+    Returns:
+        dict con wall_s, wall_min_s, queries, db_s, peak_mem_mb, filas y filas_por_s
+    """
+    _una_vez(escenario)
+    corridas = [_una_vez(escenario) for _ in range(repeticiones)]
+    memoria = _una_vez(escenario, con_memoria=True)
+
+    filas = escenario.filas() if callable(escenario.filas) else escenario.filas
+    wall = statistics.median(c['wall_s'] for c in corridas)
+    return {
+        'wall_s': round(wall, 4),
+        'wall_min_s': round(min(c['wall_s'] for c in corridas), 4),
+        'queries': corridas[-1]['queries'],
+        'db_s': round(statistics.median(c['db_s'] for c in corridas), 4),
+        'peak_mem_mb': round(memoria['peak_mem_mb'], 2),
+        'filas': filas,
+        'filas_por_s': round(filas / wall, 1) if filas and wall else None,
+    }
+
+
+def ejecutar_escenarios(escenarios, repeticiones=3, informar=None):
+    """Mide todos los escenarios y arma el documento de resultados."""
+    informar = informar or (lambda nombre, metricas: None)
+    resultados = {}
+    for escenario in escenarios:
+        resultados[escenario.nombre] = metricas = medir(escenario, repeticiones)
+        informar(escenario.nombre, metricas)
+
+    return {
+        'fecha': timezone.now().isoformat(),
+        'entorno': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'base_de_datos': connection.vendor,
+            'repeticiones': repeticiones,
+        },
+        'escenarios': resultados,
+    }
+
+
+def comparar(resultados, baseline, tolerancia=0.25):
+    """
+    Compara contra la línea base.
+
+    El tiempo y la memoria admiten ``tolerancia`` (fracción) por ruido de
+    medición; cualquier consulta adicional se reporta.
+
+    Returns:
+        list[dict]: Regresiones (escenario, métrica, base, actual, variación)
+    """
+    regresiones = []
+    base_escenarios = baseline.get('escenarios', {})
+    for nombre, metricas in resultados['escenarios'].items():
+        base = base_escenarios.get(nombre)
+        if not base:
+            continue
+        for metrica in METRICAS_COMPARADAS:
+            anterior, actual = base.get(metrica), metricas.get(metrica)
+            if anterior is None or actual is None:
+                continue
+            limite = anterior if metrica == 'queries' else anterior * (1 + tolerancia)
+            if actual > limite:
+                regresiones.append({
+                    'escenario': nombre,
+                    'metrica': metrica,
+                    'base': anterior,
+                    'actual': actual,
+                    'variacion': round((actual - anterior) / anterior, 3) if anterior else None,
+                })
+    return regresiones
+
+
+def guardar(documento, ruta):
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(documento, f, ensure_ascii=False, indent=2)
+
+
+def cargar(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,206 @@
+"""
+Escenarios de benchmark sobre el conjunto de datos sintético.
+
+Usan el cliente de pruebas de Django con sesiones forzadas, por lo que miden
+la vista completa (middleware, consultas y plantilla) sin pasar por la red.
+Las importaciones y cargas se ejecutan dentro de una transacción revertida
+por el runner; los archivos que escriben se eliminan en ``limpiar``.
+"""
+import io
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client
+from django.urls import reverse
+
+from asistencia.models import RegistroAsistencia
+from core.purge import eliminar_archivos
+from core.synthetic import PREFIJO, pdf_minimo
+from liquidaciones.models import Liquidacion
+from users.models import CustomUser
+from .runner import Escenario
+
+# Usuarios sintéticos por rol (ver core.synthetic._rol)
+USUARIO_ADMIN = f'{PREFIJO}00000'
+USUARIO_DIRECTOR = f'{PREFIJO}00001'
+USUARIO_SECRETARIA = f'{PREFIJO}00002'
+USUARIO_FUNCIONARIO = f'{PREFIJO}00010'
+
+# Tamaño de las cargas simuladas
+FUNCIONARIOS_IMPORTACION = 100
+PAGINAS_LIQUIDACION = 200
+
+
+class BenchmarkError(Exception):
+    """El conjunto de datos no permite ejecutar los escenarios."""
+
+
+def _cliente(username):
+    try:
+        usuario = CustomUser.objects.get(username=username)
+    except CustomUser.DoesNotExist:
+        raise BenchmarkError(
+            f'No existe el usuario {username}; genere los datos con generate_synthetic_data'
+        )
+    cliente = Client()
+    cliente.force_login(usuario)
+    return cliente
+
+
+def _get(cliente, url, **params):
+    def ejecutar():
+        respuesta = cliente.get(url, params)
+        if respuesta.status_code != 200:
+            raise BenchmarkError(f'GET {url} respondió {respuesta.status_code}')
+        if getattr(respuesta, 'streaming', False):
+            for _ in respuesta.streaming_content:
+                pass
+        return respuesta
+    return ejecutar
+
+
+def _post(cliente, url, datos):
+    def ejecutar():
+        for archivo in datos.values():
+            if hasattr(archivo, 'seek'):
+                archivo.seek(0)
+        respuesta = cliente.post(url, datos)
+        if respuesta.status_code >= 400:
+            raise BenchmarkError(f'POST {url} respondió {respuesta.status_code}')
+        return respuesta
+    return ejecutar
+
+
+def _ultimo_mes_completo():
+    """(año, mes) del último mes completo con asistencia sintética."""
+    ultimo = (
+        RegistroAsistencia.objects.filter(funcionario__username__startswith=PREFIJO)
+        .order_by('-fecha').values_list('fecha', flat=True).first()
+    )
+    if ultimo is None:
+        raise BenchmarkError('No hay asistencia sintética; genere los datos con generate_synthetic_data')
+    anterior = ultimo.replace(day=1) - timedelta(days=1)
+    return anterior.year, anterior.month
+
+
+def _excel_asistencia(anio, mes):
+    """Excel del reloj control con entrada y salida por día hábil del mes."""
+    from openpyxl import Workbook
+
+    funcionarios = list(
+        CustomUser.objects.filter(username__startswith=PREFIJO)
+        .order_by('username').values_list('run', 'first_name', 'last_name')[:FUNCIONARIOS_IMPORTACION]
+    )
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('Registros')
+    hoja.append(['RUT', 'Nombre', 'Horario'])
+    filas = 0
+    dia = date(anio, mes, 1)
+    while dia.month == mes:
+        if dia.weekday() < 5:
+            for run, nombre, apellido in funcionarios:
+                for hora in ('08:05', '17:10'):
+                    hoja.append([run, f'{nombre} {apellido}', f'{dia:%d-%m-%Y} {hora}'])
+                    filas += 1
+        dia += timedelta(days=1)
+
+    salida = io.BytesIO()
+    libro.save(salida)
+    return salida.getvalue(), filas
+
+
+def _pdf_liquidaciones():
+    """PDF combinado de liquidaciones con un RUT por página."""
+    runs = list(
+        CustomUser.objects.filter(username__startswith=PREFIJO)
+        .order_by('username').values_list('run', flat=True)[:PAGINAS_LIQUIDACION]
+    )
+    paginas = [f'Liquidacion de sueldo Enero 2020 RUT: {run}' for run in runs]
+    return pdf_minimo(*paginas), len(paginas)
+
+
+def _limpiar_liquidaciones(mes, anio):
+    def limpiar():
+        nombres = list(
+            Liquidacion.objects.filter(
+                mes=mes, anio=anio, funcionario__username__startswith=PREFIJO
+            ).values_list('archivo', flat=True)
+        )
+        eliminar_archivos(nombres)
+    return limpiar
+
+
+def construir_escenarios():
+    """Lista de escenarios, en el orden en que se ejecutan."""
+    admin = _cliente(USUARIO_ADMIN)
+    director = _cliente(USUARIO_DIRECTOR)
+    secretaria = _cliente(USUARIO_SECRETARIA)
+    funcionario = _cliente(USUARIO_FUNCIONARIO)
+    anio, mes = _ultimo_mes_completo()
+
+    excel, filas_excel = _excel_asistencia(anio, mes)
+    pdf, paginas_pdf = _pdf_liquidaciones()
+    propias = Liquidacion.objects.filter(funcionario__username=USUARIO_FUNCIONARIO)
+    anio_liquidaciones = propias.order_by('-anio').values_list('anio', flat=True).first() or anio
+
+    return [
+        Escenario(
+            'mi_asistencia',
+            _get(funcionario, reverse('asistencia:mi_asistencia'), mes=mes, anio=anio),
+        ),
+        Escenario(
+            'gestion_asistencia',
+            _get(secretaria, reverse('asistencia:gestion_asistencia'), mes=mes, anio=anio),
+        ),
+        Escenario(
+            'reportes',
+            _get(director, reverse('reportes'), mes=mes, anio=anio),
+            filas=lambda: CustomUser.objects.filter(is_active=True).count(),
+            # Reporte en frío: sin resultados cacheados de una ejecución anterior
+            preparar=cache.clear,
+        ),
+        # En caliente el resumen sale de la caché; en frío se mide calcular_resumen
+        Escenario('admin_dashboard', _get(admin, reverse('admin_dashboard:dashboard'))),
+        Escenario(
+            'admin_dashboard_frio',
+            _get(admin, reverse('admin_dashboard:dashboard')),
+            preparar=cache.clear,
+        ),
+        Escenario('system_logs', _get(admin, reverse('admin_dashboard:logs'))),
+        # Con paginación por cursor la última página cuesta lo mismo que la primera
+        Escenario('system_logs_ultima', _get(admin, reverse('admin_dashboard:logs'), ultima=1)),
+        Escenario('system_logs_busqueda', _get(admin, reverse('admin_dashboard:logs'), q='aprob')),
+        Escenario(
+            'importacion_asistencia',
+            _post(secretaria, reverse('asistencia:carga_registros'), {
+                'archivo_excel': SimpleUploadedFile(
+                    'registros.xlsx', excel,
+                    content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                ),
+                'mes': mes,
+                'anio': anio,
+            }),
+            filas=filas_excel,
+        ),
+        Escenario(
+            'division_liquidaciones',
+            _post(secretaria, reverse('carga_liquidaciones'), {
+                'archivo': SimpleUploadedFile('liquidaciones.pdf', pdf, content_type='application/pdf'),
+                'mes': 1,
+                'anio': 2020,
+            }),
+            filas=paginas_pdf,
+            limpiar=_limpiar_liquidaciones(1, 2020),
+        ),
+        Escenario(
+            'zip_liquidaciones',
+            _get(funcionario, reverse('descargar_todas_liquidaciones')),
+            filas=propias.count,
+        ),
+        Escenario(
+            'zip_liquidaciones_anio',
+            _get(funcionario, reverse('descargar_liquidaciones_anio', args=[anio_liquidaciones])),
+            filas=propias.filter(anio=anio_liquidaciones).count,
+        ),
+    ]
@@ -5,6 +5,7 @@ Generated by 'django-admin startproject' using Django 5.2.8.
 """
 
 import os
+import sys
 from pathlib import Path
 # Force reload
 
@@ -12,10 +13,6 @@ from pathlib import Path
 from dotenv import load_dotenv
 load_dotenv()
 
-# Monitoring and Observability
-import sentry_sdk
-from sentry_sdk.integrations.django import DjangoIntegration
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -76,6 +73,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'core.security.SecurityHeadersMiddleware',
+    'core.middleware.MetricasRequestMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,6 +81,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.PDFTimeoutMiddleware',
     'axes.middleware.AxesMiddleware',
 ]
 
@@ -131,6 +130,85 @@ DATABASES = {
 }
 
 
+# Cache
+# Con REDIS_URL definido se usa Redis (compartido entre workers de gunicorn);
+# sin él, caché en memoria local por proceso. En producción REDIS_URL es
+# necesario: las señales que invalidan reportes y el dashboard solo alcanzan
+# la caché del worker que atendió el cambio, así que sin Redis los resultados
+# derivados se cachean apenas DERIVED_CACHE_MAX_SECONDS.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'sgpal',
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+                # Si Redis no responde, la aplicación sigue funcionando sin caché
+                'IGNORE_EXCEPTIONS': True,
+            },
+        }
+    }
+    DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sgpal',
+        }
+    }
+
+# Tope de TTL para resultados derivados (reportes, archivos, dashboard) con la
+# caché local por proceso; con Redis no hay tope
+DERIVED_CACHE_MAX_SECONDS = None if REDIS_URL else int(os.environ.get('DERIVED_CACHE_MAX_SECONDS', '5'))
+
+# Segundos que el dashboard de administración reutiliza su resumen; las
+# señales de permisos, licencias y usuarios lo invalidan antes si hay cambios
+DASHBOARD_CACHE_SECONDS = int(os.environ.get('DASHBOARD_CACHE_SECONDS', '60'))
+
+
+# Tareas en segundo plano y render de PDF
+# Procesos que mantienen WeasyPrint inicializado (0 = render en el mismo proceso)
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', '2'))
+# Archivos generados por tareas (fuera de MEDIA_ROOT); por defecto en el tmp del sistema
+JOB_ARTIFACTS_DIR = os.environ.get('JOB_ARTIFACTS_DIR')
+# El estado de las tareas vive en la tabla core_tarea (compartida entre workers).
+# Una tarea sin latido durante este tiempo se da por interrumpida (worker reciclado)
+JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', '60'))
+
+
+# Métricas de rendimiento por vista (core.middleware.MetricasRequestMiddleware).
+# Por defecto activas en gunicorn y runserver; apagadas en los comandos de
+# manage.py (test, migrate, cerrar_mes...), que no atienden requests reales.
+_COMANDO_MANAGE = sys.argv[1] if len(sys.argv) > 1 and os.path.basename(sys.argv[0]) == 'manage.py' else None
+REQUEST_METRICS_ENABLED = os.environ.get(
+    'REQUEST_METRICS_ENABLED', 'True' if _COMANDO_MANAGE in (None, 'runserver') else 'False'
+).lower() in ('true', '1', 'yes', 'on')
+# Resumen en el logger 'performance' cada N segundos: una línea INFO con el
+# total y el detalle por vista en DEBUG
+REQUEST_METRICS_FLUSH_SECONDS = int(os.environ.get('REQUEST_METRICS_FLUSH_SECONDS', '300'))
+# Umbrales para registrar un request lento con sus consultas repetidas
+REQUEST_SLOW_MS = int(os.environ.get('REQUEST_SLOW_MS', '1000'))
+REQUEST_SLOW_QUERIES = int(os.environ.get('REQUEST_SLOW_QUERIES', '100'))
+# Endpoint /metrics (Prometheus): token Bearer requerido; sin token solo con DEBUG
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+# Refresco en segundo plano de CPU, disco, base de datos y contadores (0 = en cada lectura)
+METRICS_REFRESH_SECONDS = int(os.environ.get('METRICS_REFRESH_SECONDS', '30'))
+
+# Logs de auditoría (admin_dashboard.log_writer): se escriben por lotes en segundo plano
+# Lote máximo en memoria antes de escribir (0 = escribir en cada registrar_log)
+AUDIT_LOG_BUFFER_SIZE = int(os.environ.get('AUDIT_LOG_BUFFER_SIZE', '50'))
+AUDIT_LOG_FLUSH_SECONDS = float(os.environ.get('AUDIT_LOG_FLUSH_SECONDS', '2'))
+# Respaldo en disco si la base de datos no está disponible
+AUDIT_LOG_FALLBACK_FILE = os.environ.get('AUDIT_LOG_FALLBACK_FILE', str(BASE_DIR / 'logs' / 'auditoria_pendiente.jsonl'))
+# Retención (manage.py archivar_logs): meses más antiguos pasan a gzip JSON Lines
+SYSTEM_LOG_RETENTION_DAYS = int(os.environ.get('SYSTEM_LOG_RETENTION_DAYS', '365'))
+SYSTEM_LOG_ARCHIVE_DIR = os.environ.get('SYSTEM_LOG_ARCHIVE_DIR', str(BASE_DIR / 'logs' / 'archivo'))
+# Respaldos (manage.py respaldar_sistema): destino y manifiesto de archivos media del último respaldo
+SYSTEM_BACKUP_DIR = os.environ.get('SYSTEM_BACKUP_DIR', str(BASE_DIR / 'logs' / 'respaldos'))
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -227,9 +305,12 @@ AXES_LOCKOUT_TEMPLATE = 'account/locked.html'
 # MONITORING AND OBSERVABILITY
 # =============================================================================
 
-# Sentry Configuration
+# Sentry Configuration (el SDK solo se importa si está configurado)
 SENTRY_DSN = os.environ.get('SENTRY_DSN')
 if SENTRY_DSN:
+    import sentry_sdk
+    from sentry_sdk.integrations.django import DjangoIntegration
+
     sentry_sdk.init(
         dsn=SENTRY_DSN,
         integrations=[
@@ -304,5 +385,10 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': False,
         },
+        'performance': {
+            'handlers': ['console', 'file'] if not DEBUG else ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
\ No newline at end of file
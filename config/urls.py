@@ -6,7 +6,7 @@ from django.conf.urls.static import static
 from django.views.static import serve
 from django.http import HttpResponseRedirect, Http404
 import os
-from core.views import CustomLoginView, DashboardView, HealthCheckView
+from core.views import CustomLoginView, DashboardView, HealthCheckView, MetricsView, JobStatusView, JobFileView, JobWaitView
 from django.contrib.auth.views import LogoutView
 
 
@@ -104,9 +104,13 @@ urlpatterns = [
     path('usuarios/', include('users.urls')),
     path('dashboard/admin/', include(('admin_dashboard.urls', 'admin_dashboard'), namespace='admin_dashboard')),
     path('asistencia/', include('asistencia.urls')),
+    path('jobs/<str:job_id>/', JobStatusView.as_view(), name='job_status'),
+    path('jobs/<str:job_id>/archivo/', JobFileView.as_view(), name='job_file'),
+    path('jobs/<str:job_id>/espera/', JobWaitView.as_view(), name='job_wait'),
 
     # Health checks and monitoring
     path('health/', HealthCheckView.as_view(), name='health_check'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 
     # Servir archivos media en produccion
     # Necesario porque nginx de Dokploy no esta configurado para servir /media/
@@ -0,0 +1,90 @@
+"""
+Versiones de datos por dominio para invalidar cachés derivadas.
+
+En lugar de borrar claves al modificar datos, cada dominio (permisos,
+licencias, usuarios) tiene un contador en la caché que las señales
+incrementan. Las claves de resultados derivados incluyen las versiones de los
+dominios de los que dependen, así que un cambio las deja obsoletas de
+inmediato y las entradas antiguas simplemente expiran.
+
+Los incrementos solo llegan a la caché de los procesos que la comparten. Con
+la caché local por proceso (sin REDIS_URL) los demás workers no se enteran,
+por lo que los resultados derivados se guardan como máximo
+DERIVED_CACHE_MAX_SECONDS (ver ``ttl_derivado``).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+PERMISOS = 'permisos'
+LICENCIAS = 'licencias'
+USUARIOS = 'usuarios'
+
+
+def _version_key(dominio):
+    return f'data_version:{dominio}'
+
+
+def data_version(dominio):
+    """
+    Versión actual de un dominio.
+
+    Si la clave no existe (caché reiniciada o expulsada) se inicializa con un
+    valor basado en el reloj, para que nunca coincida con versiones anteriores
+    que aún pudieran estar en caché.
+    """
+    key = _version_key(dominio)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def data_versions(*dominios):
+    """Versiones de varios dominios en una sola lectura, como texto para claves de caché."""
+    keys = [_version_key(d) for d in dominios]
+    versiones = cache.get_many(keys)
+    return '.'.join(
+        str(versiones[k]) if versiones.get(k) is not None else str(data_version(d))
+        for k, d in zip(keys, dominios)
+    )
+
+
+def bump_data_version(dominio):
+    """Incrementa la versión de un dominio; las cachés derivadas quedan obsoletas."""
+    try:
+        cache.incr(_version_key(dominio))
+    except ValueError:
+        cache.set(_version_key(dominio), time.time_ns(), None)
+
+
+def versioned_key(prefijo, dominios, *partes):
+    """
+    Clave de caché para un resultado que depende de ``dominios``.
+
+    Las ``partes`` (filtros, ids) se resumen en un hash para mantener la clave
+    corta y segura para cualquier backend.
+    """
+    resumen = hashlib.sha1('|'.join(str(p) for p in partes).encode()).hexdigest()
+    return f'{prefijo}:{data_versions(*dominios)}:{resumen}'
+
+
+def ttl_derivado(timeout):
+    """TTL efectivo de un resultado derivado: acotado si la caché no se comparte entre workers."""
+    maximo = getattr(settings, 'DERIVED_CACHE_MAX_SECONDS', None)
+    if maximo is None:
+        return timeout
+    return maximo if timeout is None else min(timeout, maximo)
+
+
+def get_or_compute(prefijo, dominios, partes, calcular, timeout=60 * 30):
+    """Retorna el resultado cacheado o lo calcula y guarda con ``calcular()``."""
+    key = versioned_key(prefijo, dominios, *partes)
+    resultado = cache.get(key)
+    if resultado is None:
+        resultado = calcular()
+        cache.set(key, resultado, ttl_derivado(timeout))
+    return resultado
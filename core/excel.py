@@ -0,0 +1,171 @@
+"""
+Exportación de planillas Excel en modo streaming.
+
+Un libro openpyxl normal mantiene todas las celdas en memoria hasta guardar.
+Aquí las hojas se crean en modo ``write_only``: cada fila se escribe al
+archivo temporal de la hoja apenas se agrega, por lo que las filas pueden
+venir directamente de ``queryset.values_list(...).iterator()`` y la memoria
+no crece con el tamaño del reporte. El libro terminado se guarda en un
+archivo temporal en disco y se envía al cliente por bloques (FileResponse).
+openpyxl se importa al escribir el primer libro, no al cargar este módulo.
+
+Para exportaciones sin límite de filas ``dividir_en_hojas`` reparte las filas
+en varias hojas (Excel admite 1.048.576 por hoja) y ``respuesta_csv`` las
+envía como CSV a medida que se generan, sin archivo intermedio.
+
+Uso::
+
+    hojas = [Hoja('Nómina', ['N°', 'Funcionario'], filas, anchos=[10, 30])]
+    return respuesta_excel(hojas, 'reporte.xlsx')
+"""
+import csv
+import io
+import tempfile
+from dataclasses import dataclass, field
+from itertools import chain, islice
+
+from django.http import FileResponse, StreamingHttpResponse
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Filas de datos por hoja (el límite de Excel menos el encabezado)
+FILAS_MAXIMAS_HOJA = 1048575
+
+# Colores de encabezado usados en las planillas del sistema
+HEADER_COLOR = "FFFFFF"
+HEADER_BACKGROUND = "4F46E5"
+
+
+@dataclass
+class Hoja:
+    """
+    Definición de una hoja del libro.
+
+    Attributes:
+        titulo: Nombre de la pestaña
+        encabezados: Textos de la primera fila
+        filas: Iterable de filas (listas o tuplas); se consume una sola vez
+        anchos: Ancho de cada columna, en el orden de los encabezados
+        estilo_encabezado: Si se aplican HEADER_COLOR/HEADER_BACKGROUND a la primera fila
+    """
+    titulo: str
+    encabezados: list
+    filas: object
+    anchos: list = field(default_factory=list)
+    estilo_encabezado: bool = True
+
+
+def _encabezado(ws, hoja):
+    if not hoja.estilo_encabezado:
+        return list(hoja.encabezados)
+
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill
+
+    fuente = Font(bold=True, color=HEADER_COLOR)
+    relleno = PatternFill(start_color=HEADER_BACKGROUND, end_color=HEADER_BACKGROUND, fill_type="solid")
+    celdas = []
+    for texto in hoja.encabezados:
+        celda = WriteOnlyCell(ws, value=texto)
+        celda.font = fuente
+        celda.fill = relleno
+        celdas.append(celda)
+    return celdas
+
+
+def dividir_en_hojas(titulo, encabezados, filas, anchos=(), maximo=None):
+    """
+    Reparte ``filas`` en hojas de a lo más ``maximo`` filas: "Logs", "Logs 2"...
+
+    Las hojas comparten el iterador de filas, por lo que deben escribirse en
+    orden y una sola vez (como hace ``escribir_libro``).
+    """
+    maximo = maximo or FILAS_MAXIMAS_HOJA
+    filas = iter(filas)
+    numero = 1
+    while True:
+        primera = next(filas, None)
+        if primera is None and numero > 1:
+            return
+        bloque = chain([primera] if primera is not None else [], islice(filas, maximo - 1))
+        nombre = titulo if numero == 1 else f'{titulo[:27]} {numero}'
+        yield Hoja(nombre, encabezados, bloque, list(anchos))
+        numero += 1
+
+
+def escribir_libro(hojas, destino):
+    """
+    Escribe las hojas en un libro write-only y lo guarda en ``destino``.
+
+    Args:
+        hojas: Iterable de Hoja
+        destino: Ruta o archivo binario abierto para escritura
+    """
+    import openpyxl
+    from openpyxl.utils import get_column_letter
+
+    wb = openpyxl.Workbook(write_only=True)
+    for hoja in hojas:
+        ws = wb.create_sheet(title=hoja.titulo)
+        # En modo write-only los anchos deben definirse antes de la primera fila
+        for i, ancho in enumerate(hoja.anchos, start=1):
+            ws.column_dimensions[get_column_letter(i)].width = ancho
+        ws.append(_encabezado(ws, hoja))
+        for fila in hoja.filas:
+            ws.append(fila)
+    wb.save(destino)
+
+
+def libro_bytes(hojas):
+    """Contenido del libro como bytes (para reportes pequeños que se cachean)."""
+    buffer = io.BytesIO()
+    escribir_libro(hojas, buffer)
+    return buffer.getvalue()
+
+
+def respuesta_excel(hojas, nombre_archivo):
+    """
+    Genera el libro en un archivo temporal y lo envía por bloques.
+
+    El archivo temporal se elimina al cerrarse la respuesta.
+
+    Returns:
+        FileResponse
+    """
+    archivo = tempfile.TemporaryFile()
+    try:
+        escribir_libro(hojas, archivo)
+    except Exception:
+        archivo.close()
+        raise
+    archivo.seek(0)
+    return FileResponse(archivo, as_attachment=True, filename=nombre_archivo, content_type=XLSX_CONTENT_TYPE)
+
+
+class _Eco:
+    """Archivo falso para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def respuesta_csv(encabezados, filas, nombre_archivo):
+    """
+    CSV enviado a medida que se generan las filas (memoria constante).
+
+    Usa ';' como separador y BOM UTF-8 para que Excel en español lo abra
+    con columnas y acentos correctos.
+
+    Returns:
+        StreamingHttpResponse
+    """
+    escritor = csv.writer(_Eco(), delimiter=';')
+
+    def lineas():
+        yield '\ufeff' + escritor.writerow(encabezados)
+        for fila in filas:
+            yield escritor.writerow(fila)
+
+    respuesta = StreamingHttpResponse(lineas(), content_type='text/csv; charset=utf-8')
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    return respuesta
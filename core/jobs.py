@@ -0,0 +1,313 @@
+"""
+Tareas en segundo plano dentro del proceso web.
+
+Las operaciones pesadas (purgas masivas, generación de archivos, respaldos) se
+ejecutan en un pool de hilos y publican su avance en la tabla ``Tarea`` para
+que la interfaz lo consulte a través de ``JobStatusView`` desde cualquier
+worker de gunicorn (la caché local de cada proceso no se comparte).
+
+Cada proceso mantiene un hilo de latidos que renueva ``Tarea.latido`` de sus
+tareas activas. Si el worker muere o se recicla con tareas a medio camino, el
+latido se detiene y la tarea se marca como ERROR la próxima vez que se
+consulta, en lugar de quedar pendiente para siempre.
+"""
+import atexit
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .metrics import DURACION_TAREA
+from .models import Tarea
+
+logger = logging.getLogger(__name__)
+
+JOB_TTL = 60 * 60 * 24
+JOB_MAX_WORKERS = 2
+# Intervalo mínimo entre escrituras de progreso en la base de datos (segundos)
+PROGRESS_INTERVAL = 0.5
+# Cada cuánto se renueva el latido de las tareas activas del proceso, y tras
+# cuánto tiempo sin latido se da por muerta una tarea (segundos)
+JOB_HEARTBEAT_SECONDS = 10
+JOB_STALE_SECONDS = 60
+
+PENDIENTE = 'PENDIENTE'
+EN_CURSO = 'EN_CURSO'
+COMPLETADO = 'COMPLETADO'
+ERROR = 'ERROR'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Tareas de este proceso aún no terminadas: job_id -> JobReporter
+_activas = {}
+_activas_lock = threading.Lock()
+_latidos = None
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'JOB_MAX_WORKERS', JOB_MAX_WORKERS),
+                thread_name_prefix='job',
+            )
+        return _executor
+
+
+def _run_sync():
+    return getattr(settings, 'JOBS_RUN_SYNC', False)
+
+
+def _marcar_interrumpida(queryset, motivo):
+    """Marca como ERROR las tareas no terminadas del queryset. Retorna cuántas."""
+    marcadas = 0
+    for tarea in queryset.filter(estado__in=(PENDIENTE, EN_CURSO)):
+        datos = {**tarea.datos, 'estado': ERROR, 'error': motivo, 'finalizado': time.time()}
+        # Condicional: si la tarea terminó entretanto, no se pisa su estado
+        marcadas += Tarea.objects.filter(pk=tarea.pk, estado=tarea.estado).update(estado=ERROR, datos=datos)
+    return marcadas
+
+
+def get_job(job_id):
+    """
+    Retorna el estado publicado de una tarea o None si no existe/expiró.
+
+    Una tarea pendiente o en curso sin latido reciente se marca como ERROR:
+    el worker que la ejecutaba terminó.
+    """
+    limite = timezone.now() - timedelta(
+        seconds=getattr(settings, 'JOB_STALE_SECONDS', JOB_STALE_SECONDS)
+    )
+    _marcar_interrumpida(
+        Tarea.objects.filter(pk=job_id, latido__lt=limite),
+        'La tarea se interrumpió porque el proceso que la ejecutaba terminó. Vuelve a intentarlo.',
+    )
+    tarea = Tarea.objects.filter(pk=job_id).only('datos').first()
+    return tarea.datos if tarea else None
+
+
+class JobReporter:
+    """Publica el estado y avance de una tarea en la base de datos."""
+
+    def __init__(self, job_id, estado):
+        self.job_id = job_id
+        self.estado = estado
+        self._ultimo_guardado = 0.0
+        self._pendiente = False
+        self._lock = threading.Lock()
+
+    def _guardar(self):
+        self._ultimo_guardado = time.monotonic()
+        # Dentro de una transacción de la tarea (p. ej. la restauración) el
+        # progreso no sería visible hasta el commit: lo escribe el hilo de
+        # latidos con su propia conexión.
+        if connection.in_atomic_block and not _run_sync():
+            self._pendiente = True
+        else:
+            self.publicar()
+
+    def publicar(self):
+        """Escribe el estado actual en la tabla de tareas."""
+        with self._lock:
+            self._pendiente = False
+            datos = dict(self.estado)
+        Tarea.objects.filter(pk=self.job_id).update(estado=datos['estado'], datos=datos, latido=timezone.now())
+
+    def update(self, **campos):
+        """Actualiza campos del estado y los publica inmediatamente."""
+        self.estado.update(campos)
+        self._guardar()
+
+    def progress(self, actual, total=None, mensaje=None, **extra):
+        """
+        Registra el avance de la tarea.
+
+        Las escrituras se limitan a una cada PROGRESS_INTERVAL segundos salvo
+        cuando la tarea alcanza el total, para no saturar la base de datos en
+        bucles de lotes pequeños.
+        """
+        self.estado['progreso'] = actual
+        if total is not None:
+            self.estado['total'] = total
+        if mensaje is not None:
+            self.estado['mensaje'] = mensaje
+        self.estado.update(extra)
+        terminado = self.estado.get('total') is not None and actual >= self.estado['total']
+        if terminado or time.monotonic() - self._ultimo_guardado >= PROGRESS_INTERVAL:
+            self._guardar()
+
+
+def _latir():
+    """Hilo de latidos: publica el progreso pendiente y renueva el latido de las tareas activas."""
+    intervalo = getattr(settings, 'JOB_HEARTBEAT_SECONDS', JOB_HEARTBEAT_SECONDS)
+    while True:
+        time.sleep(intervalo)
+        try:
+            with _activas_lock:
+                activas = list(_activas.values())
+            for reporter in activas:
+                if reporter._pendiente:
+                    reporter.publicar()
+            if activas:
+                Tarea.objects.filter(pk__in=[r.job_id for r in activas]).update(latido=timezone.now())
+        except Exception:
+            logger.exception("No se pudo renovar el latido de las tareas")
+        finally:
+            connection.close_if_unusable_or_obsolete()
+
+
+def _iniciar_latidos():
+    global _latidos
+    with _activas_lock:
+        if _latidos is None:
+            _latidos = threading.Thread(target=_latir, name='job-latidos', daemon=True)
+            _latidos.start()
+
+
+@atexit.register
+def _interrumpir_activas():
+    """Al terminar el proceso (p. ej. reciclaje del worker), marca sus tareas como ERROR."""
+    with _activas_lock:
+        ids = list(_activas)
+    if not ids:
+        return
+    try:
+        _marcar_interrumpida(
+            Tarea.objects.filter(pk__in=ids),
+            'La tarea se interrumpió porque el servidor se reinició. Vuelve a intentarlo.',
+        )
+    except Exception:
+        logger.exception("No se pudieron marcar las tareas interrumpidas")
+
+
+def _ejecutar(reporter, func, args, kwargs, en_hilo):
+    reporter.update(estado=EN_CURSO, iniciado=time.time())
+    inicio = time.perf_counter()
+    try:
+        resultado = func(reporter, *args, **kwargs)
+    except Exception as e:
+        logger.exception(f"Tarea {reporter.estado['nombre']} ({reporter.job_id}) falló")
+        reporter.update(estado=ERROR, error=str(e), finalizado=time.time())
+    else:
+        reporter.update(estado=COMPLETADO, resultado=resultado, finalizado=time.time())
+    finally:
+        with _activas_lock:
+            _activas.pop(reporter.job_id, None)
+        DURACION_TAREA.observar(
+            time.perf_counter() - inicio, job=reporter.estado['nombre'], estado=reporter.estado['estado'],
+        )
+        # Los hilos del pool no pasan por el ciclo request/response de Django,
+        # por lo que deben cerrar su propia conexión a la base de datos.
+        if en_hilo:
+            connection.close()
+
+
+def submit_job(nombre, func, *args, owner=None, roles=(), **kwargs):
+    """
+    Encola ``func(reporter, *args, **kwargs)`` en el pool de tareas.
+
+    Args:
+        nombre: Identificador legible de la tarea (para logs y UI)
+        func: Callable que recibe un JobReporter como primer argumento
+        owner: Usuario que lanza la tarea; solo él (o un ADMIN) puede consultarla
+        roles: Roles adicionales que pueden consultar la tarea y su archivo
+
+    Returns:
+        str: ID de la tarea
+    """
+    job_id = uuid.uuid4().hex
+    reporter = JobReporter(job_id, {
+        'id': job_id,
+        'nombre': nombre,
+        'estado': PENDIENTE,
+        'progreso': 0,
+        'total': None,
+        'mensaje': '',
+        'resultado': None,
+        'error': None,
+        'owner_id': getattr(owner, 'pk', None),
+        'roles': list(roles),
+        'creado': time.time(),
+    })
+    Tarea.objects.create(
+        id=job_id, nombre=nombre, estado=PENDIENTE, datos=reporter.estado, latido=timezone.now(),
+    )
+    _limpiar_archivos()
+    with _activas_lock:
+        _activas[job_id] = reporter
+
+    if _run_sync():
+        _ejecutar(reporter, func, args, kwargs, en_hilo=False)
+    else:
+        _iniciar_latidos()
+        _get_executor().submit(_ejecutar, reporter, func, args, kwargs, True)
+    return job_id
+
+
+def puede_ver(job, user):
+    """Indica si ``user`` puede consultar el estado y el archivo de la tarea."""
+    return job['owner_id'] == user.pk or user.role == 'ADMIN' or user.role in job.get('roles', ())
+
+
+# ---------------------------------------------------------------------------
+# Archivos resultado
+# ---------------------------------------------------------------------------
+
+def _artifacts_dir():
+    # Fuera de MEDIA_ROOT: serve_media expone todo lo que está bajo media/
+    directorio = getattr(settings, 'JOB_ARTIFACTS_DIR', None) or os.path.join(tempfile.gettempdir(), 'sgpal_jobs')
+    os.makedirs(directorio, exist_ok=True)
+    return directorio
+
+
+def artifact_path(job_id):
+    """Ruta del archivo resultado de una tarea (uno por tarea)."""
+    return os.path.join(_artifacts_dir(), job_id)
+
+
+def archivo_resultado(job_id, nombre, content_type):
+    """Resultado estándar de una tarea que generó un archivo en ``artifact_path``."""
+    return {
+        'archivo': nombre,
+        'content_type': content_type,
+        'tamano': os.path.getsize(artifact_path(job_id)),
+    }
+
+
+def guardar_archivo(job_id, nombre, contenido, content_type):
+    """Escribe ``contenido`` como archivo resultado de la tarea."""
+    with open(artifact_path(job_id), 'wb') as f:
+        f.write(contenido)
+    return archivo_resultado(job_id, nombre, content_type)
+
+
+def _limpiar_archivos():
+    """Elimina tareas y archivos resultado más antiguos que JOB_TTL."""
+    Tarea.objects.filter(creado__lt=timezone.now() - timedelta(seconds=JOB_TTL)).delete()
+    limite = time.time() - JOB_TTL
+    try:
+        with os.scandir(_artifacts_dir()) as entradas:
+            for entrada in entradas:
+                if entrada.is_file() and entrada.stat().st_mtime < limite:
+                    os.remove(entrada.path)
+    except OSError as e:
+        logger.warning(f"No se pudieron limpiar archivos de tareas: {e}")
+
+
+def job_message_tags(job_id):
+    """
+    extra_tags para un mensaje de django.contrib.messages asociado a una tarea.
+
+    La plantilla base detecta el prefijo ``job:`` y consulta el progreso.
+    """
+    return f'job:{job_id}'
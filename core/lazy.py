@@ -0,0 +1,53 @@
+"""
+Importación diferida de dependencias pesadas.
+
+openpyxl, xlrd y pypdf solo se usan en unas pocas vistas, pero al importarse
+a nivel de módulo cada worker los carga al arrancar aunque solo atienda
+logins. ``importar_diferido`` devuelve un sustituto del módulo que lo importa
+en el primer acceso a un atributo, por lo que el código que lo usa no cambia::
+
+    openpyxl = importar_diferido('openpyxl')
+    ...
+    wb = openpyxl.load_workbook(archivo)   # aquí se importa openpyxl
+
+WeasyPrint ya se importa al renderizar (core.pdf) y psutil al leer métricas
+(core.metrics).
+"""
+import importlib
+import importlib.util
+import types
+
+
+class ModuloDiferido(types.ModuleType):
+    """Sustituto de un módulo que lo importa al primer acceso."""
+
+    def __init__(self, nombre):
+        super().__init__(nombre)
+        self.__dict__['_modulo'] = None
+
+    def _cargar(self):
+        modulo = self.__dict__['_modulo']
+        if modulo is None:
+            modulo = importlib.import_module(self.__name__)
+            self.__dict__['_modulo'] = modulo
+        return modulo
+
+    def __getattr__(self, atributo):
+        return getattr(self._cargar(), atributo)
+
+    def __repr__(self):
+        estado = 'cargado' if self.__dict__['_modulo'] is not None else 'sin cargar'
+        return f'<módulo diferido {self.__name__!r} ({estado})>'
+
+
+def importar_diferido(nombre):
+    """Sustituto de ``import nombre`` que importa recién en el primer uso."""
+    return ModuloDiferido(nombre)
+
+
+def disponible(nombre):
+    """Si el módulo está instalado, sin importarlo."""
+    try:
+        return importlib.util.find_spec(nombre) is not None
+    except (ImportError, ValueError):
+        return False
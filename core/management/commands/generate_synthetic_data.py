@@ -0,0 +1,69 @@
+"""
+Genera un conjunto de datos sintético para pruebas de escala.
+Ejecutar con: python manage.py generate_synthetic_data [--funcionarios 1000 --anios 5 --seed 42]
+
+Los datos son deterministas para los mismos argumentos (incluido --hasta).
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.synthetic import GeneradorSintetico, limpiar_datos_sinteticos, PREFIJO, PASSWORD
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = 'Genera funcionarios, asistencia, permisos, licencias, equipos, logs y liquidaciones sintéticos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--funcionarios', type=int, default=1000, help='Cantidad de funcionarios (por defecto 1000)')
+        parser.add_argument('--anios', type=int, default=5, help='Años de historia (por defecto 5)')
+        parser.add_argument('--seed', type=int, default=42, help='Semilla aleatoria (por defecto 42)')
+        parser.add_argument('--hasta', type=date.fromisoformat, help='Último día con datos, AAAA-MM-DD (por defecto hoy)')
+        parser.add_argument(
+            '--liquidaciones-meses',
+            type=int,
+            default=3,
+            help='Meses recientes con liquidación PDF por funcionario (por defecto 3)',
+        )
+        parser.add_argument(
+            '--limpiar',
+            action='store_true',
+            help='Eliminar los datos sintéticos existentes antes de generar',
+        )
+        parser.add_argument(
+            '--solo-limpiar',
+            action='store_true',
+            help='Eliminar los datos sintéticos existentes sin generar nuevos',
+        )
+
+    def handle(self, *args, **options):
+        escribir = lambda mensaje: self.stdout.write(f'  {mensaje}')  # noqa: E731
+
+        if options['limpiar'] or options['solo_limpiar']:
+            self.stdout.write('🧹 Eliminando datos sintéticos existentes...')
+            limpiar_datos_sinteticos(salida=escribir)
+            if options['solo_limpiar']:
+                return
+
+        if CustomUser.objects.filter(username__startswith=PREFIJO).exists():
+            raise CommandError('Ya existen datos sintéticos (use --limpiar para regenerarlos)')
+
+        self.stdout.write(
+            f"🔄 Generando {options['funcionarios']} funcionarios con {options['anios']} años de historia "
+            f"(seed {options['seed']})..."
+        )
+        resultado = GeneradorSintetico(
+            funcionarios=options['funcionarios'],
+            anios=options['anios'],
+            seed=options['seed'],
+            hasta=options['hasta'],
+            liquidaciones_meses=options['liquidaciones_meses'],
+            salida=escribir,
+        ).generar()
+
+        total = sum(resultado.filas.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {total} filas generadas en {resultado.segundos:.1f}s '
+            f'(usuarios {PREFIJO}00000..., contraseña "{PASSWORD}")'
+        ))
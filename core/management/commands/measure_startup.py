@@ -0,0 +1,62 @@
+"""
+Mide el arranque en frío de un worker (tiempo de importación y RSS).
+Ejecutar con: python manage.py measure_startup [--repeticiones 3]
+
+Cada medición usa un intérprete nuevo con ``python -X importtime``; se
+informa la mediana y, con --baseline, se compara contra una medición
+anterior guardada con --salida.
+"""
+import os
+import statistics
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.arranque import PESADAS, medir_arranque
+from benchmarks.runner import cargar, comparar, guardar
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de importación y la memoria de un worker recién iniciado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=3, help='Procesos medidos (por defecto 3)')
+        parser.add_argument('--top', type=int, default=10, help='Paquetes más lentos a mostrar')
+        parser.add_argument('--salida', help='Guardar el resultado en este archivo JSON')
+        parser.add_argument('--baseline', help='Comparar contra un resultado guardado')
+        parser.add_argument('--tolerancia', type=float, default=0.25)
+
+    def handle(self, *args, **options):
+        try:
+            mediciones = [
+                medir_arranque(options['top'], directorio=settings.BASE_DIR)
+                for _ in range(max(1, options['repeticiones']))
+            ]
+        except RuntimeError as e:
+            raise CommandError(f'El worker no pudo arrancar: {e}')
+
+        resultado = dict(mediciones[-1])
+        resultado['wall_s'] = statistics.median(m['wall_s'] for m in mediciones)
+        resultado['peak_mem_mb'] = statistics.median(m['peak_mem_mb'] for m in mediciones)
+
+        self.stdout.write(f"⏱️  Arranque: {resultado['wall_s']:.3f}s  RSS: {resultado['peak_mem_mb']:.1f}MB  "
+                          f"Módulos: {resultado['modulos']}")
+        for nombre, ms in resultado['paquetes_ms'].items():
+            self.stdout.write(f'   {nombre:<28}{ms:>9.1f} ms')
+
+        cargadas = resultado['pesadas_cargadas']
+        if cargadas:
+            self.stdout.write(self.style.WARNING(f"⚠️ Dependencias pesadas cargadas al arrancar: {', '.join(cargadas)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Sin dependencias pesadas al arrancar ({', '.join(PESADAS)})"))
+
+        documento = {'escenarios': {'arranque_worker': resultado}}
+        if options['salida']:
+            guardar(documento, options['salida'])
+            self.stdout.write(f"📄 Resultado en {options['salida']}")
+
+        if options['baseline']:
+            if not os.path.exists(options['baseline']):
+                raise CommandError(f"No existe {options['baseline']}")
+            for r in comparar(documento, cargar(options['baseline']), options['tolerancia']):
+                self.stdout.write(self.style.ERROR(f"❌ {r['metrica']}: {r['base']} → {r['actual']}"))
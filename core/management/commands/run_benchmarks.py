@@ -0,0 +1,103 @@
+"""
+Ejecuta los benchmarks de rendimiento sobre el conjunto de datos sintético.
+Ejecutar con: python manage.py run_benchmarks [--repeticiones 3] [--solo reportes]
+
+Requiere datos generados con generate_synthetic_data. Los resultados se
+guardan en JSON y se comparan con la línea base (benchmarks/baseline.json).
+"""
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from benchmarks.runner import cargar, comparar, ejecutar_escenarios, guardar
+from benchmarks.scenarios import BenchmarkError, construir_escenarios
+
+BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = 'Mide las vistas e importaciones críticas y compara contra la línea base'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=3, help='Ejecuciones medidas por escenario (por defecto 3)')
+        parser.add_argument('--solo', nargs='+', metavar='ESCENARIO', help='Ejecutar solo estos escenarios')
+        parser.add_argument('--salida', default='benchmark_resultados.json', help='Archivo JSON de resultados')
+        parser.add_argument('--baseline', default=str(BASELINE), help='Archivo JSON de línea base')
+        parser.add_argument(
+            '--tolerancia',
+            type=float,
+            default=0.25,
+            help='Variación admitida en tiempo y memoria antes de marcar regresión (por defecto 0.25)',
+        )
+        parser.add_argument(
+            '--actualizar-baseline',
+            action='store_true',
+            help='Guardar los resultados como nueva línea base',
+        )
+        parser.add_argument(
+            '--estricto',
+            action='store_true',
+            help='Terminar con error si hay regresiones',
+        )
+
+    def handle(self, *args, **options):
+        # Permite al cliente de pruebas usar 'testserver' y capturar contextos
+        setup_test_environment()
+        try:
+            resultados = self.medir(options)
+        finally:
+            teardown_test_environment()
+
+        guardar(resultados, options['salida'])
+        self.stdout.write(f"📄 Resultados en {options['salida']}")
+
+        if options['actualizar_baseline']:
+            guardar(resultados, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f"✅ Línea base actualizada: {options['baseline']}"))
+            return
+
+        if not os.path.exists(options['baseline']):
+            self.stdout.write(self.style.WARNING('⚠️ Sin línea base (use --actualizar-baseline para crearla)'))
+            return
+
+        regresiones = comparar(resultados, cargar(options['baseline']), options['tolerancia'])
+        if not regresiones:
+            self.stdout.write(self.style.SUCCESS('✅ Sin regresiones respecto de la línea base'))
+            return
+
+        for r in regresiones:
+            variacion = f" ({r['variacion']:+.0%})" if r['variacion'] is not None else ''
+            self.stdout.write(self.style.ERROR(
+                f"❌ {r['escenario']}.{r['metrica']}: {r['base']} → {r['actual']}{variacion}"
+            ))
+        if options['estricto']:
+            raise CommandError(f'{len(regresiones)} regresiones respecto de la línea base')
+
+    def medir(self, options):
+        try:
+            escenarios = construir_escenarios()
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        if options['solo']:
+            desconocidos = set(options['solo']) - {e.nombre for e in escenarios}
+            if desconocidos:
+                raise CommandError(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+            escenarios = [e for e in escenarios if e.nombre in options['solo']]
+
+        self.stdout.write(f"{'Escenario':<26}{'Tiempo':>10}{'Consultas':>11}{'BD':>9}{'Memoria':>10}{'Filas/s':>11}")
+
+        def informar(nombre, m):
+            filas_s = f"{m['filas_por_s']:.0f}" if m['filas_por_s'] else '-'
+            self.stdout.write(
+                f"{nombre:<26}{m['wall_s']:>9.3f}s{m['queries']:>11}{m['db_s']:>8.3f}s"
+                f"{m['peak_mem_mb']:>8.1f}MB{filas_s:>11}"
+            )
+
+        try:
+            return ejecutar_escenarios(escenarios, options['repeticiones'], informar)
+        except BenchmarkError as e:
+            raise CommandError(str(e))
@@ -0,0 +1,443 @@
+"""
+Métricas de rendimiento por vista.
+
+``MetricasRequestMiddleware`` (core.middleware) mide cada request y las
+acumula aquí, en memoria y por proceso: cantidad de requests, latencia, número
+de consultas y tiempo en base de datos por vista. Cada
+``REQUEST_METRICS_FLUSH_SECONDS`` el resumen se escribe en el logger
+``performance`` (una línea INFO con el total y el detalle por vista en DEBUG)
+y se reinicia.
+
+Las consultas se cuentan con ``connection.execute_wrapper``, que no depende de
+DEBUG. Para los requests lentos se agrupan las consultas por huella (el SQL
+sin literales), lo que deja a la vista los patrones N+1.
+
+Además se mantienen histogramas y contadores acumulados (latencia por vista,
+duración de tareas, tiempo de render PDF) que ``MetricsView`` expone en
+formato de texto de Prometheus, junto a los valores de ``EstadoSistema``:
+CPU, memoria, disco, estado de la base de datos y contadores de la
+aplicación, que se refrescan en un hilo de fondo y no en cada consulta.
+"""
+import atexit
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger('performance')
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+_RE_LISTA = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+_RE_ESPACIOS = re.compile(r'\s+')
+
+
+def huella_sql(sql):
+    """
+    SQL normalizado para agrupar consultas equivalentes.
+
+    Reemplaza literales por ``?`` y colapsa las listas ``IN (...)``, de modo
+    que la misma consulta con distintos parámetros tenga la misma huella.
+    """
+    sql = _RE_STRING.sub('?', sql)
+    sql = _RE_NUMERO.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _RE_LISTA.sub('(...)', sql)
+    return _RE_ESPACIOS.sub(' ', sql).strip()
+
+
+class ConsultasRequest:
+    """
+    Wrapper de ``connection.execute_wrapper`` que mide las consultas de un request.
+
+    Cuenta el SQL de cada consulta (sin parámetros); las huellas se calculan
+    solo si el request resulta lento.
+    """
+
+    def __init__(self):
+        self.cantidad = 0
+        self.segundos = 0.0
+        self.sql = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.cantidad += 1
+            self.sql[sql] += 1
+
+    def repetidas(self, limite=5):
+        """Las huellas más repetidas: [(huella, veces), ...] con más de una ejecución."""
+        conteo = Counter()
+        for sql, veces in self.sql.items():
+            conteo[huella_sql(sql)] += veces
+        return [(huella, veces) for huella, veces in conteo.most_common(limite) if veces > 1]
+
+
+@dataclass
+class EstadisticaVista:
+    requests: int = 0
+    segundos: float = 0.0
+    segundos_max: float = 0.0
+    consultas: int = 0
+    consultas_max: int = 0
+    db_segundos: float = 0.0
+    errores: int = 0
+    lentos: int = 0
+
+    def como_dict(self):
+        n = self.requests or 1
+        return {
+            'requests': self.requests,
+            'latencia_media_ms': round(self.segundos / n * 1000, 1),
+            'latencia_max_ms': round(self.segundos_max * 1000, 1),
+            'consultas_media': round(self.consultas / n, 1),
+            'consultas_max': self.consultas_max,
+            'db_ms_media': round(self.db_segundos / n * 1000, 1),
+            'errores': self.errores,
+            'lentos': self.lentos,
+        }
+
+
+class MetricasVistas:
+    """Acumulador de métricas por vista, seguro entre hilos."""
+
+    def __init__(self, intervalo=None):
+        self._lock = threading.Lock()
+        self._vistas = {}
+        self._intervalo = intervalo
+        self._ultimo_vaciado = time.monotonic()
+
+    @property
+    def intervalo(self):
+        if self._intervalo is not None:
+            return self._intervalo
+        return getattr(settings, 'REQUEST_METRICS_FLUSH_SECONDS', 60)
+
+    def registrar(self, vista, segundos, consultas, db_segundos, error=False, lento=False):
+        with self._lock:
+            e = self._vistas.setdefault(vista, EstadisticaVista())
+            e.requests += 1
+            e.segundos += segundos
+            e.segundos_max = max(e.segundos_max, segundos)
+            e.consultas += consultas
+            e.consultas_max = max(e.consultas_max, consultas)
+            e.db_segundos += db_segundos
+            e.errores += int(error)
+            e.lentos += int(lento)
+            vaciar = time.monotonic() - self._ultimo_vaciado >= self.intervalo
+        if vaciar:
+            self.vaciar()
+
+    def instantanea(self):
+        """Estadísticas acumuladas desde el último vaciado, por vista."""
+        with self._lock:
+            return {vista: e.como_dict() for vista, e in self._vistas.items()}
+
+    def vaciar(self):
+        """Escribe el resumen en el log y reinicia los acumuladores."""
+        with self._lock:
+            vistas, self._vistas = self._vistas, {}
+            self._ultimo_vaciado = time.monotonic()
+        if not vistas:
+            return vistas
+
+        # Primero las vistas que más tiempo total consumieron
+        ordenadas = sorted(vistas.items(), key=lambda item: -item[1].segundos)
+        if logger.isEnabledFor(logging.DEBUG):
+            for vista, e in ordenadas:
+                logger.debug('metricas vista=%s %s', vista, _formatear(e))
+        total = EstadisticaVista()
+        for e in vistas.values():
+            total.requests += e.requests
+            total.segundos += e.segundos
+            total.segundos_max = max(total.segundos_max, e.segundos_max)
+            total.consultas += e.consultas
+            total.consultas_max = max(total.consultas_max, e.consultas_max)
+            total.db_segundos += e.db_segundos
+            total.errores += e.errores
+            total.lentos += e.lentos
+        logger.info('metricas vistas=%d %s mas_costosa=%s', len(vistas), _formatear(total), ordenadas[0][0])
+        return vistas
+
+
+def _formatear(estadistica):
+    return ' '.join(f'{k}={v}' for k, v in estadistica.como_dict().items())
+
+
+metricas = MetricasVistas()
+# Lo acumulado desde el último vaciado no se pierde al detener el worker
+atexit.register(metricas.vaciar)
+
+
+# ---------------------------------------------------------------------------
+# Exposición en formato Prometheus
+# ---------------------------------------------------------------------------
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(pares):
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in pares) + '}'
+
+
+def _numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador acumulado por combinación de etiquetas."""
+
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def _clave(self, etiquetas):
+        return tuple((k, etiquetas[k]) for k in self.etiquetas)
+
+    def incrementar(self, valor=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + valor
+
+    def lineas(self):
+        with self._lock:
+            valores = dict(self._valores)
+        for clave, valor in sorted(valores.items()):
+            yield f'{self.nombre}{_etiquetas(clave)} {_numero(valor)}'
+
+
+class Histograma(Contador):
+    """Histograma acumulado (buckets, suma y cantidad) por combinación de etiquetas."""
+
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            conteos, suma = self._valores.get(clave, ([0] * len(self.buckets), 0.0))
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    conteos[i] += 1
+            self._valores[clave] = (conteos, suma + valor)
+
+    def lineas(self):
+        with self._lock:
+            valores = {clave: (list(c), s) for clave, (c, s) in self._valores.items()}
+        for clave, (conteos, suma) in sorted(valores.items()):
+            for limite, conteo in zip(self.buckets, conteos):
+                yield f'{self.nombre}_bucket{_etiquetas(clave + (("le", _numero(limite)),))} {conteo}'
+            yield f'{self.nombre}_sum{_etiquetas(clave)} {_numero(suma)}'
+            yield f'{self.nombre}_count{_etiquetas(clave)} {conteos[-1]}'
+
+
+DURACION_REQUEST = Histograma(
+    'sgpal_request_duration_seconds', 'Latencia de los requests por vista', ('view',),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+CONSULTAS_REQUEST = Contador(
+    'sgpal_request_queries_total', 'Consultas SQL ejecutadas por vista', ('view',),
+)
+DB_REQUEST = Contador(
+    'sgpal_request_db_seconds_total', 'Tiempo en base de datos por vista', ('view',),
+)
+DURACION_TAREA = Histograma(
+    'sgpal_job_duration_seconds', 'Duración de las tareas en segundo plano', ('job', 'estado'),
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800),
+)
+DURACION_PDF = Histograma(
+    'sgpal_pdf_render_seconds', 'Tiempo de render PDF (incluye la espera en el pool)',
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60),
+)
+REGISTRO = [DURACION_REQUEST, CONSULTAS_REQUEST, DB_REQUEST, DURACION_TAREA, DURACION_PDF]
+
+
+CONTADORES_CACHE_KEY = 'metricas:contadores_aplicacion'
+
+
+def _contadores_aplicacion():
+    from liquidaciones.models import Liquidacion
+    from permisos.models import SolicitudPermiso
+    from users.models import CustomUser
+
+    hoy = timezone.localdate()
+    return {
+        'users_total': CustomUser.objects.count(),
+        'users_active_today': CustomUser.objects.filter(last_login__date=hoy).count(),
+        'payrolls_total': Liquidacion.objects.count(),
+        'payrolls_this_month': Liquidacion.objects.filter(mes=hoy.month, anio=hoy.year).count(),
+        'permissions_total': SolicitudPermiso.objects.count(),
+        'permissions_pending': SolicitudPermiso.objects.filter(estado='PENDIENTE').count(),
+    }
+
+
+def _estado_base_datos():
+    inicio = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        conexiones = {}
+        max_conexiones = None
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT COALESCE(state, 'desconocido'), COUNT(*) FROM pg_stat_activity "
+                "WHERE datname = current_database() GROUP BY 1"
+            )
+            conexiones = dict(cursor.fetchall())
+            cursor.execute("SELECT setting::int FROM pg_settings WHERE name = 'max_connections'")
+            max_conexiones = cursor.fetchone()[0]
+    return {
+        'ping_seconds': time.perf_counter() - inicio,
+        'conexiones': conexiones,
+        'max_conexiones': max_conexiones,
+    }
+
+
+def _sistema():
+    import psutil
+
+    memoria = psutil.virtual_memory()
+    disco = psutil.disk_usage('/')
+    return {
+        # Sin intervalo: porcentaje desde la medición anterior, no bloquea
+        'cpu_percent': psutil.cpu_percent(interval=None),
+        'memory': {'total': memoria.total, 'available': memoria.available, 'percent': memoria.percent},
+        'disk': {'total': disco.total, 'free': disco.free, 'percent': disco.percent},
+    }
+
+
+class EstadoSistema:
+    """
+    Valores costosos de obtener, refrescados en un hilo de fondo.
+
+    El hilo se inicia con la primera lectura (después del fork de gunicorn) y
+    refresca cada METRICS_REFRESH_SECONDS; con 0 no hay hilo y cada lectura
+    refresca los valores (tests, diagnóstico). Los contadores de la aplicación se
+    comparten entre workers a través de la caché para no repetir las
+    consultas en cada proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datos = None
+        self._hilo = None
+
+    @property
+    def intervalo(self):
+        return getattr(settings, 'METRICS_REFRESH_SECONDS', 30)
+
+    def refrescar(self):
+        datos = {'actualizado': time.time()}
+        try:
+            datos['database'] = {'up': 1, **_estado_base_datos()}
+        except Exception as e:
+            logger.warning('No se pudo consultar el estado de la base de datos: %s', e)
+            datos['database'] = {'up': 0, 'error': str(e)}
+        try:
+            datos['metrics'] = cache.get_or_set(CONTADORES_CACHE_KEY, _contadores_aplicacion, self.intervalo)
+        except Exception as e:
+            datos['metrics'] = {'error': str(e)}
+        try:
+            datos['system'] = _sistema()
+        except Exception as e:
+            datos['system'] = {'error': str(e)}
+        with self._lock:
+            self._datos = datos
+        return datos
+
+    def _bucle(self):
+        while True:
+            try:
+                self.refrescar()
+            finally:
+                connection.close()
+            time.sleep(self.intervalo)
+
+    def instantanea(self):
+        """Últimos valores; la primera llamada los calcula y arranca el hilo."""
+        if self.intervalo <= 0:
+            return self.refrescar()
+        with self._lock:
+            datos = self._datos
+            iniciar = self._hilo is None
+            if iniciar:
+                self._hilo = threading.Thread(target=self._bucle, name='metricas-estado', daemon=True)
+        if datos is None:
+            datos = self.refrescar()
+        if iniciar:
+            self._hilo.start()
+        return datos
+
+
+estado_sistema = EstadoSistema()
+
+
+def _gauges(datos):
+    """Líneas de métricas instantáneas a partir del estado del sistema."""
+    def gauge(nombre, ayuda, valores):
+        yield f'# HELP {nombre} {ayuda}'
+        yield f'# TYPE {nombre} gauge'
+        for etiquetas, valor in valores:
+            yield f'{nombre}{_etiquetas(etiquetas)} {_numero(valor)}'
+
+    base = datos.get('database', {})
+    yield from gauge('sgpal_db_up', 'La base de datos responde', [((), base.get('up', 0))])
+    if 'ping_seconds' in base:
+        yield from gauge('sgpal_db_ping_seconds', 'Latencia de SELECT 1', [((), base['ping_seconds'])])
+    conexiones = base.get('conexiones') or {}
+    if conexiones:
+        yield from gauge(
+            'sgpal_db_connections', 'Conexiones a la base de datos por estado (pg_stat_activity)',
+            [((('state', estado),), n) for estado, n in sorted(conexiones.items())],
+        )
+    if base.get('max_conexiones') is not None:
+        yield from gauge(
+            'sgpal_db_max_connections', 'Límite de conexiones del servidor (max_connections)',
+            [((), base['max_conexiones'])],
+        )
+
+    contadores = datos.get('metrics', {})
+    valores = [((('name', k),), v) for k, v in sorted(contadores.items()) if isinstance(v, (int, float))]
+    if valores:
+        yield from gauge('sgpal_app_count', 'Contadores de la aplicación', valores)
+
+    sistema = datos.get('system', {})
+    if 'cpu_percent' in sistema:
+        yield from gauge('sgpal_cpu_percent', 'Uso de CPU del host', [((), sistema['cpu_percent'])])
+        yield from gauge('sgpal_memory_available_bytes', 'Memoria disponible', [((), sistema['memory']['available'])])
+        yield from gauge('sgpal_disk_free_bytes', 'Espacio libre en disco', [((), sistema['disk']['free'])])
+
+    yield from gauge('sgpal_metrics_refreshed_timestamp_seconds', 'Último refresco del estado', [((), datos['actualizado'])])
+
+
+def exposicion():
+    """Texto en formato de exposición de Prometheus (text/plain 0.0.4)."""
+    lineas = []
+    for metrica in REGISTRO:
+        lineas.append(f'# HELP {metrica.nombre} {metrica.ayuda}')
+        lineas.append(f'# TYPE {metrica.nombre} {metrica.tipo}')
+        lineas.extend(metrica.lineas())
+    lineas.extend(_gauges(estado_sistema.instantanea()))
+    return '\n'.join(lineas) + '\n'
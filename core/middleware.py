@@ -1,4 +1,15 @@
+import logging
+import time
+
 from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+
+from .metrics import ConsultasRequest, metricas, DURACION_REQUEST, CONSULTAS_REQUEST, DB_REQUEST
+from .pdf import PDFRenderTimeout
+
+logger = logging.getLogger('performance')
+
 
 class CSPMiddleware:
     def __init__(self, get_response):
@@ -12,3 +23,80 @@ class CSPMiddleware:
             response['Content-Security-Policy'] = settings.SECURE_CONTENT_SECURITY_POLICY
             
         return response
+
+
+class MetricasRequestMiddleware:
+    """
+    Mide latencia, cantidad de consultas y tiempo en base de datos por vista.
+
+    Los valores se acumulan en ``core.metrics.metricas`` (resumen periódico en
+    el log) y en los histogramas expuestos en /metrics. Los requests que
+    superan REQUEST_SLOW_MS o REQUEST_SLOW_QUERIES se registran en el logger
+    ``performance`` junto a sus consultas más repetidas. Las respuestas en
+    streaming se miden hasta que la vista entrega la respuesta.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        consultas = ConsultasRequest()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(consultas):
+            response = self.get_response(request)
+        segundos = time.perf_counter() - inicio
+
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            # Archivos estáticos, 404 de rutas inexistentes, etc.
+            return response
+        vista = match.view_name or match._func_path
+
+        lento = (
+            segundos * 1000 >= getattr(settings, 'REQUEST_SLOW_MS', 1000)
+            or consultas.cantidad >= getattr(settings, 'REQUEST_SLOW_QUERIES', 100)
+        )
+        if lento:
+            repetidas = '; '.join(f'{veces}x {huella[:200]}' for huella, veces in consultas.repetidas())
+            logger.warning(
+                'Request lento %s %s vista=%s ms=%.0f consultas=%d db_ms=%.0f repetidas=[%s]',
+                request.method, request.path, vista, segundos * 1000,
+                consultas.cantidad, consultas.segundos * 1000, repetidas,
+            )
+
+        metricas.registrar(
+            vista, segundos, consultas.cantidad, consultas.segundos,
+            error=response.status_code >= 500, lento=lento,
+        )
+        DURACION_REQUEST.observar(segundos, view=vista)
+        CONSULTAS_REQUEST.incrementar(consultas.cantidad, view=vista)
+        DB_REQUEST.incrementar(consultas.segundos, view=vista)
+        return response
+
+
+class PDFTimeoutMiddleware:
+    """
+    Responde 503 con un mensaje claro cuando una vista no logra generar un PDF
+    dentro de PDF_RENDER_TIMEOUT (``core.pdf.PDFRenderTimeout``), en lugar de
+    un error 500 genérico.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, PDFRenderTimeout):
+            return None
+        logger.warning('PDF no generado a tiempo %s %s: %s', request.method, request.path, exception)
+        return HttpResponse(
+            'El documento está tardando demasiado en generarse. '
+            'Intente nuevamente en unos minutos o acote los filtros del reporte.',
+            status=503,
+            content_type='text/plain; charset=utf-8',
+        )
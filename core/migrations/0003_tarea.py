@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-19 19:11
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.CharField(editable=False, max_length=32, primary_key=True, serialize=False)),
+                ('nombre', models.CharField(max_length=100)),
+                ('estado', models.CharField(max_length=20)),
+                ('datos', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('creado', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('latido', models.DateTimeField()),
+            ],
+        ),
+    ]
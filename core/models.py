@@ -1,4 +1,5 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.conf import settings
 
 class AuditLog(models.Model):
@@ -10,3 +11,24 @@ class AuditLog(models.Model):
 
     def __str__(self):
         return f"{self.timestamp} - {self.actor} - {self.action}"
+
+
+class Tarea(models.Model):
+    """
+    Estado de una tarea en segundo plano (core.jobs).
+
+    Se guarda en la base de datos para que cualquier worker de gunicorn pueda
+    responder la consulta de progreso, no solo el que ejecuta la tarea. El
+    worker que la ejecuta renueva ``latido`` periódicamente; si deja de
+    hacerlo (el proceso terminó), la tarea se marca como ERROR al consultarla.
+    """
+    id = models.CharField(primary_key=True, max_length=32, editable=False)
+    nombre = models.CharField(max_length=100)
+    estado = models.CharField(max_length=20)
+    # Estado completo publicado por la tarea (progreso, mensaje, resultado, ...)
+    datos = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    creado = models.DateTimeField(auto_now_add=True, db_index=True)
+    latido = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.nombre} ({self.id}) - {self.estado}"
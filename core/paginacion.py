@@ -0,0 +1,146 @@
+"""
+Paginación por cursor (keyset) y conteo aproximado para tablas grandes.
+
+``Paginator`` de Django hace ``COUNT(*)`` sobre todo el filtro en cada página
+y salta filas con OFFSET, por lo que la página N cuesta proporcional a N.
+Aquí cada página se pide con la condición ``(campo, id) < cursor`` sobre el
+orden descendente ``(-campo, -id)``, escrita como rango sobre ``campo``
+(``campo <= valor`` excluyendo los empates ya mostrados) para que el índice
+sobre ``campo`` la resuelva: el costo es el mismo para la primera página que
+para la última.
+
+El cursor es opaco para la plantilla (base64 de ``valor|id``). Se navega a la
+primera página, a la anterior, a la siguiente y a la última, pero no a una
+página arbitraria por número.
+"""
+import base64
+import binascii
+from dataclasses import dataclass
+
+from django.db import connection
+from django.utils.dateparse import parse_datetime
+
+# Sobre este número de filas el conteo se informa como "más de"
+LIMITE_CONTEO = 10000
+
+
+def codificar_cursor(valor, pk):
+    return base64.urlsafe_b64encode(f'{valor.isoformat()}|{pk}'.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """
+    Returns:
+        tuple: (datetime, pk)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        valor, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        fecha = parse_datetime(valor)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise ValueError(f'Cursor inválido: {cursor!r}') from e
+    if fecha is None:
+        raise ValueError(f'Cursor inválido: {cursor!r}')
+    return fecha, pk
+
+
+@dataclass
+class PaginaCursor:
+    """Página de resultados y cursores para navegar a las vecinas."""
+    objetos: list
+    siguiente: str = None
+    anterior: str = None
+    es_primera: bool = True
+    es_ultima: bool = True
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    @property
+    def tiene_otras(self):
+        return not (self.es_primera and self.es_ultima)
+
+
+def paginar_por_cursor(queryset, por_pagina, despues=None, antes=None, ultima=False, campo='timestamp'):
+    """
+    Página del queryset en orden descendente por ``(campo, pk)``.
+
+    Args:
+        despues: Cursor; devuelve las filas siguientes (más antiguas)
+        antes: Cursor; devuelve las filas anteriores (más recientes)
+        ultima: Devuelve la última página (las filas más antiguas)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    if antes or ultima:
+        # Se recorre en orden ascendente desde el cursor (o desde el final)
+        qs = queryset.order_by(campo, 'pk')
+        if antes:
+            valor, pk = decodificar_cursor(antes)
+            qs = qs.filter(**{f'{campo}__gte': valor}).exclude(**{campo: valor, 'pk__lte': pk})
+        filas = list(qs[:por_pagina + 1])
+        hay_mas = len(filas) > por_pagina
+        filas = filas[:por_pagina][::-1]
+        es_primera, es_ultima = not hay_mas, bool(ultima)
+    else:
+        qs = queryset.order_by(f'-{campo}', '-pk')
+        if despues:
+            valor, pk = decodificar_cursor(despues)
+            qs = qs.filter(**{f'{campo}__lte': valor}).exclude(**{campo: valor, 'pk__gte': pk})
+        filas = list(qs[:por_pagina + 1])
+        hay_mas = len(filas) > por_pagina
+        filas = filas[:por_pagina]
+        es_primera, es_ultima = not despues, not hay_mas
+
+    pagina = PaginaCursor(filas, es_primera=es_primera, es_ultima=es_ultima)
+    if filas and not es_ultima:
+        pagina.siguiente = codificar_cursor(getattr(filas[-1], campo), filas[-1].pk)
+    if filas and not es_primera:
+        pagina.anterior = codificar_cursor(getattr(filas[0], campo), filas[0].pk)
+    return pagina
+
+
+@dataclass
+class Conteo:
+    valor: int
+    estimado: bool = False
+    truncado: bool = False
+
+    def __str__(self):
+        texto = f'{self.valor:,}'.replace(',', '.')
+        if self.truncado:
+            return f'más de {texto}'
+        if self.estimado:
+            return f'≈ {texto}'
+        return texto
+
+
+def conteo_aproximado(queryset, limite=LIMITE_CONTEO):
+    """
+    Total de filas sin recorrer toda la tabla.
+
+    Sin filtros y en PostgreSQL se usa la estimación del planificador
+    (``pg_class.reltuples``, actualizada por autovacuum); con filtros se
+    cuenta hasta ``limite`` filas.
+    """
+    if not queryset.query.where and connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            fila = cursor.fetchone()
+        if fila and fila[0] > limite:
+            return Conteo(fila[0], estimado=True)
+        # Tabla sin analizar (-1) o con pocas filas: el conteo acotado es barato
+    total = queryset.order_by()[:limite + 1].count()
+    if total > limite:
+        return Conteo(limite, truncado=True)
+    return Conteo(total)
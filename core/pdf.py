@@ -0,0 +1,328 @@
+"""
+Servicio de renderizado de PDF con WeasyPrint.
+
+Renderizar con ``HTML(string=...).write_pdf()`` dentro del request repite en
+cada llamada el descubrimiento de fuentes (fontconfig) y el parseo de hojas de
+estilo, y un reporte colectivo grande bloquea el worker de gunicorn.
+
+Este módulo mantiene un pool de procesos de larga vida que inicializan
+WeasyPrint una sola vez (FontConfiguration, caché de imágenes y de CSS
+parseado) y reciben el HTML ya renderizado por Django. Las solicitudes
+idénticas concurrentes se agrupan en un único render.
+
+Uso síncrono (reportes pequeños)::
+
+    pdf = render_pdf(html_string)
+
+Lotes (varios documentos en paralelo)::
+
+    for clave, pdf in render_pdfs((clave, html) for ...):
+        ...
+
+Uso asíncrono (reportes grandes): ``submit_pdf_job`` encola una tarea de
+core.jobs y la vista responde con una página que consulta el estado hasta
+que el archivo está disponible en ``JobFileView``.
+
+Un render que supera PDF_RENDER_TIMEOUT lanza ``PDFRenderTimeout``; en una
+vista, ``core.middleware.PDFTimeoutMiddleware`` lo convierte en una respuesta
+503 con un mensaje para el usuario.
+"""
+import hashlib
+import logging
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, TimeoutError as FuturesTimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import ttl_derivado
+from .metrics import DURACION_PDF
+
+logger = logging.getLogger(__name__)
+
+PDF_RENDER_WORKERS = 2
+PDF_RENDER_TIMEOUT = 180
+
+# Entradas máximas de las cachés de cada proceso worker
+IMAGE_CACHE_SIZE = 64
+CSS_CACHE_SIZE = 32
+
+
+class PDFRenderTimeout(Exception):
+    """El render de un PDF no terminó dentro del tiempo límite."""
+
+
+class CacheLRU(OrderedDict):
+    """Diccionario acotado que descarta la entrada usada hace más tiempo."""
+
+    def __init__(self, maximo):
+        super().__init__()
+        self.maximo = maximo
+
+    def __getitem__(self, clave):
+        valor = super().__getitem__(clave)
+        self.move_to_end(clave)
+        return valor
+
+    def __setitem__(self, clave, valor):
+        super().__setitem__(clave, valor)
+        self.move_to_end(clave)
+        while len(self) > self.maximo:
+            self.popitem(last=False)
+
+
+# ---------------------------------------------------------------------------
+# Lado del proceso worker
+# ---------------------------------------------------------------------------
+
+# Los workers viven mientras viva el pool: las cachés se acotan para que los
+# logos e imágenes de muchos reportes distintos no crezcan sin límite.
+_font_config = None
+_image_cache = CacheLRU(IMAGE_CACHE_SIZE)
+_css_cache = CacheLRU(CSS_CACHE_SIZE)
+
+
+def _init_worker():
+    """Inicializa WeasyPrint una vez por proceso y precalienta fontconfig."""
+    global _font_config
+    from weasyprint import HTML
+    from weasyprint.text.fonts import FontConfiguration
+
+    _font_config = FontConfiguration()
+    HTML(string='<p>.</p>').write_pdf(font_config=_font_config)
+
+
+def _stylesheet(source):
+    """Hoja de estilo parseada, reutilizada entre renders del mismo proceso."""
+    from weasyprint import CSS
+
+    if source in _css_cache:
+        return _css_cache[source]
+    hoja = _css_cache[source] = CSS(string=source, font_config=_font_config)
+    return hoja
+
+
+def _render(html_string, base_url=None, stylesheets=()):
+    from weasyprint import HTML
+
+    return HTML(string=html_string, base_url=base_url).write_pdf(
+        stylesheets=[_stylesheet(s) for s in stylesheets],
+        font_config=_font_config,
+        cache=_image_cache,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Lado del proceso web
+# ---------------------------------------------------------------------------
+
+class PDFRenderService:
+    """
+    Pool de procesos de render con agrupación de solicitudes idénticas.
+
+    Con ``workers=0`` se renderiza en el mismo proceso (tests, entornos sin
+    multiprocessing), manteniendo la misma interfaz.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._en_curso = {}
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn: los procesos no heredan conexiones ni hilos del worker web
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        return self._executor
+
+    def _reiniciar(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def submit(self, html_string, base_url=None, stylesheets=()):
+        """
+        Encola un render y retorna su Future.
+
+        Si ya hay un render en curso con el mismo contenido, se retorna ese
+        mismo Future en lugar de renderizar de nuevo.
+        """
+        stylesheets = tuple(stylesheets)
+        clave = hashlib.sha256(
+            '\0'.join((html_string, base_url or '', *stylesheets)).encode()
+        ).hexdigest()
+
+        with self._lock:
+            futuro = self._en_curso.get(clave)
+            if futuro is not None:
+                return futuro
+            inicio = time.perf_counter()
+            futuro = self._get_executor().submit(_render, html_string, base_url, stylesheets)
+            self._en_curso[clave] = futuro
+
+        def liberar(_futuro):
+            DURACION_PDF.observar(time.perf_counter() - inicio)
+            with self._lock:
+                if self._en_curso.get(clave) is _futuro:
+                    del self._en_curso[clave]
+
+        futuro.add_done_callback(liberar)
+        return futuro
+
+    def render(self, html_string, base_url=None, stylesheets=(), timeout=PDF_RENDER_TIMEOUT):
+        """Renderiza y espera el resultado (bytes del PDF)."""
+        if not self.workers:
+            if _font_config is None:
+                _init_worker()
+            inicio = time.perf_counter()
+            try:
+                return _render(html_string, base_url, tuple(stylesheets))
+            finally:
+                DURACION_PDF.observar(time.perf_counter() - inicio)
+
+        try:
+            return self._esperar(self.submit(html_string, base_url, stylesheets), timeout)
+        except BrokenProcessPool:
+            # Un worker murió (p. ej. OOM): se recrea el pool y se reintenta una vez
+            logger.warning("Pool de render PDF caído; reiniciando")
+            self._reiniciar()
+            return self._esperar(self.submit(html_string, base_url, stylesheets), timeout)
+
+    def _esperar(self, futuro, timeout):
+        try:
+            return futuro.result(timeout=timeout)
+        except FuturesTimeoutError:
+            # Si aún no empezaba se descarta; si ya corre, el worker lo termina
+            # y el resultado se ignora
+            futuro.cancel()
+            logger.error("Render PDF superó el tiempo límite de %s s", timeout)
+            raise PDFRenderTimeout(f'El PDF no se generó en {timeout} segundos')
+
+    def render_varios(self, documentos, base_url=None, stylesheets=(), timeout=PDF_RENDER_TIMEOUT):
+        """
+        Renderiza varios documentos en paralelo en el pool.
+
+        Se mantienen en vuelo a lo más dos renders por worker: los documentos
+        se consumen del iterable a medida que terminan los anteriores y cada
+        PDF se suelta apenas se entrega, así que la memoria no crece con el
+        tamaño del lote.
+
+        Args:
+            documentos: Iterable de pares (clave, html_string)
+
+        Yields:
+            (clave, bytes) en el orden en que terminan los renders
+        """
+        if not self.workers:
+            for clave, html_string in documentos:
+                yield clave, self.render(html_string, base_url, stylesheets)
+            return
+
+        documentos = iter(documentos)
+        ventana = 2 * self.workers
+        # Future -> claves (documentos idénticos comparten el mismo render)
+        pendientes = {}
+        try:
+            while True:
+                for clave, html_string in documentos:
+                    pendientes.setdefault(self.submit(html_string, base_url, stylesheets), []).append(clave)
+                    if len(pendientes) >= ventana:
+                        break
+                if not pendientes:
+                    return
+                listos, _ = wait(pendientes, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not listos:
+                    logger.error("Lote de PDF sin avance en %s s (%d renders en curso)", timeout, len(pendientes))
+                    raise PDFRenderTimeout(f'Ningún PDF del lote terminó en {timeout} segundos')
+                for futuro in listos:
+                    pdf = futuro.result()
+                    for clave in pendientes.pop(futuro):
+                        yield clave, pdf
+        finally:
+            for futuro in pendientes:
+                futuro.cancel()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_pdf_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = PDFRenderService(getattr(settings, 'PDF_RENDER_WORKERS', PDF_RENDER_WORKERS))
+        return _service
+
+
+def render_pdf(html_string, base_url=None, stylesheets=()):
+    """Renderiza un documento HTML a PDF usando el servicio compartido."""
+    return get_pdf_service().render(html_string, base_url, stylesheets)
+
+
+def render_pdfs(documentos, base_url=None, stylesheets=()):
+    """Renderiza pares (clave, html) en paralelo; genera (clave, pdf) al terminar cada uno."""
+    return get_pdf_service().render_varios(documentos, base_url, stylesheets)
+
+
+# ---------------------------------------------------------------------------
+# Tareas asíncronas
+# ---------------------------------------------------------------------------
+
+def _render_job(reporter, generar_html, nombre_archivo, cache_key, cache_timeout):
+    from .jobs import guardar_archivo
+
+    reporter.progress(0, 2, 'Preparando datos...')
+    html_string = generar_html()
+    reporter.progress(1, 2, 'Generando PDF...')
+    pdf = render_pdf(html_string)
+    if cache_key:
+        cache.set(cache_key, pdf, ttl_derivado(cache_timeout))
+    return guardar_archivo(reporter.job_id, nombre_archivo, pdf, 'application/pdf')
+
+
+def submit_pdf_job(generar_html, nombre_archivo, owner, roles=(), cache_key=None, cache_timeout=60 * 30):
+    """
+    Encola la generación de un PDF como tarea en segundo plano.
+
+    Mientras haya una tarea en curso para la misma ``cache_key``, las nuevas
+    solicitudes reciben el ID de esa tarea en lugar de encolar otra.
+
+    Args:
+        generar_html: Callable sin argumentos que retorna el HTML (se ejecuta en la tarea)
+        nombre_archivo: Nombre del PDF para la descarga
+        owner: Usuario que solicita el PDF
+        roles: Roles que pueden consultar la tarea además del owner
+        cache_key: Clave donde guardar el PDF resultante (p. ej. la de reportes)
+
+    Returns:
+        str: ID de la tarea
+    """
+    from .jobs import submit_job, get_job, PENDIENTE, EN_CURSO
+
+    lock_key = f'pdf:en_curso:{cache_key}' if cache_key else None
+    if lock_key:
+        job_id = cache.get(lock_key)
+        job = get_job(job_id) if job_id else None
+        if job and job['estado'] in (PENDIENTE, EN_CURSO) and (
+            job['owner_id'] == owner.pk or owner.role in job.get('roles', ())
+        ):
+            return job_id
+
+    job_id = submit_job(
+        'pdf', _render_job, generar_html, nombre_archivo, cache_key, cache_timeout,
+        owner=owner, roles=roles,
+    )
+    if lock_key:
+        cache.set(lock_key, job_id, PDF_RENDER_TIMEOUT)
+    return job_id
@@ -0,0 +1,72 @@
+"""
+Filtros de período (año/mes) sobre campos de fecha.
+
+``fecha__year=2025`` y ``fecha__month=3`` se compilan a ``EXTRACT(...)`` sobre
+la columna, lo que impide usar índices btree. Estas funciones traducen el
+período a un rango semiabierto ``[desde, hasta)`` que sí aprovecha los índices
+compuestos como (funcionario, fecha) o (estado, fecha).
+
+Los valores suelen venir del query string (``?anio=2025&mes=3``): un período
+inválido (``mes=13``, ``anio=abc``) no debe terminar en un error 500, así que
+``filtro_periodo`` lo traduce a un filtro que no coincide con nada.
+"""
+from datetime import date
+
+from django.db.models import Q
+
+
+def _mes_valido(mes):
+    mes = int(mes)
+    if not 1 <= mes <= 12:
+        raise ValueError(f'Mes fuera de rango: {mes}')
+    return mes
+
+
+def rango_periodo(anio, mes=None):
+    """
+    Retorna el rango semiabierto que cubre un año o un mes.
+
+    Args:
+        anio: Año (int o str)
+        mes: Mes 1-12 opcional (int o str)
+
+    Returns:
+        tuple[date, date]: (desde, hasta) con ``hasta`` excluido
+
+    Raises:
+        ValueError: Si el año o el mes no son enteros válidos
+    """
+    anio = int(anio)
+    if not date.min.year <= anio < date.max.year:
+        raise ValueError(f'Año fuera de rango: {anio}')
+    if not mes:
+        return date(anio, 1, 1), date(anio + 1, 1, 1)
+
+    mes = _mes_valido(mes)
+    if mes == 12:
+        return date(anio, 12, 1), date(anio + 1, 1, 1)
+    return date(anio, mes, 1), date(anio, mes + 1, 1)
+
+
+def filtro_periodo(campo, anio=None, mes=None):
+    """
+    Construye un Q para filtrar ``campo`` por año y/o mes.
+
+    Con año (y opcionalmente mes) se genera ``campo__gte``/``campo__lt``.
+    Un mes sin año no es un rango contiguo, por lo que se mantiene
+    ``campo__month``. Sin año ni mes retorna un Q vacío, y con un período
+    inválido un Q que no coincide con ningún registro.
+
+    Ejemplo:
+        RegistroAsistencia.objects.filter(filtro_periodo('fecha', 2025, 3))
+    """
+    try:
+        if anio:
+            desde, hasta = rango_periodo(anio, mes)
+            return Q(**{f'{campo}__gte': desde, f'{campo}__lt': hasta})
+        if mes:
+            _mes_valido(mes)
+            return Q(**{f'{campo}__month': mes})
+    except (TypeError, ValueError):
+        return Q(pk__in=[])
+    return Q()
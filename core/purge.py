@@ -0,0 +1,99 @@
+"""
+Utilidades para purgas masivas de registros y archivos asociados.
+
+``QuerySet.delete()`` carga cada fila en memoria para resolver cascadas y
+señales; en tablas grandes eso significa cientos de miles de objetos y una
+única transacción larga. Estas funciones borran por lotes de claves primarias
+con DELETE directo y dejan el borrado de archivos para una pasada posterior.
+"""
+import logging
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = 5000
+
+
+def purgar_en_lotes(queryset, batch_size=None, antes_de_borrar=None, progreso=None):
+    """
+    Elimina las filas del queryset en lotes mediante DELETE directo por pk.
+
+    No se disparan señales ni se resuelven cascadas: las tablas dependientes
+    deben limpiarse en ``antes_de_borrar``, que recibe la lista de pks del lote
+    y se ejecuta dentro de la misma transacción.
+
+    Args:
+        queryset: Filas a eliminar
+        batch_size: Cantidad de filas por transacción (PURGE_BATCH_SIZE por defecto)
+        antes_de_borrar: Callable opcional ``(pks) -> None``
+        progreso: Callable opcional ``(eliminadas) -> None`` tras cada lote
+
+    Returns:
+        int: Total de filas eliminadas
+    """
+    batch_size = batch_size or PURGE_BATCH_SIZE
+    model = queryset.model
+    pk_queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    total = 0
+
+    while True:
+        pks = list(pk_queryset[:batch_size])
+        if not pks:
+            break
+        with transaction.atomic(using=queryset.db):
+            if antes_de_borrar:
+                antes_de_borrar(pks)
+            lote = model._base_manager.using(queryset.db).filter(pk__in=pks)
+            total += lote._raw_delete(lote.db)
+        if progreso:
+            progreso(total)
+
+    return total
+
+
+def eliminar_por_pks(model, pks, batch_size=None, progreso=None, using='default'):
+    """
+    Elimina por lotes filas cuyas pks ya se conocen (DELETE directo, sin señales).
+
+    A diferencia de ``purgar_en_lotes`` no vuelve a consultar qué filas
+    borrar en cada lote, útil cuando las pks se obtuvieron al recorrer las
+    filas (por ejemplo al archivarlas).
+
+    Returns:
+        int: Total de filas eliminadas
+    """
+    batch_size = batch_size or PURGE_BATCH_SIZE
+    total = 0
+    for inicio in range(0, len(pks), batch_size):
+        with transaction.atomic(using=using):
+            lote = model._base_manager.using(using).filter(pk__in=pks[inicio:inicio + batch_size])
+            total += lote._raw_delete(lote.db)
+        if progreso:
+            progreso(total)
+    return total
+
+
+def eliminar_archivos(nombres, storage=default_storage, progreso=None):
+    """
+    Elimina archivos del storage ignorando los que ya no existen.
+
+    Args:
+        nombres: Rutas relativas al storage
+        progreso: Callable opcional ``(procesados) -> None``
+
+    Returns:
+        int: Cantidad de archivos eliminados
+    """
+    eliminados = 0
+    for i, nombre in enumerate(nombres, start=1):
+        if nombre:
+            try:
+                storage.delete(nombre)
+                eliminados += 1
+            except Exception as e:
+                logger.warning(f"No se pudo eliminar el archivo {nombre}: {e}")
+        if progreso:
+            progreso(i)
+    return eliminados
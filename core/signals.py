@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .cache import bump_data_version, PERMISOS, LICENCIAS, USUARIOS
+
+
+@receiver(post_save, sender='permisos.SolicitudPermiso')
+@receiver(post_delete, sender='permisos.SolicitudPermiso')
+def permisos_modificados(sender, **kwargs):
+    bump_data_version(PERMISOS)
+
+
+@receiver(post_save, sender='licencias.LicenciaMedica')
+@receiver(post_delete, sender='licencias.LicenciaMedica')
+def licencias_modificadas(sender, **kwargs):
+    bump_data_version(LICENCIAS)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def usuarios_modificados(sender, **kwargs):
+    # El login solo actualiza last_login; no afecta datos derivados
+    if kwargs.get('update_fields') == frozenset({'last_login'}):
+        return
+    bump_data_version(USUARIOS)
@@ -0,0 +1,496 @@
+"""
+Generador de datos sintéticos para pruebas de escala.
+
+Crea funcionarios, registros de asistencia, permisos, licencias, equipos,
+préstamos, logs del sistema y liquidaciones en PDF con ``bulk_create`` (y con
+INSERT multi-fila directo para asistencia y logs, que suman la mayor parte de
+las filas). Cada
+funcionario usa su propio generador aleatorio derivado de la semilla, por lo
+que los mismos argumentos producen siempre los mismos datos.
+
+Todos los usuarios creados tienen el prefijo ``PREFIJO`` en el username, lo
+que permite eliminarlos con ``limpiar_datos_sinteticos`` sin tocar datos reales.
+
+Usado por el comando ``generate_synthetic_data`` y por los benchmarks.
+"""
+import math
+import random
+import time as reloj
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import DateTimeField, ExpressionWrapper, Value
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from admin_dashboard.models import SystemLog
+from asistencia.models import HorarioFuncionario, RegistroAsistencia
+from equipos.models import Equipo, PrestamoEquipo
+from licencias.models import LicenciaMedica
+from liquidaciones.models import Liquidacion
+from permisos.models import SolicitudPermiso
+from users.models import CustomUser
+from .cache import bump_data_version, PERMISOS, LICENCIAS, USUARIOS
+from .purge import purgar_en_lotes, eliminar_archivos
+
+PREFIJO = 'sint'
+PASSWORD = 'sintetico123'
+BATCH_SIZE = 5000
+RUN_BASE = 30_000_000
+
+NOMBRES = [
+    'Ana', 'Benjamín', 'Camila', 'Diego', 'Elena', 'Felipe', 'Gabriela', 'Héctor', 'Isidora', 'Javier',
+    'Karen', 'Luis', 'María', 'Nicolás', 'Olivia', 'Pablo', 'Rocío', 'Sebastián', 'Trinidad', 'Valentina',
+]
+APELLIDOS = [
+    'González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva', 'Martínez', 'Sepúlveda',
+    'Morales', 'Rodríguez', 'López', 'Fuentes', 'Hernández', 'Torres', 'Araya', 'Flores', 'Espinoza', 'Valenzuela',
+]
+MARCAS = ['Lenovo', 'HP', 'Dell', 'Samsung', 'Epson', 'Acer', 'Asus']
+ACCIONES_LOG = [
+    ('AUTH', 'Inicio de sesión', 'Inicio de sesión exitoso'),
+    ('CREATE', 'Solicitud de permiso', 'Creó una solicitud de permiso administrativo'),
+    ('APPROVE', 'Aprobación de permiso', 'Aprobó una solicitud de permiso'),
+    ('UPDATE', 'Actualización de perfil', 'Actualizó sus datos de contacto'),
+    ('EXPORT', 'Exportación de reporte', 'Exportó un reporte de asistencia'),
+]
+
+
+@dataclass
+class ResultadoSintetico:
+    """Cantidad de filas creadas por modelo y duración total."""
+    filas: dict = field(default_factory=dict)
+    segundos: float = 0.0
+
+
+def digito_verificador(cuerpo):
+    """Dígito verificador Módulo 11 de un RUN (mismo algoritmo que validate_run)."""
+    suma, multiplo = 0, 2
+    for c in reversed(str(cuerpo)):
+        suma += int(c) * multiplo
+        multiplo = 2 if multiplo == 7 else multiplo + 1
+    dv = 11 - suma % 11
+    return {11: '0', 10: 'K'}.get(dv, str(dv))
+
+
+def formatear_run(cuerpo):
+    """RUN con puntos y guión (12.345.678-K), el formato que guarda CustomUser."""
+    return f"{cuerpo:,}".replace(',', '.') + f"-{digito_verificador(cuerpo)}"
+
+
+def pdf_minimo(*paginas):
+    """PDF con una línea de texto por página, sin depender de WeasyPrint."""
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages: se completa cuando se conocen los números de página
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for texto in paginas:
+        texto = texto.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        contenido = f"BT /F1 12 Tf 72 720 Td ({texto}) Tj ET".encode('latin-1', 'replace')
+        kids.append(b"%d 0 R" % (len(objetos) + 1))
+        objetos.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 3 0 R >> >> >>" % (len(objetos) + 2)
+        )
+        objetos.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(contenido), contenido))
+    objetos[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    salida = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objetos, start=1):
+        offsets.append(len(salida))
+        salida += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+    xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for offset in offsets:
+        salida += b"%010d 00000 n \n" % offset
+    salida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, xref)
+    return bytes(salida)
+
+
+def _insertar(modelo, objetos, batch_size=BATCH_SIZE):
+    """bulk_create por lotes desde un iterable (sin materializarlo completo)."""
+    objetos = iter(objetos)
+    total = 0
+    while True:
+        lote = list(islice(objetos, batch_size))
+        if not lote:
+            return total
+        modelo.objects.bulk_create(lote, batch_size=batch_size)
+        total += len(lote)
+
+
+def _insertar_filas(modelo, columnas, filas, batch_size=BATCH_SIZE):
+    """
+    INSERT multi-fila directo para las tablas más grandes.
+
+    En ``bulk_create`` la preparación campo a campo de cada valor domina el
+    tiempo cuando se insertan millones de filas; aquí las filas llegan como
+    tuplas ya adaptadas a la base de datos (``connection.ops.adapt_*``) en el
+    orden de ``columnas`` (attnames del modelo).
+    """
+    campos = [modelo._meta.get_field(nombre) for nombre in columnas]
+    tabla = connection.ops.quote_name(modelo._meta.db_table)
+    nombres = ', '.join(connection.ops.quote_name(campo.column) for campo in campos)
+    marcador = '(' + ', '.join(['%s'] * len(campos)) + ')'
+    limite = connection.features.max_query_params
+    if limite:
+        batch_size = min(batch_size, limite // len(campos))
+
+    filas = iter(filas)
+    total = 0
+    with connection.cursor() as cursor:
+        while True:
+            lote = list(islice(filas, batch_size))
+            if not lote:
+                return total
+            cursor.execute(
+                f'INSERT INTO {tabla} ({nombres}) VALUES {", ".join([marcador] * len(lote))}',
+                [valor for fila in lote for valor in fila],
+            )
+            total += len(lote)
+
+
+def _dias_habiles(desde, hasta):
+    dia = desde
+    while dia <= hasta:
+        if dia.weekday() < 5:
+            yield dia
+        dia += timedelta(days=1)
+
+
+def _aware(dia, hora):
+    return timezone.make_aware(datetime.combine(dia, hora))
+
+
+def _rol(i):
+    if i == 0:
+        return 'ADMIN'
+    if i == 1:
+        return 'DIRECTOR'
+    if i in (2, 3):
+        return 'SECRETARIA'
+    return 'DIRECTIVO' if i % 20 == 0 else 'FUNCIONARIO'
+
+
+class GeneradorSintetico:
+    """
+    Genera un conjunto de datos completo.
+
+    Args:
+        funcionarios: Cantidad de usuarios
+        anios: Años de historia hacia atrás desde ``hasta``
+        seed: Semilla base
+        hasta: Último día con datos (hoy por defecto)
+        liquidaciones_meses: Meses recientes con liquidación PDF por funcionario
+        salida: Callable opcional ``(mensaje) -> None`` para informar avance
+    """
+
+    def __init__(self, funcionarios=1000, anios=5, seed=42, hasta=None, liquidaciones_meses=3, salida=None):
+        self.funcionarios = funcionarios
+        self.seed = seed
+        self.hasta = hasta or timezone.localdate()
+        self.desde = self.hasta.replace(year=self.hasta.year - anios) + timedelta(days=1)
+        self.liquidaciones_meses = liquidaciones_meses
+        self.salida = salida or (lambda mensaje: None)
+        self.resultado = ResultadoSintetico()
+        self.dias_habiles = list(_dias_habiles(self.desde, self.hasta))
+        self.habiles_por_anio = {}
+        for dia in self.dias_habiles:
+            self.habiles_por_anio.setdefault(dia.year, []).append(dia)
+
+    def rng(self, *partes):
+        return random.Random(':'.join(str(p) for p in (self.seed, *partes)))
+
+    def _etapa(self, nombre, modelo, objetos, columnas=None):
+        inicio = reloj.perf_counter()
+        if columnas:
+            creadas = _insertar_filas(modelo, columnas, objetos)
+        else:
+            creadas = _insertar(modelo, objetos)
+        self.resultado.filas[nombre] = creadas
+        self.salida(f"{nombre}: {creadas} filas en {reloj.perf_counter() - inicio:.1f}s")
+        return creadas
+
+    def generar(self):
+        inicio = reloj.perf_counter()
+        with transaction.atomic():
+            self.crear_usuarios()
+            self.crear_permisos_y_licencias()
+            self.crear_asistencia()
+            self.crear_equipos()
+            self.crear_logs()
+        self.crear_liquidaciones()
+
+        # bulk_create no dispara señales: se invalidan las cachés derivadas
+        for dominio in (PERMISOS, LICENCIAS, USUARIOS):
+            bump_data_version(dominio)
+
+        self.resultado.segundos = reloj.perf_counter() - inicio
+        return self.resultado
+
+    # -- Usuarios -----------------------------------------------------------
+
+    def crear_usuarios(self):
+        password = make_password(PASSWORD)
+        funciones = [codigo for codigo, _ in CustomUser.FUNCION_CHOICES]
+        usuarios = []
+        for i in range(self.funcionarios):
+            rng = self.rng('usuario', i)
+            usuarios.append(CustomUser(
+                username=f'{PREFIJO}{i:05d}',
+                email=f'{PREFIJO}{i:05d}@sintetico.local',
+                password=password,
+                run=formatear_run(RUN_BASE + i),
+                first_name=rng.choice(NOMBRES),
+                last_name=f'{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}',
+                role=_rol(i),
+                tipo_funcionario=rng.choice(['DOCENTE', 'ASISTENTE']),
+                funcion=rng.choice(funciones),
+                dias_disponibles=rng.choice([6.0, 5.0, 4.5, 3.0, 1.0]),
+                date_joined=_aware(self.desde, time(8, 0)),
+            ))
+        self._etapa('usuarios', CustomUser, usuarios)
+
+        self.usuarios = list(
+            CustomUser.objects.filter(username__startswith=PREFIJO).order_by('username').values_list('pk', 'run')
+        )
+        self._etapa('horarios', HorarioFuncionario, (
+            HorarioFuncionario(funcionario_id=pk, hora_entrada=time(7, 45), tolerancia_minutos=5, activo=True)
+            for pk, _ in self.usuarios
+        ))
+        self.horarios = dict(HorarioFuncionario.objects.filter(
+            funcionario__username__startswith=PREFIJO
+        ).values_list('funcionario_id', 'pk'))
+
+    # -- Permisos y licencias -----------------------------------------------
+
+    def crear_permisos_y_licencias(self):
+        # Días ocupados por funcionario, usados luego por la asistencia
+        self.dias_permiso = {}
+        self.dias_licencia = {}
+        permisos, licencias = [], []
+
+        for i, (pk, _) in enumerate(self.usuarios):
+            rng = self.rng('ausencias', i)
+            ocupados_permiso = self.dias_permiso[pk] = set()
+            ocupados_licencia = self.dias_licencia[pk] = set()
+            for habiles in self.habiles_por_anio.values():
+                for _ in range(rng.randint(0, 6)):
+                    inicio = rng.choice(habiles)
+                    dias = rng.choice([0.5, 1.0, 1.0, 1.5, 2.0, 3.0])
+                    estado = rng.choices(['APROBADO', 'RECHAZADO', 'PENDIENTE'], weights=[85, 10, 5])[0]
+                    termino = inicio + timedelta(days=math.ceil(dias) - 1)
+                    permisos.append(SolicitudPermiso(
+                        usuario_id=pk,
+                        created_by_id=pk,
+                        fecha_inicio=inicio,
+                        fecha_termino=termino,
+                        dias_solicitados=dias,
+                        jornada='FD' if dias >= 1 else rng.choice(['AM', 'PM']),
+                        estado=estado,
+                        observacion='Permiso administrativo',
+                    ))
+                    if estado == 'APROBADO':
+                        ocupados_permiso.update(inicio + timedelta(days=d) for d in range(math.ceil(dias)))
+
+                if rng.random() < 0.25:
+                    for _ in range(rng.randint(1, 2)):
+                        inicio = rng.choice(habiles)
+                        dias = rng.choice([3, 5, 7, 14, 30])
+                        licencias.append(LicenciaMedica(
+                            usuario_id=pk, fecha_inicio=inicio, dias=dias, created_by_id=pk,
+                            # bulk_create no ejecuta save(): el término se calcula aquí
+                            fecha_termino=LicenciaMedica.calcular_fecha_termino(inicio, dias),
+                        ))
+                        ocupados_licencia.update(inicio + timedelta(days=d) for d in range(dias))
+
+        self._etapa('permisos', SolicitudPermiso, permisos)
+        self._etapa('licencias', LicenciaMedica, licencias)
+
+        # created_at es auto_now_add: se ajusta en bloque a fechas coherentes con el período
+        SolicitudPermiso.objects.filter(usuario__username__startswith=PREFIJO).update(
+            created_at=ExpressionWrapper(
+                Cast('fecha_inicio', DateTimeField()) - Value(timedelta(days=7)), output_field=DateTimeField()
+            )
+        )
+        LicenciaMedica.objects.filter(usuario__username__startswith=PREFIJO).update(
+            created_at=Cast('fecha_inicio', DateTimeField())
+        )
+
+    # -- Asistencia ---------------------------------------------------------
+
+    COLUMNAS_REGISTRO = (
+        'funcionario_id', 'fecha', 'horario_asignado_id', 'estado', 'minutos_retraso',
+        'hora_entrada_real', 'hora_salida_real', 'minutos_trabajados', 'fecha_procesamiento', 'justificacion_manual',
+    )
+
+    def _registros(self):
+        ops = connection.ops
+        fechas = {dia: ops.adapt_datefield_value(dia) for dia in self.dias_habiles}
+        horas = {}
+
+        def hora(minutos):
+            if minutos not in horas:
+                horas[minutos] = ops.adapt_timefield_value(time(minutos // 60, minutos % 60))
+            return horas[minutos]
+
+        procesado = ops.adapt_datetimefield_value(timezone.now())
+        for i, (pk, _) in enumerate(self.usuarios):
+            rng = self.rng('asistencia', i)
+            horario_id = self.horarios.get(pk)
+            permisos = self.dias_permiso[pk]
+            licencias = self.dias_licencia[pk]
+            for dia in self.dias_habiles:
+                retraso, entrada, salida, trabajados = 0, None, None, None
+                if dia in licencias:
+                    estado = 'LICENCIA_MEDICA'
+                elif dia in permisos:
+                    estado = 'DIA_ADMINISTRATIVO'
+                else:
+                    azar = rng.random()
+                    if azar < 0.03:
+                        estado = 'AUSENTE'
+                    else:
+                        # Entrada 07:45 con 5 minutos de tolerancia
+                        retraso = rng.randint(6, 55) if azar < 0.15 else 0
+                        minuto_entrada = 7 * 60 + 45 + (retraso or -rng.randint(0, 15))
+                        minuto_salida = rng.randint(16 * 60, 17 * 60 + 30)
+                        estado = 'RETRASO' if retraso else 'PUNTUAL'
+                        entrada, salida = hora(minuto_entrada), hora(minuto_salida)
+                        trabajados = minuto_salida - minuto_entrada
+                yield (pk, fechas[dia], horario_id, estado, retraso, entrada, salida, trabajados, procesado, '')
+
+    def crear_asistencia(self):
+        self._etapa('registros_asistencia', RegistroAsistencia, self._registros(), self.COLUMNAS_REGISTRO)
+
+    # -- Equipos ------------------------------------------------------------
+
+    def crear_equipos(self):
+        rng = self.rng('equipos')
+        tipos = [codigo for codigo, _ in Equipo.TIPO_CHOICES]
+        total = max(1, self.funcionarios // 2)
+        self._etapa('equipos', Equipo, (
+            Equipo(
+                tipo=rng.choice(tipos),
+                marca=rng.choice(MARCAS),
+                modelo=f'M{rng.randint(100, 999)}',
+                numero_serie=f'SN{self.seed}{j:07d}',
+                numero_inventario=f'SINT-{j:05d}',
+                estado='DISPONIBLE',
+                fecha_adquisicion=self.desde + timedelta(days=rng.randint(0, 365)),
+            )
+            for j in range(total)
+        ))
+
+        equipos = list(Equipo.objects.filter(numero_inventario__startswith='SINT-').order_by('pk').values_list('pk', flat=True))
+        prestamos, asignados = [], []
+        for equipo_id in equipos:
+            for _ in range(rng.randint(0, 4)):
+                funcionario_id, _ = rng.choice(self.usuarios)
+                prestamos.append(PrestamoEquipo(
+                    equipo_id=equipo_id,
+                    funcionario_id=funcionario_id,
+                    fecha_devolucion=rng.choice(self.dias_habiles),
+                    activo=False,
+                    observaciones='Préstamo sintético',
+                ))
+            if rng.random() < 0.4:
+                funcionario_id, _ = rng.choice(self.usuarios)
+                prestamos.append(PrestamoEquipo(equipo_id=equipo_id, funcionario_id=funcionario_id, activo=True))
+                asignados.append(equipo_id)
+        self._etapa('prestamos', PrestamoEquipo, prestamos)
+        Equipo.objects.filter(pk__in=asignados).update(estado='ASIGNADO')
+
+    # -- Logs ---------------------------------------------------------------
+
+    COLUMNAS_LOG = ('usuario_id', 'tipo', 'accion', 'descripcion', 'ip_address', 'timestamp', 'metadata')
+
+    def _logs(self):
+        ops = connection.ops
+        segundos = int((self.hasta - self.desde).total_seconds()) + 86400
+        inicio = _aware(self.desde, time(0, 0))
+        for i, (pk, _) in enumerate(self.usuarios):
+            rng = self.rng('logs', i)
+            for _ in range(30 * max(1, len(self.dias_habiles) // 260)):
+                tipo, accion, descripcion = rng.choice(ACCIONES_LOG)
+                yield (
+                    pk, tipo, accion, descripcion,
+                    f'10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}',
+                    ops.adapt_datetimefield_value(inicio + timedelta(seconds=rng.randrange(segundos))),
+                    '{}',
+                )
+
+    def crear_logs(self):
+        self._etapa('logs', SystemLog, self._logs(), self.COLUMNAS_LOG)
+
+    # -- Liquidaciones ------------------------------------------------------
+
+    def _meses_liquidacion(self):
+        anio, mes = self.hasta.year, self.hasta.month
+        for _ in range(self.liquidaciones_meses):
+            mes -= 1
+            if mes == 0:
+                anio, mes = anio - 1, 12
+            yield anio, mes
+
+    def crear_liquidaciones(self):
+        liquidaciones = []
+        for anio, mes in self._meses_liquidacion():
+            for pk, run in self.usuarios:
+                nombre = default_storage.save(
+                    f'liquidaciones/{anio}/{mes:02d}/{PREFIJO}_{run}.pdf',
+                    ContentFile(pdf_minimo(f'Liquidacion {mes:02d}/{anio} - {run}')),
+                )
+                liquidaciones.append(Liquidacion(funcionario_id=pk, archivo=nombre, mes=mes, anio=anio))
+        self._etapa('liquidaciones', Liquidacion, liquidaciones)
+
+
+def generar_datos_sinteticos(**opciones):
+    """Atajo para ``GeneradorSintetico(**opciones).generar()``."""
+    return GeneradorSintetico(**opciones).generar()
+
+
+def limpiar_datos_sinteticos(salida=None):
+    """
+    Elimina todo lo creado por el generador (usuarios con PREFIJO y equipos SINT-).
+
+    Las tablas grandes se purgan por lotes (core.purge) antes de borrar los
+    usuarios, para que el borrado en cascada final sea pequeño.
+
+    Returns:
+        dict: Filas eliminadas por tabla
+    """
+    salida = salida or (lambda mensaje: None)
+    sinteticos = {'funcionario__username__startswith': PREFIJO}
+    eliminadas = {}
+
+    archivos = list(Liquidacion.objects.filter(**sinteticos).values_list('archivo', flat=True))
+    tablas = [
+        ('registros_asistencia', RegistroAsistencia.objects.filter(**sinteticos)),
+        ('permisos', SolicitudPermiso.objects.filter(usuario__username__startswith=PREFIJO)),
+        ('licencias', LicenciaMedica.objects.filter(usuario__username__startswith=PREFIJO)),
+        ('logs', SystemLog.objects.filter(usuario__username__startswith=PREFIJO)),
+        ('liquidaciones', Liquidacion.objects.filter(**sinteticos)),
+        ('prestamos', PrestamoEquipo.objects.filter(equipo__numero_inventario__startswith='SINT-')),
+        ('prestamos', PrestamoEquipo.objects.filter(**sinteticos)),
+    ]
+    for nombre, queryset in tablas:
+        eliminadas[nombre] = eliminadas.get(nombre, 0) + purgar_en_lotes(queryset)
+    eliminar_archivos(archivos)
+
+    eliminadas['equipos'] = Equipo.objects.filter(numero_inventario__startswith='SINT-').delete()[0]
+    eliminadas['usuarios'] = CustomUser.objects.filter(username__startswith=PREFIJO).delete()[0]
+    for nombre, filas in eliminadas.items():
+        salida(f"{nombre}: {filas} filas eliminadas")
+
+    for dominio in (PERMISOS, LICENCIAS, USUARIOS):
+        bump_data_version(dominio)
+    return eliminadas
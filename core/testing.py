@@ -0,0 +1,95 @@
+"""
+Utilidades para tests de rendimiento de vistas.
+
+``PresupuestoConsultasMixin`` mide un GET (consultas SQL y tiempo) y verifica
+que no supere el ``Presupuesto`` declarado para la vista. Las consultas se
+cuentan con el mismo wrapper que usa el middleware de métricas, y cada request
+se ejecuta dentro de un savepoint que se revierte, para que las vistas que
+modifican datos no alteren las mediciones siguientes.
+"""
+import time
+from dataclasses import dataclass
+
+from django.db import connection, transaction
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from .metrics import ConsultasRequest
+
+# Límite de tiempo por request por defecto (segundos)
+TIEMPO_MAXIMO = 3.0
+
+
+@dataclass(frozen=True)
+class Presupuesto:
+    """Máximo de consultas SQL y de segundos para un request a una vista."""
+    consultas: int
+    segundos: float = TIEMPO_MAXIMO
+
+
+@dataclass(frozen=True)
+class Medicion:
+    status_code: int
+    consultas: int
+    segundos: float
+    repetidas: list
+
+
+def urls_con_nombre(excluir_namespaces=('admin',)):
+    """
+    Nombres de todas las URLs del proyecto (``namespace:nombre``), con sus
+    parámetros, recorriendo el resolver raíz.
+
+    Returns:
+        dict: {nombre: [parámetros de la ruta]}
+    """
+    urls = {}
+
+    def recorrer(patrones, namespace=None, parametros=()):
+        for patron in patrones:
+            if isinstance(patron, URLResolver):
+                if patron.namespace in excluir_namespaces:
+                    continue
+                ns = patron.namespace
+                if ns and namespace:
+                    ns = f'{namespace}:{ns}'
+                recorrer(patron.url_patterns, ns or namespace, parametros + tuple(patron.pattern.converters))
+            elif isinstance(patron, URLPattern) and patron.name:
+                nombre = f'{namespace}:{patron.name}' if namespace else patron.name
+                parametros_ruta = list(parametros) + list(patron.pattern.converters)
+                # Una misma vista con y sin parámetros: se conserva la variante con más parámetros
+                if len(parametros_ruta) >= len(urls.get(nombre, ())):
+                    urls[nombre] = parametros_ruta
+
+    recorrer(get_resolver().url_patterns)
+    return urls
+
+
+class PresupuestoConsultasMixin:
+    """Mixin para TestCase con aserciones de presupuesto de consultas."""
+
+    def medir_get(self, cliente, url):
+        consultas = ConsultasRequest()
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            with connection.execute_wrapper(consultas):
+                respuesta = cliente.get(url)
+                if getattr(respuesta, 'streaming', False):
+                    for _ in respuesta.streaming_content:
+                        pass
+            segundos = time.perf_counter() - inicio
+            transaction.set_rollback(True)
+        return Medicion(respuesta.status_code, consultas.cantidad, segundos, consultas.repetidas())
+
+    def assertDentroDePresupuesto(self, cliente, url, presupuesto):
+        medicion = self.medir_get(cliente, url)
+        self.assertLess(medicion.status_code, 500, f'{url} respondió {medicion.status_code}')
+        repetidas = ''.join(f'\n  {veces}x {huella[:160]}' for huella, veces in medicion.repetidas)
+        self.assertLessEqual(
+            medicion.consultas, presupuesto.consultas,
+            f'{url}: {medicion.consultas} consultas (presupuesto {presupuesto.consultas}){repetidas}',
+        )
+        self.assertLessEqual(
+            medicion.segundos, presupuesto.segundos,
+            f'{url}: {medicion.segundos:.2f}s (máximo {presupuesto.segundos}s)',
+        )
+        return medicion
@@ -1,3 +1,506 @@
-from django.test import TestCase
+"""
+Tests para utilidades compartidas del módulo core.
+"""
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from asistencia.models import RegistroAsistencia
+from benchmarks.arranque import medir_arranque
+from benchmarks.runner import Escenario, comparar, medir
+from users.models import CustomUser
+from core.periods import rango_periodo, filtro_periodo
+from core.cache import data_version, data_versions, get_or_compute, ttl_derivado, USUARIOS, PERMISOS
+from core.jobs import submit_job, guardar_archivo
+from core.lazy import disponible, importar_diferido
+from core.paginacion import conteo_aproximado, paginar_por_cursor
+from core.metrics import huella_sql, metricas, Histograma
+from core.ocupacion import ocupacion_diaria, semana_habil
+from core.middleware import PDFTimeoutMiddleware
+from core.pdf import CacheLRU, PDFRenderService, PDFRenderTimeout
+from core.synthetic import generar_datos_sinteticos, limpiar_datos_sinteticos, formatear_run
+from core.validators import validate_run
+from admin_dashboard.models import SystemLog
+from permisos.models import SolicitudPermiso
+
+
+class PeriodoTest(TestCase):
+    """Tests para la conversión de períodos a rangos de fechas"""
+
+    def test_rango_mes(self):
+        self.assertEqual(rango_periodo(2025, 3), (date(2025, 3, 1), date(2025, 4, 1)))
+
+    def test_rango_diciembre(self):
+        self.assertEqual(rango_periodo('2025', '12'), (date(2025, 12, 1), date(2026, 1, 1)))
+
+    def test_rango_anio(self):
+        self.assertEqual(rango_periodo(2024), (date(2024, 1, 1), date(2025, 1, 1)))
+
+    def test_filtro_sin_periodo(self):
+        self.assertEqual(len(filtro_periodo('fecha')), 0)
+
+    def test_filtro_solo_mes(self):
+        """Un mes sin año no es un rango contiguo"""
+        self.assertEqual(filtro_periodo('fecha', mes='3').children, [('fecha__month', '3')])
+
+    def test_rango_invalido(self):
+        for anio, mes in [(2025, 13), (2025, '0'), ('abc', 3), (2025, 'x'), (0, None)]:
+            with self.assertRaises(ValueError):
+                rango_periodo(anio, mes)
+
+    def test_filtro_invalido_no_coincide(self):
+        """Un período inválido filtra todo en lugar de lanzar ValueError"""
+        usuario = CustomUser.objects.create_user(username='periodo', run='55555555-5', password='x')
+        RegistroAsistencia.objects.create(funcionario=usuario, fecha=date(2025, 3, 10))
+        for anio, mes in [('2025', '13'), ('2025', '0'), ('abc', '3'), (None, '13')]:
+            self.assertFalse(RegistroAsistencia.objects.filter(filtro_periodo('fecha', anio, mes)).exists())
+        self.assertTrue(RegistroAsistencia.objects.filter(filtro_periodo('fecha', '2025', '3')).exists())
+
+    def test_vistas_con_mes_invalido(self):
+        usuario = CustomUser.objects.create_user(username='periodo_admin', run='44444444-4', password='x', role='ADMIN')
+        self.client.force_login(usuario)
+        for url in ('licencia_list', 'asistencia:descargar_asistencia', 'reportes'):
+            for query in ('mes=13', 'mes=0&anio=2025', 'anio=abc&mes=3', 'month=13&year=abc'):
+                response = self.client.get(f'{reverse(url)}?{query}')
+                self.assertEqual(response.status_code, 200, f'{url}?{query}')
+
+
+class PeriodoIndexTest(TestCase):
+    """Verifica con EXPLAIN que los filtros de período usan los índices compuestos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [
+            CustomUser.objects.create_user(
+                username=f'explain{i}', email=f'explain{i}@test.com', run=f'2000000{i}-K',
+                first_name='Explain', last_name=str(i), password='testpass123'
+            )
+            for i in range(5)
+        ]
+        inicio = date(2024, 1, 1)
+        estados = ['PUNTUAL', 'RETRASO', 'AUSENTE']
+        RegistroAsistencia.objects.bulk_create([
+            RegistroAsistencia(funcionario=u, fecha=inicio + timedelta(days=d), estado=estados[d % 3])
+            for u in cls.usuarios
+            for d in range(730)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Con pocas filas el planificador puede preferir un seq scan
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+        return queryset.explain()
+
+    def assertUsaIndice(self, plan):
+        if connection.vendor == 'sqlite':
+            self.assertRegex(plan, r'USING (COVERING )?INDEX')
+            self.assertRegex(plan, r'fecha>\? AND fecha<\?')
+        elif connection.vendor == 'postgresql':
+            self.assertIn('Index', plan)
+            self.assertNotIn('Seq Scan', plan)
+
+    def test_funcionario_fecha(self):
+        plan = self.explain(RegistroAsistencia.objects.filter(
+            filtro_periodo('fecha', 2025, 3), funcionario=self.usuarios[0]
+        ))
+        self.assertUsaIndice(plan)
+
+    def test_estado_fecha(self):
+        plan = self.explain(RegistroAsistencia.objects.filter(
+            filtro_periodo('fecha', 2025, 3), estado='AUSENTE'
+        ))
+        self.assertUsaIndice(plan)
+        if connection.vendor == 'sqlite':
+            self.assertIn('asistencia_estado_fecha_idx', plan)
+
+
+class DataVersionTest(TestCase):
+    """Tests para las versiones de datos por dominio"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_senal_incrementa_version(self):
+        antes = data_version(USUARIOS)
+        usuario = CustomUser.objects.create_user(
+            username='version', email='version@test.com', run='30000000-K', password='testpass123'
+        )
+        self.assertGreater(data_version(USUARIOS), antes)
+
+        # Actualizar solo last_login (login) no invalida
+        actual = data_version(USUARIOS)
+        usuario.save(update_fields=['last_login'])
+        self.assertEqual(data_version(USUARIOS), actual)
+
+    def test_get_or_compute_recalcula_al_cambiar_version(self):
+        llamadas = []
+
+        def calcular():
+            llamadas.append(1)
+            return len(llamadas)
+
+        self.assertEqual(get_or_compute('test', (PERMISOS,), ('a',), calcular), 1)
+        self.assertEqual(get_or_compute('test', (PERMISOS,), ('a',), calcular), 1)
+        antes = data_versions(PERMISOS, USUARIOS)
+        cache.incr(f'data_version:{PERMISOS}')
+        self.assertNotEqual(data_versions(PERMISOS, USUARIOS), antes)
+        self.assertEqual(get_or_compute('test', (PERMISOS,), ('a',), calcular), 2)
+
+    def test_ttl_acotado_sin_cache_compartida(self):
+        with override_settings(DERIVED_CACHE_MAX_SECONDS=5):
+            self.assertEqual(ttl_derivado(60 * 30), 5)
+            self.assertEqual(ttl_derivado(None), 5)
+            with mock.patch('core.cache.cache.set') as guardar:
+                get_or_compute('test', (PERMISOS,), ('ttl',), lambda: 1, timeout=60 * 30)
+            self.assertEqual(guardar.call_args.args[2], 5)
+        with override_settings(DERIVED_CACHE_MAX_SECONDS=None):
+            self.assertEqual(ttl_derivado(60 * 30), 60 * 30)
+
+
+class PDFRenderServiceTest(TestCase):
+    """Tests para el servicio de render de PDF"""
+
+    def test_solicitudes_identicas_se_agrupan(self):
+        servicio = PDFRenderService(workers=1)
+        servicio._executor = ThreadPoolExecutor(max_workers=1)
+        liberar = threading.Event()
+
+        def render_lento(html_string, base_url, stylesheets):
+            liberar.wait(5)
+            return html_string.encode()
+
+        with mock.patch('core.pdf._render', side_effect=render_lento) as render:
+            primero = servicio.submit('<p>a</p>')
+            segundo = servicio.submit('<p>a</p>')
+            distinto = servicio.submit('<p>b</p>')
+            liberar.set()
+            self.assertIs(primero, segundo)
+            self.assertEqual(primero.result(), b'<p>a</p>')
+            self.assertEqual(distinto.result(), b'<p>b</p>')
+        self.assertEqual(render.call_count, 2)
+        servicio._executor.shutdown()
+
+    def test_render_que_excede_el_limite(self):
+        servicio = PDFRenderService(workers=1)
+        servicio._executor = ThreadPoolExecutor(max_workers=1)
+        liberar = threading.Event()
+
+        with mock.patch('core.pdf._render', side_effect=lambda *args: liberar.wait(5)):
+            with self.assertRaises(PDFRenderTimeout), self.assertLogs('core.pdf', 'ERROR'):
+                servicio.render('<p>lento</p>', timeout=0.05)
+        liberar.set()
+        servicio._executor.shutdown()
+
+        respuesta = PDFTimeoutMiddleware(lambda request: None).process_exception(
+            RequestFactory().get('/reportes/pdf/'), PDFRenderTimeout('lento')
+        )
+        self.assertEqual(respuesta.status_code, 503)
+
+    def test_lote_en_ventana_acotada(self):
+        servicio = PDFRenderService(workers=2)
+        servicio._executor = ThreadPoolExecutor(max_workers=2)
+        consumidos = []
+
+        def documentos():
+            for i in range(20):
+                consumidos.append(i)
+                yield i, f'<p>{i}</p>'
+
+        entregados = []
+        with mock.patch('core.pdf._render', side_effect=lambda html_string, *args: html_string.encode()):
+            for clave, pdf in servicio.render_varios(documentos()):
+                # Nunca hay más de 2 renders por worker sin entregar
+                self.assertLessEqual(len(consumidos) - len(entregados), 4)
+                entregados.append((clave, pdf))
+        servicio._executor.shutdown()
+        self.assertEqual(sorted(entregados), [(i, f'<p>{i}</p>'.encode()) for i in range(20)])
+
+    def test_cache_lru_acotada(self):
+        lru = CacheLRU(2)
+        lru['a'], lru['b'] = 1, 2
+        lru['a']
+        lru['c'] = 3
+        self.assertEqual(list(lru), ['a', 'c'])
+
+
+@override_settings(JOBS_RUN_SYNC=True)
+class JobFileViewTest(TestCase):
+    """Tests para la descarga de archivos generados por tareas"""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = CustomUser.objects.create_user(
+            username='owner', email='owner@test.com', run='31000000-K', password='testpass123', role='SECRETARIA'
+        )
+        self.otro = CustomUser.objects.create_user(
+            username='otro', email='otro@test.com', run='32000000-K', password='testpass123'
+        )
+        self.job_id = submit_job(
+            'test', lambda reporter: guardar_archivo(reporter.job_id, 'datos.csv', b'a;b', 'text/csv'),
+            owner=self.owner,
+        )
+
+    def test_owner_descarga_archivo(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('job_file', args=[self.job_id]))
+        self.assertEqual(b''.join(response.streaming_content), b'a;b')
+        self.assertIn('attachment', response['Content-Disposition'])
+
+    def test_otro_usuario_no_accede(self):
+        self.client.force_login(self.otro)
+        self.assertEqual(self.client.get(reverse('job_file', args=[self.job_id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('job_wait', args=[self.job_id])).status_code, 404)
+
+    def test_tarea_sin_latido_se_marca_error(self):
+        from core.jobs import EN_CURSO, ERROR, get_job, _interrumpir_activas, _activas, JobReporter
+        from core.models import Tarea
+
+        # Worker que murió con la tarea en curso: el latido quedó atrás
+        Tarea.objects.filter(pk=self.job_id).update(
+            estado=EN_CURSO, latido=timezone.now() - timedelta(minutes=5),
+        )
+        job = get_job(self.job_id)
+        self.assertEqual(job['estado'], ERROR)
+        self.assertIn('interrumpió', job['error'])
+
+        # Reciclaje ordenado del worker: atexit marca sus tareas activas
+        Tarea.objects.filter(pk=self.job_id).update(estado=EN_CURSO, latido=timezone.now())
+        with mock.patch.dict(_activas, {self.job_id: JobReporter(self.job_id, {})}):
+            _interrumpir_activas()
+        self.assertEqual(get_job(self.job_id)['estado'], ERROR)
+
+
+class DatosSinteticosTest(TestCase):
+    """Tests para el generador de datos sintéticos"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=media.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.opciones = dict(funcionarios=6, anios=1, seed=7, hasta=date(2025, 6, 30), liquidaciones_meses=1)
+
+    def permisos(self):
+        return list(SolicitudPermiso.objects.order_by('usuario__username', 'fecha_inicio', 'dias_solicitados').values_list(
+            'usuario__username', 'fecha_inicio', 'dias_solicitados', 'estado'
+        ))
+
+    def test_genera_y_limpia(self):
+        resultado = generar_datos_sinteticos(**self.opciones)
+        self.assertEqual(resultado.filas['usuarios'], 6)
+        habiles = sum(1 for d in range(365) if (date(2024, 7, 1) + timedelta(days=d)).weekday() < 5)
+        self.assertEqual(RegistroAsistencia.objects.filter(funcionario__username='sint00005').count(), habiles)
+        self.assertEqual(resultado.filas['liquidaciones'], 6)
+        validate_run(CustomUser.objects.get(username='sint00003').run)
+
+        limpiar_datos_sinteticos()
+        self.assertFalse(CustomUser.objects.filter(username__startswith='sint').exists())
+        self.assertFalse(RegistroAsistencia.objects.exists())
+
+    def test_determinista(self):
+        generar_datos_sinteticos(**self.opciones)
+        primera = self.permisos()
+        limpiar_datos_sinteticos()
+        generar_datos_sinteticos(**self.opciones)
+        self.assertEqual(self.permisos(), primera)
+
+    def test_formato_run(self):
+        self.assertEqual(formatear_run(12345678), '12.345.678-5')
+
+
+class BenchmarkRunnerTest(TestCase):
+    """Tests para la medición y comparación de benchmarks"""
+
+    def test_medir_revierte_cambios(self):
+        def ejecutar():
+            CustomUser.objects.create_user(username='bench', password='x', run='11111111-1')
+            CustomUser.objects.filter(username='bench').count()
+
+        metricas = medir(Escenario('crear', ejecutar, filas=10), repeticiones=2)
+        self.assertFalse(CustomUser.objects.filter(username='bench').exists())
+        self.assertGreaterEqual(metricas['queries'], 2)
+        self.assertEqual(metricas['filas'], 10)
+        self.assertGreater(metricas['filas_por_s'], 0)
+
+    def test_comparar_detecta_regresiones(self):
+        base = {'escenarios': {'vista': {'wall_s': 1.0, 'queries': 10, 'peak_mem_mb': 5.0}}}
+        actual = {'escenarios': {
+            'vista': {'wall_s': 1.2, 'queries': 11, 'peak_mem_mb': 8.0},
+            'nueva': {'wall_s': 9.0, 'queries': 99, 'peak_mem_mb': 1.0},
+        }}
+        regresiones = {(r['escenario'], r['metrica']) for r in comparar(actual, base, tolerancia=0.25)}
+        self.assertEqual(regresiones, {('vista', 'queries'), ('vista', 'peak_mem_mb')})
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True)
+class MetricasRequestTest(TestCase):
+    """Tests para el middleware de métricas por vista"""
+
+    def setUp(self):
+        metricas.vaciar()
+        self.usuario = CustomUser.objects.create_user(
+            username='metricas', password='x', run='12345678-5', role='ADMIN'
+        )
+        self.client.force_login(self.usuario)
+
+    def test_huella_agrupa_parametros(self):
+        self.assertEqual(
+            huella_sql("SELECT * FROM t WHERE id IN (%s, %s, %s) AND n = 'x' LIMIT 21"),
+            huella_sql("SELECT *  FROM t WHERE id IN (%s, %s) AND n = 'y' LIMIT 5"),
+        )
+
+    def test_acumula_por_vista(self):
+        self.client.get(reverse('user_list'))
+        self.client.get(reverse('user_list'))
+        estadistica = metricas.instantanea()['user_list']
+        self.assertEqual(estadistica['requests'], 2)
+        self.assertGreater(estadistica['consultas_max'], 0)
+
+    def test_vaciado_en_una_linea_info(self):
+        self.client.get(reverse('user_list'))
+        self.client.get(reverse('licencia_list'))
+        with self.assertLogs('performance', 'DEBUG') as logs:
+            metricas.vaciar()
+        info = [r for r in logs.records if r.levelname == 'INFO']
+        self.assertEqual(len(info), 1)
+        self.assertIn('vistas=2 requests=2', info[0].getMessage())
+        self.assertEqual(len([r for r in logs.records if r.levelname == 'DEBUG']), 2)
+
+    @override_settings(REQUEST_SLOW_QUERIES=1)
+    def test_request_lento_se_registra(self):
+        with self.assertLogs('performance', 'WARNING') as logs:
+            self.client.get(reverse('user_list'))
+        self.assertIn('vista=user_list', logs.output[0])
+        self.assertEqual(metricas.instantanea()['user_list']['lentos'], 1)
+
+
+@override_settings(METRICS_REFRESH_SECONDS=0, METRICS_TOKEN='secreto')
+class MetricsViewTest(TestCase):
+    """Tests para el endpoint de métricas Prometheus y el health check detallado"""
+
+    def test_requiere_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        respuesta = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+        texto = respuesta.content.decode()
+        self.assertIn('# TYPE sgpal_request_duration_seconds histogram', texto)
+        self.assertIn('sgpal_db_up 1', texto)
+        self.assertIn('sgpal_app_count{name="users_total"}', texto)
+
+    def test_limite_de_conexiones_aparte(self):
+        from core.metrics import _gauges
+
+        lineas = list(_gauges({'actualizado': 0, 'database': {
+            'up': 1, 'conexiones': {'active': 2, 'idle': 3}, 'max_conexiones': 100,
+        }}))
+        self.assertIn('sgpal_db_connections{state="idle"} 3', lineas)
+        self.assertNotIn('state="max"', ' '.join(lineas))
+        self.assertIn('sgpal_db_max_connections 100', lineas)
+
+    def test_histograma(self):
+        h = Histograma('prueba_seconds', 'Prueba', ('view',), buckets=(0.1, 1))
+        h.observar(0.05, view='a')
+        h.observar(0.5, view='a')
+        lineas = list(h.lineas())
+        self.assertIn('prueba_seconds_bucket{view="a",le="0.1"} 1', lineas)
+        self.assertIn('prueba_seconds_bucket{view="a",le="+Inf"} 2', lineas)
+        self.assertIn('prueba_seconds_count{view="a"} 2', lineas)
+
+    @mock.patch.dict('os.environ', {'HEALTH_CHECK_DETAILED': 'true'})
+    def test_health_detallado_no_bloquea(self):
+        with mock.patch('psutil.cpu_percent', return_value=3.0) as cpu:
+            datos = self.client.get(reverse('health_check')).json()
+        cpu.assert_called_with(interval=None)
+        self.assertEqual(datos['system']['cpu_percent'], 3.0)
+        self.assertIn('pending', datos['metrics']['permissions'])
+
+
+class ImportacionDiferidaTest(TestCase):
+    """Tests para la carga diferida de dependencias pesadas"""
+
+    def test_modulo_diferido(self):
+        modulo = importar_diferido('json')
+        self.assertIn('sin cargar', repr(modulo))
+        self.assertEqual(modulo.dumps([1]), '[1]')
+        self.assertIn('cargado', repr(modulo))
+        self.assertTrue(disponible('json'))
+        self.assertFalse(disponible('modulo_que_no_existe'))
+
+    def test_worker_arranca_sin_dependencias_pesadas(self):
+        resultado = medir_arranque()
+        self.assertEqual(resultado['pesadas_cargadas'], [])
+
+
+class PaginacionCursorTest(TestCase):
+    """Tests para la paginación por cursor de los logs"""
+
+    @classmethod
+    def setUpTestData(cls):
+        ahora = timezone.now()
+        # Pares de logs con el mismo timestamp para probar el desempate por id
+        SystemLog.objects.bulk_create([
+            SystemLog(tipo='SYSTEM', accion=f'Log {i}', descripcion='-', timestamp=ahora - timedelta(minutes=i // 2))
+            for i in range(25)
+        ])
+
+    def test_recorre_todo_sin_repetir(self):
+        vistos = []
+        pagina = paginar_por_cursor(SystemLog.objects.all(), 10)
+        self.assertTrue(pagina.es_primera)
+        while True:
+            vistos.extend(log.pk for log in pagina)
+            if pagina.es_ultima:
+                break
+            pagina = paginar_por_cursor(SystemLog.objects.all(), 10, despues=pagina.siguiente)
+        esperado = list(SystemLog.objects.order_by('-timestamp', '-pk').values_list('pk', flat=True))
+        self.assertEqual(vistos, esperado)
+
+        anterior = paginar_por_cursor(SystemLog.objects.all(), 10, antes=pagina.anterior)
+        self.assertEqual([log.pk for log in anterior], esperado[10:20])
+        ultima = paginar_por_cursor(SystemLog.objects.all(), 10, ultima=True)
+        self.assertEqual([log.pk for log in ultima], esperado[-10:])
+        with self.assertRaises(ValueError):
+            paginar_por_cursor(SystemLog.objects.all(), 10, despues='no-es-un-cursor')
+
+    def test_conteo_acotado(self):
+        self.assertEqual(str(conteo_aproximado(SystemLog.objects.all())), '25')
+        self.assertEqual(str(conteo_aproximado(SystemLog.objects.all(), limite=20)), 'más de 20')
+
+
+class OcupacionDiariaTest(TestCase):
+    """Tests para el barrido de personas fuera por día"""
+
+    def test_coincide_con_conteo_por_dia(self):
+        desde, hasta = date(2025, 6, 1), date(2025, 6, 30)
+        intervalos = [
+            (date(2025, 5, 20), date(2025, 6, 3), 'Ana'),
+            (date(2025, 6, 10), date(2025, 6, 10), 'Beto'),
+            (date(2025, 6, 9), date(2025, 6, 12), 'Carla'),
+            (date(2025, 6, 28), date(2025, 7, 15), 'Dora'),
+            (date(2025, 7, 1), date(2025, 7, 2), 'Fuera de la ventana'),
+            (date(2025, 6, 5), None, 'Sin término'),
+        ]
+        ocupacion = ocupacion_diaria(intervalos, desde, hasta)
+        self.assertEqual(len(ocupacion), 30)
+        for o in ocupacion:
+            esperados = [q for i, t, q in intervalos if t and i <= o.dia <= t]
+            self.assertEqual(o.ausentes, esperados)
+        self.assertEqual(ocupacion[9].ausentes, ['Beto', 'Carla'])
+
+    def test_semana_habil(self):
+        semana = semana_habil([(date(2025, 6, 6), date(2025, 6, 10), 'Ana')], date(2025, 6, 9), date(2025, 6, 10))
+        self.assertEqual([d['nombre'] for d in semana], ['Lun', 'Mar', 'Mié', 'Jue', 'Vie'])
+        self.assertEqual([d['total'] for d in semana], [1, 1, 0, 0, 0])
+        self.assertTrue(semana[1]['es_hoy'])
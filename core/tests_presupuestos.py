@@ -0,0 +1,298 @@
+"""
+Presupuesto de consultas y de tiempo para cada URL del proyecto.
+
+Recorre todas las URLs con nombre de config/urls.py y las solicita (GET) con
+un usuario de cada rol sobre un conjunto de datos sintético mediano. Cada
+vista debe estar declarada en PRESUPUESTOS: una vista nueva sin presupuesto,
+o un bucle N+1 que dispare las consultas, hace fallar el test.
+
+Los presupuestos valen para todos los roles (el rol con más consultas manda).
+Los renders de PDF se reemplazan por un PDF vacío: se mide la vista, no
+WeasyPrint.
+"""
+import tempfile
+from datetime import date, time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from asistencia.models import AlegacionAsistencia, DiaFestivo, HorarioFuncionario, RegistroAsistencia
+from core.pdf import PDFRenderService
+from core.synthetic import PREFIJO, generar_datos_sinteticos
+from core.testing import Presupuesto, PresupuestoConsultasMixin, urls_con_nombre
+from equipos.models import Equipo, FallaEquipo, HitoMantenimiento
+from liquidaciones.models import Liquidacion
+from permisos.models import SolicitudPermiso
+from users.models import CustomUser, DirectorioTelefonico, GrupoCorreo
+
+HASTA = date(2025, 6, 30)
+
+# Usuarios sintéticos por rol (ver core.synthetic._rol)
+USUARIOS_POR_ROL = {
+    'FUNCIONARIO': f'{PREFIJO}00010',
+    'SECRETARIA': f'{PREFIJO}00002',
+    'DIRECTOR': f'{PREFIJO}00001',
+    'ADMIN': f'{PREFIJO}00000',
+}
+
+# URLs que no se pueden solicitar con un GET autenticado
+EXCLUIDAS = {
+    'logout': 'solo POST; cierra la sesión del cliente',
+    'media': 'sirve archivos, sin consultas',
+}
+
+# Argumentos para las URLs con parámetros, a partir de los datos de prueba
+ARGUMENTOS = {
+    'solicitud_cancel': lambda d: [d.solicitud],
+    'admin_edit_solicitud': lambda d: [d.solicitud],
+    'admin_delete_solicitud': lambda d: [d.solicitud],
+    'solicitud_action': lambda d: [d.solicitud, 'approve'],
+    'reportes_pdf_individual': lambda d: [d.funcionario],
+    'descargar_liquidaciones_anio': lambda d: [HASTA.year],
+    'admin_funcionario_liquidaciones': lambda d: [d.funcionario],
+    'admin_eliminar_liquidacion': lambda d: [d.liquidacion],
+    'admin_descargar_liquidaciones_funcionario': lambda d: [d.funcionario, HASTA.year],
+    'editar_equipo': lambda d: [d.equipo],
+    'eliminar_equipo': lambda d: [d.equipo],
+    'asignar_equipo': lambda d: [d.equipo],
+    'devolver_equipo': lambda d: [d.prestamo],
+    'reporte_prestamos_pdf': lambda d: [d.funcionario],
+    'detalle_equipo': lambda d: [d.equipo],
+    'agregar_hito': lambda d: [d.equipo],
+    'actualizar_estado_falla': lambda d: [d.falla],
+    'reportar_falla': lambda d: [d.equipo],
+    'user_edit': lambda d: [d.funcionario],
+    'user_delete': lambda d: [d.funcionario],
+    'reset_user_password': lambda d: [d.funcionario],
+    'admin_change_password': lambda d: [d.funcionario],
+    'editar_grupo_correo': lambda d: [d.grupo],
+    'eliminar_grupo_correo': lambda d: [d.grupo],
+    'editar_directorio_telefonico': lambda d: [d.telefono],
+    'eliminar_directorio_telefonico': lambda d: [d.telefono],
+    'asistencia:crear_horario': lambda d: [d.funcionario],
+    'asistencia:editar_horario': lambda d: [d.horario],
+    'asistencia:toggle_horario': lambda d: [d.horario],
+    'asistencia:detalle_usuario': lambda d: [d.funcionario],
+    'asistencia:eliminar_registro': lambda d: [d.registro],
+    'asistencia:eliminar_todos_registros': lambda d: [d.funcionario],
+    'asistencia:reporte_asistencia_mensual_params': lambda d: [HASTA.year, HASTA.month],
+    'asistencia:reporte_asistencia_individual': lambda d: [HASTA.year, HASTA.month],
+    'asistencia:revisar_alegacion': lambda d: [d.alegacion],
+    'asistencia:eliminar_festivo': lambda d: [d.festivo],
+    'asistencia:justificar_registro': lambda d: [d.registro],
+    'job_status': lambda d: ['inexistente'],
+    'job_file': lambda d: ['inexistente'],
+    'job_wait': lambda d: ['inexistente'],
+}
+
+P = Presupuesto
+
+# Máximo de consultas (y segundos, si difiere del general) por vista, para
+# 40 funcionarios con un año de historia. Subir un presupuesto exige
+# justificar por qué la vista necesita más consultas.
+PRESUPUESTOS = {
+    # core
+    'login': P(4),
+    'dashboard': P(4),
+    'job_status': P(4),
+    'job_file': P(4),
+    'job_wait': P(4),
+    'health_check': P(5),
+    'metrics': P(11),
+    # permisos
+    'solicitar_permiso': P(5),
+    'solicitud_bypass': P(17),
+    'dashboard_funcionario': P(6),
+    'solicitud_cancel': P(4),
+    'dashboard_director': P(8),
+    'solicitudes_admin': P(11),
+    'admin_management': P(13),
+    'admin_edit_solicitud': P(7),
+    'admin_delete_solicitud': P(7),
+    'solicitud_action': P(4),
+    # licencias
+    'subir_licencia': P(6),
+    'licencia_list': P(12),
+    # reportes
+    'reportes': P(8),
+    'reportes_pdf_individual': P(7),
+    'reportes_pdf_individuales_zip': P(10),  # Incluye el registro y avance de la tarea en core_tarea
+    'reportes_pdf_colectivo': P(7),  # Incluye el registro y avance de la tarea en core_tarea
+    'reportes_mensual_dias_administrativos': P(6),
+    'reportes_excel': P(5),
+    'reportes_daem_excel': P(7),
+    # liquidaciones
+    'carga_liquidaciones': P(5),
+    'mis_liquidaciones': P(9),
+    'descargar_todas_liquidaciones': P(5),
+    'descargar_liquidaciones_anio': P(5),
+    'gestion_liquidaciones': P(11),
+    'admin_liquidaciones_overview': P(7),
+    'admin_funcionario_liquidaciones': P(8),
+    'admin_eliminar_liquidacion': P(4),
+    'admin_eliminar_todas_liquidaciones': P(4),
+    'admin_descargar_liquidaciones_funcionario': P(6),
+    # equipos
+    'lista_equipos': P(15),
+    'crear_equipo': P(6),
+    'editar_equipo': P(9),
+    'eliminar_equipo': P(6),
+    'asignar_equipo': P(5),
+    'devolver_equipo': P(8),
+    'reporte_prestamos_pdf': P(7),
+    'detalle_equipo': P(11),
+    'agregar_hito': P(6),
+    'export_inventario_excel': P(6),
+    'export_inventario_pdf': P(7),
+    'gestion_fallas': P(7),
+    'actualizar_estado_falla': P(7),
+    'reportar_falla': P(6),
+    'mis_equipos': P(7),
+    # usuarios
+    'user_list': P(7),
+    'email_directory': P(8),
+    'user_create': P(5),
+    'user_edit': P(7),
+    'user_delete': P(6),
+    'bulk_import_users': P(5),
+    'download_user_template': P(4),
+    'reset_user_password': P(6),
+    'admin_change_password': P(6),
+    'change_password': P(5),
+    'crear_grupo_correo': P(4),
+    'crear_directorio_telefonico': P(4),
+    'editar_grupo_correo': P(4),
+    'eliminar_grupo_correo': P(4),
+    'editar_directorio_telefonico': P(4),
+    'eliminar_directorio_telefonico': P(4),
+    'backup_export_users': P(5),
+    'backup_restore_users': P(5),
+    # admin_dashboard
+    'admin_dashboard:dashboard': P(7),  # Carga en frío; con la caché tibia el resumen no consulta
+    'admin_dashboard:logs': P(7),
+    'admin_dashboard:system_logs_export': P(5),
+    'admin_dashboard:blocked_users': P(7),
+    'admin_dashboard:system_backup': P(5),
+    'admin_dashboard:system_backup_export': P(43),  # Respaldo síncrono en el test: una consulta por tabla y por relación m2m, más el avance de la tarea
+    'admin_dashboard:system_backup_restore': P(4),
+    # asistencia
+    'asistencia:gestion_horarios': P(7),
+    'asistencia:carga_horarios': P(5),
+    'asistencia:crear_horario': P(5),
+    'asistencia:editar_horario': P(7),
+    'asistencia:toggle_horario': P(4),
+    'asistencia:gestion_asistencia': P(13),
+    'asistencia:detalle_usuario': P(8),
+    'asistencia:eliminar_registro': P(4),
+    'asistencia:eliminar_todos_registros': P(4),
+    'asistencia:carga_registros': P(5),
+    'asistencia:descargar_asistencia': P(5, segundos=8),  # Excel con todos los registros del período
+    'asistencia:mi_asistencia': P(15),
+    'asistencia:recalcular_estado': P(4),
+    'asistencia:eliminar_todas_asistencias': P(4),
+    'asistencia:reporte_asistencia_mensual': P(4),
+    'asistencia:reporte_asistencia_mensual_params': P(6),
+    'asistencia:reporte_asistencia_individual': P(5),
+    'asistencia:crear_alegacion': P(4),
+    'asistencia:gestion_alegaciones': P(7),
+    'asistencia:revisar_alegacion': P(4),
+    'asistencia:gestion_festivos': P(8),
+    'asistencia:crear_festivo': P(5),
+    'asistencia:eliminar_festivo': P(4),
+    'asistencia:justificar_registro': P(4),
+}
+
+
+def _render_vacio(self, html_string, *args, **kwargs):
+    return b'%PDF-1.4'
+
+
+def _render_varios_vacio(self, documentos, *args, **kwargs):
+    for clave, _html in documentos:
+        yield clave, b'%PDF-1.4'
+
+
+@override_settings(JOBS_RUN_SYNC=True, METRICS_REFRESH_SECONDS=0, METRICS_TOKEN='presupuesto')
+@mock.patch.object(PDFRenderService, 'render', _render_vacio)
+@mock.patch.object(PDFRenderService, 'render_varios', _render_varios_vacio)
+class PresupuestoConsultasTest(PresupuestoConsultasMixin, TestCase):
+    """Cada URL, con cada rol, dentro de su presupuesto de consultas y tiempo"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._media = tempfile.TemporaryDirectory()
+        # El respaldo de system_backup_export no debe tocar el manifiesto real
+        cls._respaldos = tempfile.TemporaryDirectory()
+        cls._ajustes = override_settings(MEDIA_ROOT=cls._media.name, SYSTEM_BACKUP_DIR=cls._respaldos.name)
+        cls._ajustes.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._ajustes.disable()
+        cls._media.cleanup()
+        cls._respaldos.cleanup()
+
+    @classmethod
+    def setUpTestData(cls):
+        generar_datos_sinteticos(funcionarios=40, anios=1, seed=1, hasta=HASTA, liquidaciones_meses=2)
+        admin = CustomUser.objects.get(username=USUARIOS_POR_ROL['ADMIN'])
+        funcionario = CustomUser.objects.get(username=USUARIOS_POR_ROL['FUNCIONARIO'])
+        equipo = Equipo.objects.filter(prestamos__activo=True).first()
+        registro = RegistroAsistencia.objects.filter(funcionario=funcionario).latest('fecha')
+        horario, _ = HorarioFuncionario.objects.get_or_create(
+            funcionario=funcionario,
+            defaults={'hora_entrada': time(8, 0)},
+        )
+        cls.datos = SimpleNamespace(
+            funcionario=funcionario.pk,
+            solicitud=SolicitudPermiso.objects.filter(usuario=funcionario).first().pk,
+            liquidacion=Liquidacion.objects.filter(funcionario=funcionario).first().pk,
+            equipo=equipo.pk,
+            prestamo=equipo.prestamos.filter(activo=True).first().pk,
+            falla=FallaEquipo.objects.create(equipo=equipo, funcionario=funcionario, descripcion='No enciende').pk,
+            grupo=GrupoCorreo.objects.create(nombre='Docentes', correo='docentes@example.com', creado_por=admin).pk,
+            telefono=DirectorioTelefonico.objects.create(lugar='Dirección', anexo='101', creado_por=admin).pk,
+            horario=horario.pk,
+            registro=registro.pk,
+            alegacion=AlegacionAsistencia.objects.create(registro_asistencia=registro, motivo='Olvidé marcar').pk,
+            festivo=DiaFestivo.objects.create(fecha=date(2025, 9, 18), nombre='Fiestas Patrias', creado_por=admin).pk,
+        )
+        HitoMantenimiento.objects.create(
+            equipo=equipo, tipo='INSPECCION', fecha=date(2025, 6, 1), descripcion='Revisión', creado_por=admin,
+        )
+
+    def test_todas_las_urls_tienen_presupuesto(self):
+        urls = set(urls_con_nombre()) - set(EXCLUIDAS)
+        self.assertEqual(sorted(urls - set(PRESUPUESTOS)), [], 'URLs sin presupuesto declarado')
+        self.assertEqual(sorted(set(PRESUPUESTOS) - urls), [], 'Presupuestos de URLs inexistentes')
+
+    def verificar_rol(self, rol):
+        self.client.force_login(CustomUser.objects.get(username=USUARIOS_POR_ROL[rol]))
+        for nombre, parametros in sorted(urls_con_nombre().items()):
+            if nombre in EXCLUIDAS or nombre not in PRESUPUESTOS:
+                continue
+            args = ARGUMENTOS[nombre](self.datos) if parametros else []
+            url = reverse(nombre, args=args)
+            cache.clear()
+            if nombre == 'metrics':
+                self.client.defaults['HTTP_AUTHORIZATION'] = 'Bearer presupuesto'
+            with self.subTest(rol=rol, url=nombre):
+                self.assertDentroDePresupuesto(self.client, url, PRESUPUESTOS[nombre])
+            self.client.defaults.pop('HTTP_AUTHORIZATION', None)
+
+    def test_funcionario(self):
+        self.verificar_rol('FUNCIONARIO')
+
+    def test_secretaria(self):
+        self.verificar_rol('SECRETARIA')
+
+    def test_director(self):
+        self.verificar_rol('DIRECTOR')
+
+    def test_admin(self):
+        self.verificar_rol('ADMIN')
@@ -3,14 +3,16 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView, View
 from django.contrib.auth.views import LoginView
 from django.urls import reverse_lazy
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404, FileResponse, HttpResponse
 from django.db import connection
 from django.core.files.storage import default_storage
 from django.conf import settings
 from django.contrib import messages
-import psutil
+import hmac
 import os
 from datetime import datetime
+from .jobs import get_job, puede_ver, artifact_path, COMPLETADO
+from .metrics import estado_sistema, exposicion
 
 class CustomLoginView(LoginView):
     template_name = 'core/login.html'
@@ -46,6 +48,61 @@ class DashboardView(LoginRequiredMixin, View):
             return redirect('dashboard_funcionario')
 
 
+class JobStatusView(LoginRequiredMixin, View):
+    """Estado de una tarea en segundo plano (consultado por la plantilla base)."""
+
+    def get(self, request, job_id):
+        job = get_job(job_id)
+        if job is None or not puede_ver(job, request.user):
+            raise Http404("Tarea no encontrada")
+
+        return JsonResponse({
+            'id': job['id'],
+            'nombre': job['nombre'],
+            'estado': job['estado'],
+            'progreso': job['progreso'],
+            'total': job['total'],
+            'mensaje': job['mensaje'],
+            'resultado': job['resultado'],
+            'error': job['error'],
+        })
+
+
+class JobFileView(LoginRequiredMixin, View):
+    """Descarga del archivo generado por una tarea en segundo plano."""
+
+    def get(self, request, job_id):
+        job = get_job(job_id)
+        if job is None or not puede_ver(job, request.user):
+            raise Http404("Tarea no encontrada")
+        resultado = job['resultado'] or {}
+        if job['estado'] != COMPLETADO or 'archivo' not in resultado:
+            raise Http404("Archivo no disponible")
+
+        try:
+            archivo = open(artifact_path(job_id), 'rb')
+        except FileNotFoundError:
+            raise Http404("El archivo expiró")
+
+        content_type = resultado['content_type']
+        return FileResponse(
+            archivo,
+            content_type=content_type,
+            as_attachment=content_type != 'application/pdf',
+            filename=resultado['archivo'],
+        )
+
+
+class JobWaitView(LoginRequiredMixin, View):
+    """Página que espera a que termine una tarea y luego abre su archivo."""
+
+    def get(self, request, job_id):
+        job = get_job(job_id)
+        if job is None or not puede_ver(job, request.user):
+            raise Http404("Tarea no encontrada")
+        return render(request, 'core/job_espera.html', {'job': job})
+
+
 class HealthCheckView(View):
     """
     Health check endpoint con métricas detalladas del sistema.
@@ -91,53 +148,51 @@ class HealthCheckView(View):
                 health_data['storage'] = {'status': 'unhealthy', 'error': str(e)}
                 health_data['status'] = 'unhealthy'
 
-            # System metrics - ONLY expose in detailed mode
-            try:
-                health_data['system'] = {
-                    'cpu_percent': psutil.cpu_percent(interval=1),
-                    'memory': {
-                        'total': psutil.virtual_memory().total,
-                        'available': psutil.virtual_memory().available,
-                        'percent': psutil.virtual_memory().percent,
-                    },
-                    'disk': {
-                        'total': psutil.disk_usage('/').total,
-                        'free': psutil.disk_usage('/').free,
-                        'percent': psutil.disk_usage('/').percent,
-                    }
-                }
-            except Exception as e:
-                health_data['system'] = {'status': 'error', 'error': str(e)}
-
-            # Application metrics - ONLY expose in detailed mode
-            try:
-                from users.models import CustomUser
-                from liquidaciones.models import Liquidacion
-                from permisos.models import SolicitudPermiso
-
+            # System and application metrics - ONLY expose in detailed mode.
+            # Se leen del estado refrescado en segundo plano (core.metrics):
+            # no bloquean el request midiendo CPU ni repiten los count().
+            estado = estado_sistema.instantanea()
+            health_data['system'] = estado.get('system', {'status': 'error'})
+            contadores = estado.get('metrics', {})
+            if 'error' in contadores:
+                health_data['metrics'] = {'status': 'error', 'error': contadores['error']}
+            else:
                 health_data['metrics'] = {
                     'users': {
-                        'total': CustomUser.objects.count(),
-                        'active_today': CustomUser.objects.filter(
-                            last_login__date=datetime.now().date()
-                        ).count()
+                        'total': contadores.get('users_total'),
+                        'active_today': contadores.get('users_active_today'),
                     },
                     'payrolls': {
-                        'total': Liquidacion.objects.count(),
-                        'this_month': Liquidacion.objects.filter(
-                            mes=datetime.now().month,
-                            anio=datetime.now().year
-                        ).count()
+                        'total': contadores.get('payrolls_total'),
+                        'this_month': contadores.get('payrolls_this_month'),
                     },
                     'permissions': {
-                        'total': SolicitudPermiso.objects.count(),
-                        'pending': SolicitudPermiso.objects.filter(estado='PENDIENTE').count()
-                    }
+                        'total': contadores.get('permissions_total'),
+                        'pending': contadores.get('permissions_pending'),
+                    },
                 }
-            except Exception as e:
-                health_data['metrics'] = {'status': 'error', 'error': str(e)}
 
         # Return appropriate HTTP status
         status_code = 200 if health_data['status'] == 'healthy' else 503
 
         return JsonResponse(health_data, status=status_code)
+
+
+class MetricsView(View):
+    """
+    Métricas en formato de texto de Prometheus.
+
+    Requiere ``Authorization: Bearer <METRICS_TOKEN>``. Sin METRICS_TOKEN
+    configurado el endpoint solo responde con DEBUG activo. Los valores son
+    los del worker que atiende la consulta.
+    """
+
+    def get(self, request):
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        if token:
+            if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+                return HttpResponse('No autorizado', status=401, content_type='text/plain')
+        elif not settings.DEBUG:
+            raise Http404("Métricas deshabilitadas")
+
+        return HttpResponse(exposicion(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -4,15 +4,16 @@ from django.contrib import messages
 from django.http import HttpResponse
 from django.utils import timezone
 from django.conf import settings
-from weasyprint import HTML
+from core.pdf import render_pdf
 from django.db.models import Prefetch
 from .models import Equipo, PrestamoEquipo, FallaEquipo
 from users.models import CustomUser
 from datetime import datetime
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from core.lazy import importar_diferido
 from admin_dashboard.utils import registrar_log, get_client_ip
 
+openpyxl = importar_diferido('openpyxl')
+
 
 @login_required
 def lista_equipos(request):
@@ -407,7 +408,7 @@ def reporte_prestamos_pdf(request, usuario_id=None):
         'fecha': timezone.now()
     }).content.decode('utf-8')
 
-    pdf = HTML(string=html_string).write_pdf()
+    pdf = render_pdf(html_string)
 
     response = HttpResponse(pdf, content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
@@ -486,6 +487,8 @@ def actualizar_estado_falla(request, falla_id):
 @login_required
 def export_inventario_excel(request):
     """Exportar inventario de equipos a Excel con asignaciones"""
+    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+
     if request.user.role not in ('ADMIN', 'SECRETARIA'):
         messages.error(request, 'No tienes permisos para acceder a esta sección.')
         return redirect('dashboard')
@@ -599,7 +602,7 @@ def export_inventario_pdf(request):
         'total': equipos.count()
     }).content.decode('utf-8')
     
-    pdf = HTML(string=html_string).write_pdf()
+    pdf = render_pdf(html_string)
     
     response = HttpResponse(pdf, content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename=inventario_equipos_{datetime.now().strftime("%Y%m%d")}.pdf'
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 17:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licencias', '0003_licenciamedica_archivo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='licenciamedica',
+            index=models.Index(fields=['usuario', 'fecha_inicio'], name='licencia_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='licenciamedica',
+            index=models.Index(fields=['fecha_inicio'], name='licencia_fecha_idx'),
+        ),
+    ]
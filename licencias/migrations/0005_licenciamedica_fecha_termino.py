@@ -0,0 +1,39 @@
+# Generated by Django 5.2.9 on 2026-10-19 18:40
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+TAMANO_LOTE = 2000
+
+
+def calcular_fecha_termino(apps, schema_editor):
+    """Completa fecha_termino (último día cubierto) de las licencias existentes."""
+    LicenciaMedica = apps.get_model('licencias', 'LicenciaMedica')
+    licencias = LicenciaMedica.objects.using(schema_editor.connection.alias)
+    lote = []
+    for licencia in licencias.only('pk', 'fecha_inicio', 'dias').iterator(chunk_size=TAMANO_LOTE):
+        # Una licencia de 0 días (dato antiguo inválido) cubre al menos su fecha de inicio
+        licencia.fecha_termino = licencia.fecha_inicio + timedelta(days=max(licencia.dias, 1) - 1)
+        lote.append(licencia)
+        if len(lote) >= TAMANO_LOTE:
+            licencias.bulk_update(lote, ['fecha_termino'])
+            lote = []
+    if lote:
+        licencias.bulk_update(lote, ['fecha_termino'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licencias', '0004_period_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='licenciamedica',
+            name='fecha_termino',
+            field=models.DateField(null=True, editable=False),
+        ),
+        migrations.RunPython(calcular_fecha_termino, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-19 18:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licencias', '0005_licenciamedica_fecha_termino'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='licenciamedica',
+            name='fecha_termino',
+            field=models.DateField(editable=False, help_text='Último día de la licencia (calculado desde fecha_inicio y dias)'),
+        ),
+        migrations.AddIndex(
+            model_name='licenciamedica',
+            index=models.Index(fields=['usuario', 'fecha_inicio', 'fecha_termino'], name='licencia_usuario_rango_idx'),
+        ),
+    ]
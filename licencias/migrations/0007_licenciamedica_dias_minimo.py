@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-19 19:25
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licencias', '0006_licenciamedica_fecha_termino_indice'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='licenciamedica',
+            name='dias',
+            field=models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
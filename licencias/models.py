@@ -1,13 +1,49 @@
+from datetime import timedelta
+
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.conf import settings
 
 class LicenciaMedica(models.Model):
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='licencias')
     fecha_inicio = models.DateField()
-    dias = models.PositiveIntegerField()
+    dias = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    fecha_termino = models.DateField(editable=False, help_text="Último día de la licencia (calculado desde fecha_inicio y dias)")
     archivo = models.FileField(upload_to='licencias/', null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='licencias_creadas', help_text="Usuario que registró la licencia")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario', 'fecha_inicio'], name='licencia_usuario_fecha_idx'),
+            models.Index(fields=['fecha_inicio'], name='licencia_fecha_idx'),
+            # Licencias de un funcionario que se traslapan con una fecha o rango
+            models.Index(fields=['usuario', 'fecha_inicio', 'fecha_termino'], name='licencia_usuario_rango_idx'),
+        ]
+
     def __str__(self):
         return f"{self.usuario} - {self.fecha_inicio} ({self.dias} días)"
+
+    @staticmethod
+    def calcular_fecha_termino(fecha_inicio, dias):
+        """
+        Último día cubierto: la licencia incluye ``fecha_inicio`` y dura ``dias``
+        días corridos. Una licencia guardada sin validar con 0 días cubre al
+        menos su fecha de inicio.
+        """
+        return fecha_inicio + timedelta(days=max(dias, 1) - 1)
+
+    def actualizar_fecha_termino(self):
+        self.fecha_termino = self.calcular_fecha_termino(self.fecha_inicio, self.dias)
+
+    def save(self, *args, **kwargs):
+        self.actualizar_fecha_termino()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'fecha_inicio', 'dias'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'fecha_termino'}
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def filtro_traslape(desde, hasta=None):
+        """Q de las licencias que cubren algún día entre ``desde`` y ``hasta`` (incluidos)."""
+        return models.Q(fecha_inicio__lte=hasta or desde, fecha_termino__gte=desde)
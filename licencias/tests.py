@@ -1,3 +1,45 @@
+from datetime import date
+
 from django.test import TestCase
 
-# Create your tests here.
+from asistencia.models import RegistroAsistencia
+from users.models import CustomUser
+from .forms import LicenciaForm
+from .models import LicenciaMedica
+
+
+class FechaTerminoLicenciaTest(TestCase):
+    """Tests para la fecha de término persistida de las licencias"""
+
+    def setUp(self):
+        self.usuario = CustomUser.objects.create_user(username='func_lic', run='99999999-9', password='x')
+
+    def test_save_calcula_y_actualiza_termino(self):
+        licencia = LicenciaMedica.objects.create(usuario=self.usuario, fecha_inicio=date(2025, 3, 1), dias=5)
+        self.assertEqual(licencia.fecha_termino, date(2025, 3, 5))
+        licencia.dias = 10
+        licencia.save(update_fields=['dias'])
+        licencia.refresh_from_db()
+        self.assertEqual(licencia.fecha_termino, date(2025, 3, 10))
+
+    def test_traslape_sin_limite_de_dias_hacia_atras(self):
+        # Licencia larga: la fecha consultada está a más de 30 días del inicio
+        LicenciaMedica.objects.create(usuario=self.usuario, fecha_inicio=date(2025, 1, 1), dias=60)
+        filtro = LicenciaMedica.filtro_traslape
+        self.assertTrue(LicenciaMedica.objects.filter(filtro(date(2025, 3, 1))).exists())
+        self.assertFalse(LicenciaMedica.objects.filter(filtro(date(2025, 3, 2))).exists())
+        self.assertTrue(LicenciaMedica.objects.filter(filtro(date(2024, 12, 1), date(2025, 1, 1))).exists())
+
+        registro = RegistroAsistencia(funcionario=self.usuario, fecha=date(2025, 2, 20))
+        with self.assertNumQueries(1):
+            self.assertTrue(registro.tiene_licencia_medica())
+        self.assertFalse(RegistroAsistencia(funcionario=self.usuario, fecha=date(2025, 3, 2)).tiene_licencia_medica())
+
+    def test_licencia_sin_dias(self):
+        form = LicenciaForm(data={'usuario': self.usuario.pk, 'fecha_inicio': '2025-03-01', 'dias': 0})
+        self.assertFalse(form.is_valid())
+        self.assertIn('dias', form.errors)
+
+        # Guardada sin validar, la licencia cubre al menos su fecha de inicio
+        licencia = LicenciaMedica.objects.create(usuario=self.usuario, fecha_inicio=date(2025, 3, 1), dias=0)
+        self.assertEqual(licencia.fecha_termino, date(2025, 3, 1))
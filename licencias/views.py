@@ -6,6 +6,7 @@ from django import forms
 from django.db.models import Sum, Count
 from django.db.models.functions import TruncMonth, TruncYear
 from datetime import datetime
+from core.periods import filtro_periodo
 from .models import LicenciaMedica
 from .forms import LicenciaForm
 
@@ -50,10 +51,7 @@ class LicenciaListView(LoginRequiredMixin, ListView):
         year = self.request.GET.get('year')
         month = self.request.GET.get('month')
         
-        if year:
-            queryset = queryset.filter(fecha_inicio__year=year)
-        if month:
-            queryset = queryset.filter(fecha_inicio__month=month)
+        queryset = queryset.filter(filtro_periodo('fecha_inicio', year, month))
         
         return queryset.order_by('-fecha_inicio')
 
@@ -64,8 +62,11 @@ class LicenciaListView(LoginRequiredMixin, ListView):
         selected_year = self.request.GET.get('year')
         selected_month = self.request.GET.get('month')
         
-        context['selected_year'] = int(selected_year) if selected_year else None
-        context['selected_month'] = int(selected_month) if selected_month else None
+        try:
+            context['selected_year'] = int(selected_year) if selected_year else None
+            context['selected_month'] = int(selected_month) if selected_month else None
+        except ValueError:
+            context['selected_year'] = context['selected_month'] = None
         
         # Años disponibles
         years = LicenciaMedica.objects.filter(
@@ -88,8 +89,8 @@ class LicenciaListView(LoginRequiredMixin, ListView):
         # Estadísticas del año seleccionado (o año actual)
         current_year = selected_year if selected_year else datetime.now().year
         licencias_año_actual = LicenciaMedica.objects.filter(
-            usuario=self.request.user,
-            fecha_inicio__year=current_year
+            filtro_periodo('fecha_inicio', current_year),
+            usuario=self.request.user
         )
         
         context['total_dias_año'] = licencias_año_actual.aggregate(Sum('dias'))['dias__sum'] or 0
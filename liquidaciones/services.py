@@ -10,6 +10,7 @@ from django.db.models import QuerySet
 from .models import Liquidacion
 from users.models import CustomUser
 from core.utils import normalize_rut, clean_rut_for_matching
+from core.purge import purgar_en_lotes, eliminar_archivos
 
 logger = logging.getLogger(__name__)
 
@@ -142,6 +143,45 @@ class PayrollService:
             'promedio_por_anio': round(total_liquidaciones / anios_con_liquidaciones, 1) if anios_con_liquidaciones > 0 else 0
         }
 
+    @staticmethod
+    def purge_all(reporter) -> dict:
+        """
+        Elimina todas las liquidaciones del sistema y luego sus archivos PDF.
+
+        Las filas se borran por lotes con DELETE directo; las rutas de los
+        archivos se recolectan en cada lote y se eliminan del storage en una
+        segunda pasada, una vez confirmado el borrado en la base de datos.
+
+        Args:
+            reporter: JobReporter de la tarea en segundo plano
+
+        Returns:
+            Dict con la cantidad de liquidaciones y archivos eliminados
+        """
+        total = Liquidacion.objects.count()
+        archivos = []
+
+        def recolectar_archivos(pks):
+            archivos.extend(
+                Liquidacion.objects.filter(pk__in=pks).exclude(archivo='').values_list('archivo', flat=True)
+            )
+
+        reporter.progress(0, total, 'Eliminando liquidaciones...')
+        eliminadas = purgar_en_lotes(
+            Liquidacion.objects.all(),
+            antes_de_borrar=recolectar_archivos,
+            progreso=lambda n: reporter.progress(n, total),
+        )
+
+        reporter.progress(0, len(archivos), 'Eliminando archivos PDF...')
+        archivos_eliminados = eliminar_archivos(
+            archivos,
+            progreso=lambda n: reporter.progress(n, len(archivos)),
+        )
+
+        logger.info(f"Purga de liquidaciones: {eliminadas} registros, {archivos_eliminados} archivos")
+        return {'eliminadas': eliminadas, 'archivos': archivos_eliminados}
+
 
 class PayrollValidationService:
     """Servicio para validaciones relacionadas con liquidaciones"""
@@ -1,5 +1,6 @@
 import os
 import tempfile
+from unittest import mock
 from django.test import TestCase
 from django.core.files.base import ContentFile
 from django.contrib.auth import get_user_model
@@ -106,4 +107,44 @@ class PayrollUploadTest(TestCase):
         for input_rut, expected in test_cases:
             with self.subTest(input_rut=input_rut):
                 result = normalize_rut(input_rut)
-                self.assertEqual(result, expected)
\ No newline at end of file
+                self.assertEqual(result, expected)
+
+class PayrollPurgeTest(TestCase):
+    """Test para la purga masiva de liquidaciones"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.user = User.objects.create_user(
+            run='12345678-9',
+            username='12345678-9',
+            first_name='Juan',
+            last_name='Pérez',
+            email='juan.perez@test.cl'
+        )
+
+    def test_purge_all_elimina_registros_y_archivos(self):
+        """Test que la purga elimina por lotes las filas y luego los PDF"""
+        from django.test import override_settings
+        from core.jobs import submit_job, get_job, COMPLETADO
+        from core import purge
+        from .services import PayrollService
+
+        with override_settings(MEDIA_ROOT=self.media_root, JOBS_RUN_SYNC=True):
+            rutas = []
+            for mes in range(1, 4):
+                liq = Liquidacion.objects.create(
+                    funcionario=self.user, mes=mes, anio=2024,
+                    archivo=ContentFile(b'%PDF-1.4', name=f'liq_{mes}.pdf')
+                )
+                rutas.append(liq.archivo.path)
+
+            # Forzar varios lotes
+            with mock.patch.object(purge, 'PURGE_BATCH_SIZE', 2):
+                job_id = submit_job('purga_liquidaciones', PayrollService.purge_all, owner=self.user)
+
+            job = get_job(job_id)
+            self.assertEqual(job['estado'], COMPLETADO)
+            self.assertEqual(job['resultado'], {'eliminadas': 3, 'archivos': 3})
+            self.assertFalse(Liquidacion.objects.exists())
+            for ruta in rutas:
+                self.assertFalse(os.path.exists(ruta))
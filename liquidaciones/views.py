@@ -2,7 +2,6 @@ import io
 import re
 import zipfile
 import logging
-import pypdf
 from django.shortcuts import render, redirect
 from django.views.generic import FormView, ListView, View
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
@@ -16,6 +15,7 @@ from .models import Liquidacion
 from .services import PayrollService, PayrollValidationService
 from users.models import CustomUser
 from core.utils import normalize_rut, clean_rut_for_matching
+from core.jobs import submit_job, job_message_tags
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -483,15 +483,13 @@ class AdminEliminarTodasLiquidacionesView(LoginRequiredMixin, UserPassesTestMixi
             messages.error(request, 'Frase de confirmación de seguridad incorrecta. No se eliminaron las liquidaciones.')
             return redirect('admin_liquidaciones_overview')
 
-        liquidaciones = Liquidacion.objects.all()
-        count = 0
-        for liq in liquidaciones:
-            if liq.archivo:
-                liq.archivo.delete(save=False)
-            liq.delete()
-            count += 1
-            
-        messages.success(request, f'Se eliminaron totalmente {count} liquidaciones del sistema.')
+        # La purga se ejecuta en segundo plano: borrado por lotes y luego archivos
+        job_id = submit_job('purga_liquidaciones', PayrollService.purge_all, owner=request.user)
+        messages.info(
+            request,
+            'Se inició la eliminación de todas las liquidaciones del sistema.',
+            extra_tags=job_message_tags(job_id)
+        )
         return redirect('admin_liquidaciones_overview')
 
 
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 17:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('permisos', '0007_solicitudpermiso_is_unlocked'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='solicitudpermiso',
+            index=models.Index(fields=['usuario', 'fecha_inicio'], name='permiso_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudpermiso',
+            index=models.Index(fields=['estado', 'fecha_inicio'], name='permiso_estado_fecha_idx'),
+        ),
+    ]
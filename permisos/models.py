@@ -32,6 +32,13 @@ class SolicitudPermiso(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Filtros por período (core.periods) por funcionario y por estado
+            models.Index(fields=['usuario', 'fecha_inicio'], name='permiso_usuario_fecha_idx'),
+            models.Index(fields=['estado', 'fecha_inicio'], name='permiso_estado_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"{self.usuario} - {self.fecha_inicio} ({self.dias_solicitados} días)"
 
@@ -10,9 +10,26 @@ from django.core.paginator import Paginator
 from .models import SolicitudPermiso
 from .forms import SolicitudForm, SolicitudBypassForm, SolicitudAdminEditForm
 from users.models import CustomUser
+from core.ocupacion import DIAS_HABILES, semana_habil
 from core.services import BusinessDayCalculator
 from admin_dashboard.utils import registrar_log, get_client_ip
 
+def resumen_semanal_aprobados(hoy=None):
+    """Permisos aprobados por día hábil de la semana actual (una sola consulta)."""
+    hoy = hoy or timezone.localdate()
+    lunes = hoy - timedelta(days=hoy.weekday())
+    permisos = SolicitudPermiso.objects.filter(
+        estado='APROBADO',
+        fecha_inicio__lte=lunes + timedelta(days=len(DIAS_HABILES) - 1),
+        fecha_termino__gte=lunes,
+    ).order_by('usuario__first_name', 'usuario__last_name').values_list(
+        'fecha_inicio', 'fecha_termino', 'usuario__first_name', 'usuario__last_name',
+    )
+    return semana_habil(
+        ((desde, hasta, f'{nombre} {apellido}'.strip()) for desde, hasta, nombre, apellido in permisos),
+        lunes, hoy,
+    )
+
 class SolicitudCancelView(LoginRequiredMixin, View):
     """Vista para que el usuario pueda cancelar su propia solicitud pendiente"""
     
@@ -160,34 +177,16 @@ class SolicitudDirectorDashboardView(LoginRequiredMixin, UserPassesTestMixin, Li
         return self.request.user.role in ['DIRECTOR', 'DIRECTIVO', 'SECRETARIA']
 
     def get_queryset(self):
-        return SolicitudPermiso.objects.filter(estado='PENDIENTE').order_by('created_at')
+        return SolicitudPermiso.objects.filter(estado='PENDIENTE').select_related('usuario').order_by('created_at')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Historial con paginación - mostrar 10 por página (usar h_page)
-        historial_qs = SolicitudPermiso.objects.exclude(estado='PENDIENTE').order_by('-updated_at')
+        historial_qs = SolicitudPermiso.objects.exclude(estado='PENDIENTE').select_related('usuario').order_by('-updated_at')
         paginator = Paginator(historial_qs, 10)
         page_number = self.request.GET.get('h_page')
         context['historial_page'] = paginator.get_page(page_number)
-        # --- Lógica de Resumen Semanal de Aceptados ---
-        hoy = timezone.now().date()
-        lunes = hoy - timedelta(days=hoy.weekday())
-        
-        dias_semana = []
-        for i in range(5): # Lunes a Viernes
-            fecha_dia = lunes + timedelta(days=i)
-            # Contar permisos aprobados que cubren este día
-            count = SolicitudPermiso.objects.filter(
-                estado='APROBADO',
-                fecha_inicio__lte=fecha_dia,
-                fecha_termino__gte=fecha_dia
-            ).count()
-            dias_semana.append({
-                'nombre': ['Lun', 'Mar', 'Mié', 'Jue', 'Vie'][i],
-                'count': count,
-                'es_hoy': fecha_dia == hoy
-            })
-        context['resumen_semanal'] = dias_semana
+        context['resumen_semanal'] = resumen_semanal_aprobados()
         
         context['dias_disponibles'] = self.request.user.dias_disponibles
         context['dias_totales'] = getattr(self.request.user, 'dias_totales', 6.0)
@@ -204,34 +203,17 @@ class SolicitudAdminListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         return self.request.user.role in ['DIRECTOR', 'DIRECTIVO', 'SECRETARIA']
 
     def get_queryset(self):
-        return SolicitudPermiso.objects.filter(estado='PENDIENTE').order_by('created_at')
+        return SolicitudPermiso.objects.filter(estado='PENDIENTE').select_related('usuario').order_by('created_at')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Historial con paginación - mostrar 10 por página (usar h_page)
-        historial_qs = SolicitudPermiso.objects.exclude(estado='PENDIENTE').order_by('-updated_at')
+        historial_qs = SolicitudPermiso.objects.exclude(estado='PENDIENTE').select_related('usuario').order_by('-updated_at')
         paginator = Paginator(historial_qs, 10)
         page_number = self.request.GET.get('h_page')
         context['historial_page'] = paginator.get_page(page_number)
 
-        # --- Lógica de Resumen Semanal de Aceptados ---
-        hoy = timezone.now().date()
-        lunes = hoy - timedelta(days=hoy.weekday())
-        
-        dias_semana = []
-        for i in range(5):
-            fecha_dia = lunes + timedelta(days=i)
-            count = SolicitudPermiso.objects.filter(
-                estado='APROBADO',
-                fecha_inicio__lte=fecha_dia,
-                fecha_termino__gte=fecha_dia
-            ).count()
-            dias_semana.append({
-                'nombre': ['Lun', 'Mar', 'Mié', 'Jue', 'Vie'][i],
-                'count': count,
-                'es_hoy': fecha_dia == hoy
-            })
-        context['resumen_semanal'] = dias_semana
+        context['resumen_semanal'] = resumen_semanal_aprobados()
         context['current_filter'] = self.request.GET.get('status', 'all')
         
         return context
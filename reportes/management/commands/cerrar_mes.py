@@ -0,0 +1,56 @@
+"""
+Cierre mensual del reporte DAEM.
+Ejecutar con: python manage.py cerrar_mes [--anio 2025 --mes 3] [--forzar]
+
+Sin argumentos cierra el mes anterior. Los reportes DAEM de un mes cerrado
+se leen desde el resumen guardado (ResumenMensualDAEM).
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from admin_dashboard.utils import registrar_log
+from core.periods import rango_periodo
+from reportes.models import CierreMensual, ResumenMensualDAEM
+from reportes.services import cerrar_mes
+
+
+class Command(BaseCommand):
+    help = 'Cierra un mes del reporte DAEM guardando el resumen por funcionario'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anio', type=int, help='Año a cerrar (por defecto, el del mes anterior)')
+        parser.add_argument('--mes', type=int, help='Mes a cerrar, 1-12 (por defecto, el mes anterior)')
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help='Regenerar el resumen si el mes ya estaba cerrado',
+        )
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        anterior = hoy.replace(day=1) - timedelta(days=1)
+        anio = options['anio'] or anterior.year
+        mes = options['mes'] or anterior.month
+
+        if not 1 <= mes <= 12:
+            raise CommandError(f'Mes inválido: {mes}')
+        _, hasta = rango_periodo(anio, mes)
+        if hasta > hoy:
+            raise CommandError(f'El mes {mes:02d}/{anio} aún no termina')
+        if CierreMensual.objects.filter(anio=anio, mes=mes).exists() and not options['forzar']:
+            raise CommandError(f'El mes {mes:02d}/{anio} ya está cerrado (use --forzar para regenerarlo)')
+
+        self.stdout.write(f'🔄 Cerrando mes {mes:02d}/{anio}...')
+        cerrar_mes(anio, mes)
+        funcionarios = ResumenMensualDAEM.objects.filter(anio=anio, mes=mes).count()
+
+        registrar_log(
+            usuario=None,
+            tipo='SYSTEM',
+            accion='Cierre mensual DAEM',
+            descripcion=f'Cierre del mes {mes:02d}/{anio} con {funcionarios} funcionarios',
+            metadata={'anio': anio, 'mes': mes},
+        )
+        self.stdout.write(self.style.SUCCESS(f'✅ Mes {mes:02d}/{anio} cerrado: {funcionarios} funcionarios'))
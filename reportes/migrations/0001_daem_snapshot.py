@@ -0,0 +1,58 @@
+# Generated by Django 5.2.9 on 2026-10-19 17:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CierreMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField()),
+                ('mes', models.PositiveSmallIntegerField()),
+                ('cerrado_en', models.DateTimeField(auto_now=True)),
+                ('cerrado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cierres_mensuales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Cierre Mensual',
+                'verbose_name_plural': 'Cierres Mensuales',
+                'ordering': ['-anio', '-mes'],
+                'unique_together': {('anio', 'mes')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenMensualDAEM',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField()),
+                ('mes', models.PositiveSmallIntegerField()),
+                ('orden', models.PositiveIntegerField(help_text='Posición en la nómina (por nombre) al cerrar')),
+                ('nombre', models.CharField(max_length=300)),
+                ('run', models.CharField(max_length=20)),
+                ('cargo', models.CharField(blank=True, max_length=100)),
+                ('dias_disponibles', models.FloatField(default=0)),
+                ('permisos', models.PositiveIntegerField(default=0)),
+                ('dias_permiso', models.FloatField(default=0)),
+                ('licencias', models.PositiveIntegerField(default=0)),
+                ('dias_licencia', models.PositiveIntegerField(default=0)),
+                ('detalle_permisos', models.JSONField(blank=True, default=list)),
+                ('detalle_licencias', models.JSONField(blank=True, default=list)),
+                ('usuario', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resumenes_daem', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resumen Mensual DAEM',
+                'verbose_name_plural': 'Resúmenes Mensuales DAEM',
+                'indexes': [models.Index(fields=['anio', 'mes', 'orden'], name='resumen_daem_periodo_idx')],
+            },
+        ),
+    ]
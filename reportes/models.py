@@ -1,3 +1,70 @@
 from django.db import models
+from django.conf import settings
 
-# Create your models here.
+
+class CierreMensual(models.Model):
+    """
+    Mes cerrado para el reporte DAEM.
+
+    Al cerrar un mes (comando ``cerrar_mes``) se guarda una fila de
+    ResumenMensualDAEM por funcionario y los reportes de ese período se leen
+    desde ahí en lugar de recalcularse desde permisos y licencias.
+    """
+    anio = models.PositiveSmallIntegerField()
+    mes = models.PositiveSmallIntegerField()
+    cerrado_en = models.DateTimeField(auto_now=True)
+    cerrado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='cierres_mensuales'
+    )
+
+    class Meta:
+        unique_together = ('anio', 'mes')
+        ordering = ['-anio', '-mes']
+        verbose_name = 'Cierre Mensual'
+        verbose_name_plural = 'Cierres Mensuales'
+
+    def __str__(self):
+        return f"Cierre {self.mes:02d}/{self.anio}"
+
+
+class ResumenMensualDAEM(models.Model):
+    """
+    Totales de un funcionario en un mes cerrado.
+
+    Los datos del funcionario se copian al cerrar (sin FK que recorrer al
+    leer) y el detalle de permisos y licencias se guarda como JSON para
+    poder reconstruir las planillas y el PDF mensual tal como se enviaron.
+    """
+    anio = models.PositiveSmallIntegerField()
+    mes = models.PositiveSmallIntegerField()
+    orden = models.PositiveIntegerField(help_text="Posición en la nómina (por nombre) al cerrar")
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='resumenes_daem'
+    )
+    nombre = models.CharField(max_length=300)
+    run = models.CharField(max_length=20)
+    cargo = models.CharField(max_length=100, blank=True)
+    dias_disponibles = models.FloatField(default=0)
+    permisos = models.PositiveIntegerField(default=0)
+    dias_permiso = models.FloatField(default=0)
+    licencias = models.PositiveIntegerField(default=0)
+    dias_licencia = models.PositiveIntegerField(default=0)
+    detalle_permisos = models.JSONField(default=list, blank=True)
+    detalle_licencias = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['anio', 'mes', 'orden'], name='resumen_daem_periodo_idx'),
+        ]
+        verbose_name = 'Resumen Mensual DAEM'
+        verbose_name_plural = 'Resúmenes Mensuales DAEM'
+
+    def __str__(self):
+        return f"{self.nombre} - {self.mes:02d}/{self.anio}"
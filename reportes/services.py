@@ -0,0 +1,716 @@
+"""
+Servicios de consulta para los reportes de permisos y licencias.
+
+Las vistas HTML, PDF y Excel de reportes comparten el mismo conjunto de datos:
+se calcula una vez como filas livianas (dataclasses, sin instancias de modelo)
+y se memoiza en la caché por (filtros, versión de datos). Las versiones por
+dominio (core.cache) se incrementan desde señales cuando cambian permisos,
+licencias o usuarios, por lo que no es necesario expirar entradas manualmente.
+"""
+
+import hashlib
+import zipfile
+from datetime import date, datetime
+from dataclasses import dataclass, fields
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.template.loader import render_to_string
+from django.utils.timezone import now
+
+from core.cache import bump_data_version, get_or_compute, ttl_derivado, versioned_key, PERMISOS, LICENCIAS, USUARIOS
+from core.excel import Hoja
+from core.jobs import artifact_path, archivo_resultado
+from core.pdf import render_pdfs
+from core.periods import filtro_periodo
+from licencias.models import LicenciaMedica
+from permisos.models import SolicitudPermiso
+from users.models import CustomUser
+from .models import CierreMensual, ResumenMensualDAEM
+
+# Parámetro ?sort= -> order_by en base de datos
+ORDENAMIENTOS = {
+    'name': ('first_name', 'last_name'),
+    'name_desc': ('-first_name', '-last_name'),
+    'dias': ('-dias_disponibles',),
+    'dias_asc': ('dias_disponibles',),
+    'dias_usados': ('-dias_usados',),
+    'dias_usados_asc': ('dias_usados',),
+    'licencias': ('-total_licencias',),
+    'licencias_asc': ('total_licencias',),
+    'dias_licencias': ('-dias_licencias',),
+    'dias_licencias_asc': ('dias_licencias',),
+}
+
+MESES = {
+    1: 'Enero', 2: 'Febrero', 3: 'Marzo', 4: 'Abril', 5: 'Mayo', 6: 'Junio',
+    7: 'Julio', 8: 'Agosto', 9: 'Septiembre', 10: 'Octubre', 11: 'Noviembre', 12: 'Diciembre',
+}
+
+ROLES_REPORTE = ['FUNCIONARIO', 'DIRECTOR', 'DIRECTIVO', 'SECRETARIA', 'ADMIN']
+
+MEMO_TIMEOUT = 60 * 30
+
+
+def nombre_mes(mes):
+    """Nombre del mes para encabezados de reportes ('' si no aplica)."""
+    try:
+        return MESES.get(int(mes), '')
+    except (TypeError, ValueError):
+        return ''
+
+
+# ---------------------------------------------------------------------------
+# Filas livianas
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class FuncionarioReporte:
+    """Datos del funcionario necesarios para renderizar reportes."""
+    id: int
+    username: str
+    first_name: str
+    last_name: str
+    run: str
+    email: str
+    role: str
+    dias_disponibles: float
+
+    def get_full_name(self):
+        return f'{self.first_name} {self.last_name}'.strip()
+
+    def get_role_display(self):
+        return dict(CustomUser.ROLE_CHOICES).get(self.role, self.role)
+
+
+@dataclass(frozen=True)
+class FilaReporte:
+    """Totales del período para un funcionario."""
+    funcionario: FuncionarioReporte
+    dias_usados: float
+    total_licencias: int
+    dias_licencias: int
+
+    @property
+    def dias_disponibles(self):
+        return self.funcionario.dias_disponibles
+
+
+@dataclass(frozen=True)
+class PermisoFila:
+    fecha_inicio: object
+    fecha_termino: object
+    dias_solicitados: float
+    observacion: str
+
+
+@dataclass(frozen=True)
+class LicenciaFila:
+    fecha_inicio: object
+    dias: int
+    created_by: str
+    created_at: object
+
+
+@dataclass(frozen=True)
+class DetalleFuncionario:
+    """Permisos aprobados y licencias del período para un funcionario."""
+    funcionario: FuncionarioReporte
+    permisos: tuple
+    licencias: tuple
+
+    @property
+    def dias_usados(self):
+        return sum(p.dias_solicitados for p in self.permisos)
+
+    @property
+    def total_dias_licencias(self):
+        return sum(l.dias for l in self.licencias)
+
+
+@dataclass(frozen=True)
+class FiltrosReporte:
+    """Parámetros de filtro compartidos por las vistas de reportes."""
+    search: str = ''
+    year: str = ''
+    mes: str = ''
+    fecha_inicio: str = ''
+    fecha_fin: str = ''
+    sort: str = 'name'
+
+    @classmethod
+    def from_request(cls, request, ordenable=False):
+        """Lee los filtros desde request.GET; ``sort`` solo aplica a vistas ordenables."""
+        get = request.GET
+        return cls(
+            search=get.get('search', ''),
+            year=get.get('year', ''),
+            mes=get.get('mes', ''),
+            fecha_inicio=get.get('fecha_inicio', ''),
+            fecha_fin=get.get('fecha_fin', ''),
+            sort=get.get('sort', 'name') if ordenable else 'name',
+        )
+
+    def as_dict(self):
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    def clave(self, *campos):
+        """Hash estable de los campos indicados (todos por defecto) para claves de caché."""
+        campos = campos or tuple(f.name for f in fields(self))
+        valores = '|'.join(f'{campo}={getattr(self, campo)}' for campo in campos)
+        return hashlib.sha1(valores.encode()).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Memoización
+# ---------------------------------------------------------------------------
+
+# Dominios de datos de los que dependen los reportes (ver core.cache)
+DOMINIOS_REPORTE = (PERMISOS, LICENCIAS, USUARIOS)
+
+
+def _memoizar(prefijo, clave, calcular, dominios=DOMINIOS_REPORTE):
+    return get_or_compute(f'reportes:{prefijo}', dominios, (clave,), calcular, timeout=MEMO_TIMEOUT)
+
+
+def clave_archivo(prefijo, filtros, *partes):
+    """Clave de caché de un PDF o Excel generado para los filtros (incluye versiones de datos)."""
+    return versioned_key(f'reportes:archivo:{prefijo}', DOMINIOS_REPORTE, filtros.clave(), *partes)
+
+
+def cachear_archivo(prefijo, filtros, generar, *partes):
+    """
+    Cachea el contenido binario de un PDF o Excel generado para los filtros.
+
+    La clave incluye la versión de permisos, licencias y usuarios, por lo que
+    cualquier cambio en esos datos genera un archivo nuevo en la siguiente
+    solicitud.
+
+    Returns:
+        bytes
+    """
+    key = clave_archivo(prefijo, filtros, *partes)
+    contenido = cache.get(key)
+    if contenido is None:
+        contenido = generar()
+        cache.set(key, contenido, ttl_derivado(MEMO_TIMEOUT))
+    return contenido
+
+
+# ---------------------------------------------------------------------------
+# Consultas
+# ---------------------------------------------------------------------------
+
+def filtro_fechas(year='', mes='', fecha_inicio='', fecha_fin=''):
+    """Q sobre ``fecha_inicio`` con los filtros de período del formulario de reportes."""
+    filtro = filtro_periodo('fecha_inicio', year, mes)
+    if fecha_inicio:
+        filtro &= Q(fecha_inicio__gte=fecha_inicio)
+    if fecha_fin:
+        filtro &= Q(fecha_inicio__lte=fecha_fin)
+    return filtro
+
+
+def _total_por_usuario(queryset, agregado, output_field):
+    """Subconsulta correlacionada con el agregado del queryset para cada usuario."""
+    subquery = (
+        queryset.filter(usuario=OuterRef('pk'))
+        .order_by()
+        .values('usuario')
+        .annotate(total=agregado)
+        .values('total')
+    )
+    return Coalesce(Subquery(subquery, output_field=output_field), Value(0), output_field=output_field)
+
+
+def anotar_totales(funcionarios, year='', mes='', fecha_inicio='', fecha_fin=''):
+    """
+    Anota cada funcionario con los totales de permisos y licencias del período.
+
+    Se usan subconsultas por usuario en lugar de JOINs sobre ambas relaciones,
+    que multiplicarían las filas (permisos x licencias) y falsearían las sumas.
+
+    Anotaciones:
+        dias_usados: Suma de días de permisos aprobados
+        total_licencias: Cantidad de licencias médicas
+        dias_licencias: Suma de días de licencia
+
+    Returns:
+        QuerySet de CustomUser anotado (una sola consulta)
+    """
+    filtro = filtro_fechas(year, mes, fecha_inicio, fecha_fin)
+    permisos = SolicitudPermiso.objects.filter(filtro, estado='APROBADO')
+    licencias = LicenciaMedica.objects.filter(filtro)
+
+    return funcionarios.annotate(
+        dias_usados=_total_por_usuario(permisos, Sum('dias_solicitados'), FloatField()),
+        total_licencias=_total_por_usuario(licencias, Count('pk'), IntegerField()),
+        dias_licencias=_total_por_usuario(licencias, Sum('dias'), IntegerField()),
+    )
+
+
+def ordenar(funcionarios, sort_by):
+    """Aplica el ordenamiento del parámetro ``sort`` (por nombre si no es válido)."""
+    campos = ORDENAMIENTOS.get(sort_by, ORDENAMIENTOS['name'])
+    return funcionarios.order_by(*campos, 'pk')
+
+
+CAMPOS_FUNCIONARIO = [f.name for f in fields(FuncionarioReporte)]
+
+
+def _funcionarios_base(search=''):
+    funcionarios = CustomUser.objects.filter(role__in=ROLES_REPORTE)
+    if search:
+        funcionarios = funcionarios.filter(
+            Q(first_name__icontains=search) |
+            Q(last_name__icontains=search) |
+            Q(run__icontains=search)
+        )
+    return funcionarios
+
+
+def _calcular_reporte(filtros):
+    funcionarios = anotar_totales(
+        _funcionarios_base(filtros.search),
+        filtros.year, filtros.mes, filtros.fecha_inicio, filtros.fecha_fin,
+    )
+    valores = ordenar(funcionarios, filtros.sort).values(
+        *CAMPOS_FUNCIONARIO, 'dias_usados', 'total_licencias', 'dias_licencias'
+    )
+    return tuple(
+        FilaReporte(
+            funcionario=FuncionarioReporte(**{campo: fila[campo] for campo in CAMPOS_FUNCIONARIO}),
+            dias_usados=fila['dias_usados'],
+            total_licencias=fila['total_licencias'],
+            dias_licencias=fila['dias_licencias'],
+        )
+        for fila in valores
+    )
+
+
+def obtener_reporte(filtros):
+    """
+    Totales por funcionario para los filtros dados.
+
+    Returns:
+        tuple[FilaReporte] en el orden de ``filtros.sort``
+    """
+    return _memoizar('totales', filtros.clave(), lambda: _calcular_reporte(filtros))
+
+
+def _calcular_detalles(filtros, funcionario_ids):
+    funcionarios = CustomUser.objects.all()
+    if funcionario_ids is None:
+        funcionarios = _funcionarios_base()
+    else:
+        funcionarios = funcionarios.filter(pk__in=funcionario_ids)
+
+    filtro = filtro_fechas(filtros.year, filtros.mes, filtros.fecha_inicio, filtros.fecha_fin)
+    if funcionario_ids is not None:
+        filtro &= Q(usuario_id__in=funcionario_ids)
+
+    # Una consulta para permisos y otra para licencias, agrupadas en memoria
+    permisos = {}
+    for p in SolicitudPermiso.objects.filter(filtro, estado='APROBADO').order_by('-fecha_inicio').values(
+        'usuario_id', 'fecha_inicio', 'fecha_termino', 'dias_solicitados', 'observacion'
+    ):
+        permisos.setdefault(p.pop('usuario_id'), []).append(PermisoFila(**p))
+
+    licencias = {}
+    for lic in LicenciaMedica.objects.filter(filtro).order_by('-fecha_inicio').values(
+        'usuario_id', 'fecha_inicio', 'dias', 'created_at',
+        'created_by__first_name', 'created_by__last_name', 'created_by__run',
+    ):
+        creador = ''
+        if lic['created_by__run']:
+            creador = f"{lic['created_by__first_name']} {lic['created_by__last_name']} ({lic['created_by__run']})"
+        licencias.setdefault(lic['usuario_id'], []).append(LicenciaFila(
+            fecha_inicio=lic['fecha_inicio'],
+            dias=lic['dias'],
+            created_by=creador,
+            created_at=lic['created_at'],
+        ))
+
+    return {
+        f['id']: DetalleFuncionario(
+            funcionario=FuncionarioReporte(**f),
+            permisos=tuple(permisos.get(f['id'], ())),
+            licencias=tuple(licencias.get(f['id'], ())),
+        )
+        for f in funcionarios.order_by('first_name', 'last_name', 'pk').values(*CAMPOS_FUNCIONARIO)
+    }
+
+
+def obtener_detalles(filtros, funcionario_ids=None):
+    """
+    Permisos aprobados y licencias del período por funcionario.
+
+    Ejecuta tres consultas (funcionarios, permisos, licencias) sin importar
+    cuántos funcionarios incluya. El filtro ``search`` no aplica: el detalle
+    se pide por funcionario.
+
+    Args:
+        filtros: FiltrosReporte
+        funcionario_ids: IDs a incluir; None para todos los funcionarios del reporte
+
+    Returns:
+        dict[int, DetalleFuncionario] ordenado por nombre
+    """
+    ids = None if funcionario_ids is None else sorted(int(pk) for pk in funcionario_ids)
+    clave = f"{filtros.clave('year', 'mes', 'fecha_inicio', 'fecha_fin')}:{ids if ids is not None else 'todos'}"
+    return _memoizar('detalles', clave, lambda: _calcular_detalles(filtros, ids))
+
+
+def anios_disponibles():
+    """Años con permisos o licencias registrados (más reciente primero)."""
+    def calcular():
+        permisos = SolicitudPermiso.objects.dates('fecha_inicio', 'year')
+        licencias = LicenciaMedica.objects.dates('fecha_inicio', 'year')
+        return sorted({d.year for d in permisos} | {d.year for d in licencias}, reverse=True)
+    return _memoizar('anios', 'todos', calcular, dominios=(PERMISOS, LICENCIAS))
+
+
+# ---------------------------------------------------------------------------
+# Reportes individuales
+# ---------------------------------------------------------------------------
+
+def html_individual(filtros, detalle):
+    """HTML del reporte individual (pdf_individual.html) de un funcionario."""
+    return render_to_string('reportes/pdf_individual.html', {
+        'functorio': detalle.funcionario,
+        'permisos': detalle.permisos,
+        'licencias': detalle.licencias,
+        'dias_usados': detalle.dias_usados,
+        'total_dias_licencias': detalle.total_dias_licencias,
+        'year': filtros.year,
+        'mes': filtros.mes,
+        'mes_nombre': nombre_mes(filtros.mes),
+        'fecha_inicio': filtros.fecha_inicio,
+        'fecha_fin': filtros.fecha_fin,
+        'fecha_exportacion': now().strftime('%d/%m/%Y %H:%M'),
+    })
+
+
+def generar_zip_individuales(reporter, filtros):
+    """
+    Tarea: genera el reporte individual de cada funcionario en un ZIP.
+
+    Los datos salen de un único ``obtener_detalles`` (tres consultas para toda
+    la planta) y los PDF se renderizan en paralelo en el pool de core.pdf; cada
+    uno se escribe en el ZIP apenas termina, sin acumularlos en memoria.
+
+    Returns:
+        dict: Resultado de archivo de la tarea (ver core.jobs.archivo_resultado)
+    """
+    reporter.progress(0, mensaje='Preparando datos...')
+    detalles = [
+        d for d in obtener_detalles(filtros).values()
+        if d.funcionario.role != 'ADMIN'
+    ]
+    total = len(detalles)
+    documentos = ((d.funcionario.run, html_individual(filtros, d)) for d in detalles)
+
+    # Los PDF ya vienen comprimidos: se almacenan sin volver a comprimir
+    with zipfile.ZipFile(artifact_path(reporter.job_id), 'w', zipfile.ZIP_STORED) as zf:
+        for i, (run, pdf) in enumerate(render_pdfs(documentos), start=1):
+            zf.writestr(f'reporte_{run}.pdf', pdf)
+            reporter.progress(i, total, f'{i} de {total} reportes generados')
+
+    return archivo_resultado(reporter.job_id, 'reportes_individuales.zip', 'application/zip')
+
+
+# ---------------------------------------------------------------------------
+# Planillas Excel
+# ---------------------------------------------------------------------------
+
+def _nombre(first_name, last_name, username):
+    return f"{first_name} {last_name}".strip() or username
+
+
+def _fecha(valor):
+    return valor.strftime("%d-%m-%Y") if valor else ""
+
+
+def hoja_reporte_detallado(filtros):
+    """Hoja del reporte detallado (ExportarExcelView) a partir del conjunto memoizado."""
+    filas = (
+        [
+            fila.funcionario.get_full_name(),
+            fila.funcionario.run,
+            fila.funcionario.get_role_display(),
+            fila.dias_disponibles,
+            fila.dias_usados,
+            fila.dias_licencias,
+            fila.total_licencias,
+        ]
+        for fila in obtener_reporte(filtros)
+    )
+    return Hoja(
+        'Reporte Detallado',
+        ['Nombre', 'RUN', 'Rol', 'Días Disponibles', 'Días Usados', 'Días Licencia', 'Total Licencias'],
+        filas,
+        estilo_encabezado=False,
+    )
+
+
+ENCABEZADOS_NOMINA = ['N°', 'Funcionario', 'RUN', 'Cargo']
+ENCABEZADOS_PERMISOS = ['N°', 'Funcionario', 'RUN', 'Días Solicitados', 'Fecha Desde', 'Fecha Hasta', 'Fecha Solicitud']
+ENCABEZADOS_LICENCIAS = ['N°', 'Funcionario', 'RUN', 'Tipo de Licencia', 'Días', 'Fecha Desde', 'Fecha Hasta']
+ANCHOS_NOMINA = [10, 30, 30, 30]
+ANCHOS_DETALLE = [10, 25, 25, 25, 25, 25, 25]
+
+
+def _filas_nomina():
+    funciones = dict(CustomUser._meta.get_field('funcion').flatchoices)
+    funcionarios = CustomUser.objects.filter(role__in=ROLES_REPORTE).order_by('first_name', 'last_name', 'pk')
+    for i, (first_name, last_name, username, run, funcion) in enumerate(
+        funcionarios.values_list('first_name', 'last_name', 'username', 'run', 'funcion').iterator(), 1
+    ):
+        yield [i, _nombre(first_name, last_name, username), run, funciones.get(funcion, funcion) or ""]
+
+
+def _filas_permisos(year, mes):
+    permisos = SolicitudPermiso.objects.filter(
+        filtro_periodo('fecha_inicio', year, mes),
+        estado='APROBADO',
+        usuario__role__in=ROLES_REPORTE,
+    ).order_by('usuario__first_name', 'usuario__last_name', 'fecha_inicio', 'pk')
+    for i, (first_name, last_name, username, run, dias, desde, hasta, creado) in enumerate(
+        permisos.values_list(
+            'usuario__first_name', 'usuario__last_name', 'usuario__username', 'usuario__run',
+            'dias_solicitados', 'fecha_inicio', 'fecha_termino', 'created_at',
+        ).iterator(), 1
+    ):
+        yield [i, _nombre(first_name, last_name, username), run, float(dias), _fecha(desde), _fecha(hasta), _fecha(creado)]
+
+
+def _filas_licencias(year, mes):
+    licencias = LicenciaMedica.objects.filter(
+        filtro_periodo('fecha_inicio', year, mes),
+        usuario__role__in=ROLES_REPORTE,
+    ).order_by('usuario__first_name', 'usuario__last_name', 'fecha_inicio', 'pk')
+    for i, (first_name, last_name, username, run, dias, desde, hasta) in enumerate(
+        licencias.values_list(
+            'usuario__first_name', 'usuario__last_name', 'usuario__username', 'usuario__run',
+            'dias', 'fecha_inicio', 'fecha_termino',
+        ).iterator(), 1
+    ):
+        yield [i, _nombre(first_name, last_name, username), run, 'Licencia Médica', dias, _fecha(desde), _fecha(hasta)]
+
+
+def _hojas_daem_en_vivo(year, mes):
+    return [
+        Hoja('Nómina', ENCABEZADOS_NOMINA, _filas_nomina(), anchos=ANCHOS_NOMINA),
+        Hoja('Permisos Administrativos', ENCABEZADOS_PERMISOS, _filas_permisos(year, mes), anchos=ANCHOS_DETALLE),
+        Hoja('Licencias Médicas', ENCABEZADOS_LICENCIAS, _filas_licencias(year, mes), anchos=ANCHOS_DETALLE),
+    ]
+
+
+def hojas_daem(year='', mes=''):
+    """
+    Hojas del reporte DAEM: nómina, permisos administrativos y licencias.
+
+    Un mes cerrado (ver ``cerrar_mes``) se lee desde ResumenMensualDAEM; el
+    resto se consulta en vivo. En ambos casos las filas se leen con
+    ``values_list().iterator()`` a medida que el libro las escribe, sin
+    instanciar modelos ni cargar el período completo.
+    """
+    periodo = _periodo_mensual(year, mes)
+    if periodo and mes_cerrado(*periodo):
+        return _hojas_daem_cerrado(*periodo)
+    return _hojas_daem_en_vivo(year, mes)
+
+
+def _periodo_mensual(year, mes):
+    """(anio, mes) como enteros si los filtros corresponden a un único mes."""
+    try:
+        return int(year), int(mes)
+    except (TypeError, ValueError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Reporte mensual de días administrativos
+# ---------------------------------------------------------------------------
+
+def filas_mensuales(anio, mes):
+    """
+    Un elemento por permiso aprobado del mes, ordenado por fecha de solicitud.
+
+    Returns:
+        list[dict] con run, nombre_completo, dias_solicitados, dias_disponibles,
+        fecha_desde, fecha_hasta y fecha_solicitud
+    """
+    if mes_cerrado(anio, mes):
+        return _filas_mensuales_cerrado(anio, mes)
+
+    permisos = SolicitudPermiso.objects.filter(
+        filtro_periodo('fecha_inicio', anio, mes),
+        estado='APROBADO'
+    ).order_by('created_at', 'fecha_inicio').values_list(
+        'usuario__first_name', 'usuario__last_name', 'usuario__username', 'usuario__run',
+        'usuario__dias_disponibles', 'dias_solicitados', 'fecha_inicio', 'fecha_termino', 'created_at',
+    )
+    return [
+        {
+            'run': run,
+            'nombre_completo': _nombre(first_name, last_name, username),
+            'dias_solicitados': dias,
+            'dias_disponibles': disponibles or 0,
+            'fecha_desde': desde,
+            'fecha_hasta': hasta,
+            'fecha_solicitud': creado,
+        }
+        for first_name, last_name, username, run, disponibles, dias, desde, hasta, creado in permisos
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Cierres mensuales DAEM
+# ---------------------------------------------------------------------------
+
+def mes_cerrado(anio, mes):
+    """Indica si el mes tiene un cierre DAEM (sus reportes se leen del resumen)."""
+    return CierreMensual.objects.filter(anio=anio, mes=mes).exists()
+
+
+def _iso(valor):
+    return valor.isoformat() if valor else None
+
+
+def _desde_iso(valor, tipo=date):
+    return tipo.fromisoformat(valor) if valor else None
+
+
+@transaction.atomic
+def cerrar_mes(anio, mes, usuario=None):
+    """
+    Guarda el resumen DAEM del mes: una fila por funcionario con sus totales
+    y el detalle de permisos aprobados y licencias que comienzan en el mes.
+
+    Si el mes ya estaba cerrado, su resumen se reemplaza. Al confirmarse la
+    transacción se incrementan las versiones de los dominios del reporte para
+    que los PDF y Excel cacheados con ``cachear_archivo`` se regeneren.
+
+    Returns:
+        CierreMensual
+    """
+    filtro = filtro_periodo('fecha_inicio', anio, mes)
+
+    permisos = {}
+    for usuario_id, desde, hasta, dias, creado in SolicitudPermiso.objects.filter(
+        filtro, estado='APROBADO'
+    ).order_by('fecha_inicio', 'pk').values_list(
+        'usuario_id', 'fecha_inicio', 'fecha_termino', 'dias_solicitados', 'created_at'
+    ).iterator():
+        permisos.setdefault(usuario_id, []).append(
+            {'desde': _iso(desde), 'hasta': _iso(hasta), 'dias': dias, 'solicitado': _iso(creado)}
+        )
+
+    licencias = {}
+    for usuario_id, desde, hasta, dias in LicenciaMedica.objects.filter(filtro).order_by(
+        'fecha_inicio', 'pk'
+    ).values_list('usuario_id', 'fecha_inicio', 'fecha_termino', 'dias').iterator():
+        licencias.setdefault(usuario_id, []).append({'desde': _iso(desde), 'hasta': _iso(hasta), 'dias': dias})
+
+    funciones = dict(CustomUser._meta.get_field('funcion').flatchoices)
+    funcionarios = CustomUser.objects.filter(role__in=ROLES_REPORTE).order_by('first_name', 'last_name', 'pk')
+    resumenes = []
+    for orden, (pk, first_name, last_name, username, run, funcion, disponibles) in enumerate(
+        funcionarios.values_list(
+            'pk', 'first_name', 'last_name', 'username', 'run', 'funcion', 'dias_disponibles'
+        ).iterator(), 1
+    ):
+        detalle_permisos = permisos.get(pk, [])
+        detalle_licencias = licencias.get(pk, [])
+        resumenes.append(ResumenMensualDAEM(
+            anio=anio,
+            mes=mes,
+            orden=orden,
+            usuario_id=pk,
+            nombre=_nombre(first_name, last_name, username),
+            run=run,
+            cargo=funciones.get(funcion, funcion) or '',
+            dias_disponibles=disponibles or 0,
+            permisos=len(detalle_permisos),
+            dias_permiso=sum(p['dias'] for p in detalle_permisos),
+            licencias=len(detalle_licencias),
+            dias_licencia=sum(lic['dias'] for lic in detalle_licencias),
+            detalle_permisos=detalle_permisos,
+            detalle_licencias=detalle_licencias,
+        ))
+
+    ResumenMensualDAEM.objects.filter(anio=anio, mes=mes).delete()
+    ResumenMensualDAEM.objects.bulk_create(resumenes, batch_size=500)
+    cierre, _ = CierreMensual.objects.update_or_create(
+        anio=anio, mes=mes, defaults={'cerrado_por': usuario}
+    )
+    transaction.on_commit(_invalidar_archivos)
+    return cierre
+
+
+def _invalidar_archivos():
+    for dominio in DOMINIOS_REPORTE:
+        bump_data_version(dominio)
+
+
+def _resumenes(anio, mes, *campos, **filtros):
+    return ResumenMensualDAEM.objects.filter(anio=anio, mes=mes, **filtros).order_by('orden').values_list(*campos).iterator()
+
+
+def _filas_nomina_cerrado(anio, mes):
+    for i, (nombre, run, cargo) in enumerate(_resumenes(anio, mes, 'nombre', 'run', 'cargo'), 1):
+        yield [i, nombre, run, cargo]
+
+
+def _filas_permisos_cerrado(anio, mes):
+    i = 0
+    for nombre, run, detalle in _resumenes(anio, mes, 'nombre', 'run', 'detalle_permisos', permisos__gt=0):
+        for p in detalle:
+            i += 1
+            yield [
+                i, nombre, run, float(p['dias']),
+                _fecha(_desde_iso(p['desde'])), _fecha(_desde_iso(p['hasta'])),
+                _fecha(_desde_iso(p['solicitado'], datetime)),
+            ]
+
+
+def _filas_licencias_cerrado(anio, mes):
+    i = 0
+    for nombre, run, detalle in _resumenes(anio, mes, 'nombre', 'run', 'detalle_licencias', licencias__gt=0):
+        for lic in detalle:
+            i += 1
+            yield [
+                i, nombre, run, 'Licencia Médica', lic['dias'],
+                _fecha(_desde_iso(lic['desde'])), _fecha(_desde_iso(lic['hasta'])),
+            ]
+
+
+def _hojas_daem_cerrado(anio, mes):
+    return [
+        Hoja('Nómina', ENCABEZADOS_NOMINA, _filas_nomina_cerrado(anio, mes), anchos=ANCHOS_NOMINA),
+        Hoja('Permisos Administrativos', ENCABEZADOS_PERMISOS, _filas_permisos_cerrado(anio, mes), anchos=ANCHOS_DETALLE),
+        Hoja('Licencias Médicas', ENCABEZADOS_LICENCIAS, _filas_licencias_cerrado(anio, mes), anchos=ANCHOS_DETALLE),
+    ]
+
+
+def _filas_mensuales_cerrado(anio, mes):
+    filas = [
+        {
+            'run': run,
+            'nombre_completo': nombre,
+            'dias_solicitados': p['dias'],
+            'dias_disponibles': disponibles,
+            'fecha_desde': _desde_iso(p['desde']),
+            'fecha_hasta': _desde_iso(p['hasta']),
+            'fecha_solicitud': _desde_iso(p['solicitado'], datetime),
+        }
+        for nombre, run, disponibles, detalle in _resumenes(
+            anio, mes, 'nombre', 'run', 'dias_disponibles', 'detalle_permisos', permisos__gt=0
+        )
+        for p in detalle
+    ]
+    filas.sort(key=lambda f: (f['fecha_solicitud'], f['fecha_desde']))
+    return filas
@@ -1,3 +1,292 @@
-from django.test import TestCase
+"""
+Tests para la aplicación de reportes.
+"""
+import io
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from licencias.models import LicenciaMedica
+from permisos.models import SolicitudPermiso
+from users.models import CustomUser
+from django.core.cache import cache
+
+from reportes.services import (
+    FiltrosReporte, anotar_totales, ordenar, obtener_reporte, obtener_detalles, hojas_daem, filas_mensuales, cerrar_mes,
+    cachear_archivo,
+)
+
+
+def crear_funcionario(i, **extra):
+    return CustomUser.objects.create_user(
+        username=f'func{i}', email=f'func{i}@test.com', run=f'1000000{i}-K',
+        first_name=f'Funcionario{i:02d}', last_name='Test', password='testpass123', **extra
+    )
+
+
+class ReporteTotalesTest(TestCase):
+    """Tests para los totales anotados por funcionario"""
+
+    def setUp(self):
+        self.a = crear_funcionario(1)
+        self.b = crear_funcionario(2)
+        for dias in (1.0, 0.5):
+            SolicitudPermiso.objects.create(usuario=self.a, fecha_inicio=date(2025, 3, 10), dias_solicitados=dias, estado='APROBADO')
+        SolicitudPermiso.objects.create(usuario=self.a, fecha_inicio=date(2025, 3, 12), dias_solicitados=2.0, estado='RECHAZADO')
+        SolicitudPermiso.objects.create(usuario=self.a, fecha_inicio=date(2024, 3, 10), dias_solicitados=3.0, estado='APROBADO')
+        LicenciaMedica.objects.create(usuario=self.a, fecha_inicio=date(2025, 3, 1), dias=5)
+        LicenciaMedica.objects.create(usuario=self.a, fecha_inicio=date(2025, 3, 20), dias=2)
+        LicenciaMedica.objects.create(usuario=self.b, fecha_inicio=date(2025, 3, 1), dias=10)
+
+    def test_totales_del_periodo(self):
+        """Los JOINs no deben multiplicar las sumas (2 permisos x 2 licencias)"""
+        totales = {u.pk: u for u in anotar_totales(CustomUser.objects.all(), year='2025', mes='3')}
+        self.assertEqual(totales[self.a.pk].dias_usados, 1.5)
+        self.assertEqual(totales[self.a.pk].total_licencias, 2)
+        self.assertEqual(totales[self.a.pk].dias_licencias, 7)
+        self.assertEqual(totales[self.b.pk].dias_usados, 0)
+        self.assertEqual(totales[self.b.pk].total_licencias, 1)
+
+    def test_ordenamiento_en_base_de_datos(self):
+        funcionarios = ordenar(anotar_totales(CustomUser.objects.all(), year='2025'), 'dias_licencias')
+        self.assertEqual([u.pk for u in funcionarios][:2], [self.b.pk, self.a.pk])
+
+
+class ReporteMemoizadoTest(TestCase):
+    """Tests para el conjunto de datos compartido y memoizado"""
+
+    def setUp(self):
+        cache.clear()
+        self.a = crear_funcionario(1)
+        SolicitudPermiso.objects.create(usuario=self.a, fecha_inicio=date(2025, 3, 10), dias_solicitados=1.0, estado='APROBADO')
+        LicenciaMedica.objects.create(usuario=self.a, fecha_inicio=date(2025, 3, 1), dias=5)
+        self.filtros = FiltrosReporte(year='2025')
+
+    def test_segunda_llamada_sin_consultas(self):
+        obtener_reporte(self.filtros)
+        with self.assertNumQueries(0):
+            filas = obtener_reporte(self.filtros)
+        self.assertEqual(filas[0].funcionario.get_full_name(), 'Funcionario01 Test')
+        self.assertEqual(filas[0].dias_usados, 1.0)
+
+    def test_senal_invalida_memo(self):
+        obtener_reporte(self.filtros)
+        SolicitudPermiso.objects.create(usuario=self.a, fecha_inicio=date(2025, 4, 10), dias_solicitados=0.5, estado='APROBADO')
+        self.assertEqual(obtener_reporte(self.filtros)[0].dias_usados, 1.5)
+
+    def test_detalles_consultas_constantes(self):
+        """Funcionarios, permisos y licencias: tres consultas en total"""
+        for i in range(2, 6):
+            u = crear_funcionario(i)
+            LicenciaMedica.objects.create(usuario=u, fecha_inicio=date(2025, 6, 1), dias=2, created_by=self.a)
+        with self.assertNumQueries(3):
+            detalles = obtener_detalles(self.filtros)
+        self.assertEqual(len(detalles), 5)
+        self.assertEqual(detalles[self.a.pk].total_dias_licencias, 5)
+        self.assertIn('Funcionario01', list(detalles.values())[1].licencias[0].created_by)
+
+
+class ReportesViewQueryCountTest(TestCase):
+    """La vista de reportes debe ejecutar un número constante de consultas"""
+
+    def setUp(self):
+        cache.clear()
+        self.director = crear_funcionario(0, role='DIRECTOR')
+        self.client.force_login(self.director)
+        self.url = reverse('reportes') + '?year=2025&sort=dias_usados'
+
+    def crear_funcionarios(self, desde, hasta):
+        for i in range(desde, hasta):
+            u = crear_funcionario(i)
+            SolicitudPermiso.objects.create(usuario=u, fecha_inicio=date(2025, 4, 1), dias_solicitados=1.0, estado='APROBADO')
+            LicenciaMedica.objects.create(usuario=u, fecha_inicio=date(2025, 5, 1), dias=3)
+
+    def contar_consultas(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_consultas_constantes(self):
+        self.crear_funcionarios(1, 3)
+        consultas_pocos, _ = self.contar_consultas()
+
+        self.crear_funcionarios(3, 15)
+        consultas_muchos, response = self.contar_consultas()
+
+        self.assertEqual(consultas_pocos, consultas_muchos)
+        self.assertEqual(len(response.context['empleados_data']), 15)
+
+    @override_settings(JOBS_RUN_SYNC=True)
+    def test_pdf_tras_ver_pagina_no_recalcula(self):
+        """El PDF colectivo reutiliza el conjunto de datos ya calculado por la vista HTML"""
+        self.crear_funcionarios(1, 4)
+        self.client.get(reverse('reportes') + '?year=2025')
+        with mock.patch('core.pdf.render_pdf', return_value=b'%PDF-colectivo'), \
+                CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('reportes_pdf_colectivo') + '?year=2025')
+        self.assertEqual(response.status_code, 302)
+        tablas = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('permisos_solicitudpermiso', tablas)
+        self.assertNotIn('licencias_licenciamedica', tablas)
+
+    @override_settings(JOBS_RUN_SYNC=True)
+    def test_pdf_colectivo_en_segundo_plano(self):
+        """El PDF colectivo se genera como tarea y luego se sirve desde caché"""
+        self.crear_funcionarios(1, 3)
+        url = reverse('reportes_pdf_colectivo') + '?year=2025'
+        with mock.patch('core.pdf.render_pdf', return_value=b'%PDF-colectivo') as render:
+            primera = self.client.get(url)
+            job_id = primera.url.rstrip('/').split('/')[-2]
+            self.assertRedirects(primera, reverse('job_wait', args=[job_id]))
+            archivo = self.client.get(reverse('job_file', args=[job_id]))
+            self.assertEqual(b''.join(archivo.streaming_content), b'%PDF-colectivo')
+
+            segunda = self.client.get(url)
+        render.assert_called_once()
+        self.assertEqual(segunda.status_code, 200)
+        self.assertEqual(segunda.content, b'%PDF-colectivo')
+
+
+@override_settings(JOBS_RUN_SYNC=True)
+class PDFIndividualesZipTest(TestCase):
+    """Tests para la generación por lote de los reportes individuales"""
+
+    def setUp(self):
+        cache.clear()
+        self.director = crear_funcionario(0, role='DIRECTOR')
+        self.admin = crear_funcionario(9, role='ADMIN')
+        for i in range(1, 4):
+            u = crear_funcionario(i)
+            SolicitudPermiso.objects.create(usuario=u, fecha_inicio=date(2025, 4, 1), dias_solicitados=1.0, estado='APROBADO')
+            LicenciaMedica.objects.create(usuario=u, fecha_inicio=date(2025, 5, 1), dias=3)
+        self.client.force_login(self.director)
+
+    def test_zip_con_un_pdf_por_funcionario(self):
+        import io
+        import zipfile
+
+        def render_falso(documentos, *args):
+            for run, html_string in documentos:
+                yield run, f'%PDF {run}'.encode()
+
+        with mock.patch('reportes.services.render_pdfs', side_effect=render_falso), \
+                CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('reportes_pdf_individuales_zip') + '?year=2025')
+        tablas = [q['sql'] for q in ctx.captured_queries]
+        self.assertEqual(sum('FROM "permisos_solicitudpermiso"' in sql for sql in tablas), 1)
+        self.assertEqual(sum('FROM "licencias_licenciamedica"' in sql for sql in tablas), 1)
+
+        job_id = response.url.rstrip('/').split('/')[-2]
+        archivo = self.client.get(reverse('job_file', args=[job_id]))
+        self.assertIn('reportes_individuales.zip', archivo['Content-Disposition'])
+        run = CustomUser.objects.get(username='func1').run
+        with zipfile.ZipFile(io.BytesIO(b''.join(archivo.streaming_content))) as zf:
+            nombres = zf.namelist()
+            self.assertEqual(zf.read(f'reporte_{run}.pdf'), f'%PDF {run}'.encode())
+        # Todos excepto ADMIN
+        self.assertEqual(len(nombres), 4)
+        self.assertNotIn(f'reporte_{self.admin.run}.pdf', nombres)
+
+
+class ExportarDAEMExcelTest(TestCase):
+    """Tests para la planilla DAEM generada en modo streaming"""
+
+    def setUp(self):
+        self.director = crear_funcionario(0, role='DIRECTOR')
+        for i in range(1, 4):
+            u = crear_funcionario(i)
+            SolicitudPermiso.objects.create(usuario=u, fecha_inicio=date(2025, 4, 1), dias_solicitados=1.5, estado='APROBADO')
+            LicenciaMedica.objects.create(usuario=u, fecha_inicio=date(2025, 5, 30), dias=3)
+        LicenciaMedica.objects.create(usuario=self.director, fecha_inicio=date(2024, 5, 1), dias=3)
+        self.client.force_login(self.director)
+
+    def test_libro_por_pestanas(self):
+        import io
+        import openpyxl
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('reportes_daem_excel') + '?year=2025')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('reporte_daem_2025.xlsx', response['Content-Disposition'])
+        consultas_datos = [q for q in ctx.captured_queries if 'django_session' not in q['sql']]
+
+        wb = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(wb.sheetnames, ['Nómina', 'Permisos Administrativos', 'Licencias Médicas'])
+        self.assertEqual(wb['Nómina'].max_row, 5)
+        self.assertTrue(wb['Nómina']['A1'].font.bold)
+
+        licencias = list(wb['Licencias Médicas'].iter_rows(min_row=2, values_only=True))
+        self.assertEqual(len(licencias), 3)
+        self.assertEqual(licencias[0][5:], ('30-05-2025', '01-06-2025'))
+        self.assertEqual(list(wb['Permisos Administrativos'].iter_rows(min_row=2, values_only=True))[0][3], 1.5)
+        # Usuario de la sesión + una consulta por pestaña
+        self.assertEqual(len(consultas_datos), 4)
+
+
+class CierreMensualDAEMTest(TestCase):
+    """Tests para el cierre mensual y la lectura de meses cerrados"""
+
+    def setUp(self):
+        self.a = crear_funcionario(1)
+        self.b = crear_funcionario(2)
+        SolicitudPermiso.objects.create(usuario=self.a, fecha_inicio=date(2025, 3, 10), dias_solicitados=1.0, estado='APROBADO')
+        SolicitudPermiso.objects.create(usuario=self.a, fecha_inicio=date(2025, 3, 20), dias_solicitados=0.5, estado='APROBADO')
+        SolicitudPermiso.objects.create(usuario=self.b, fecha_inicio=date(2025, 3, 12), dias_solicitados=2.0, estado='RECHAZADO')
+        LicenciaMedica.objects.create(usuario=self.b, fecha_inicio=date(2025, 3, 30), dias=4)
+
+    def test_comando_guarda_resumen(self):
+        from django.core.management import call_command
+        from reportes.models import ResumenMensualDAEM
+
+        call_command('cerrar_mes', anio=2025, mes=3, stdout=io.StringIO())
+        resumen = {r.usuario_id: r for r in ResumenMensualDAEM.objects.filter(anio=2025, mes=3)}
+        self.assertEqual(len(resumen), 2)
+        self.assertEqual((resumen[self.a.pk].permisos, resumen[self.a.pk].dias_permiso), (2, 1.5))
+        self.assertEqual((resumen[self.b.pk].licencias, resumen[self.b.pk].dias_licencia), (1, 4))
+
+        with self.assertRaises(CommandError):
+            call_command('cerrar_mes', anio=2025, mes=3, stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            call_command('cerrar_mes', anio=2999, mes=1, stdout=io.StringIO())
+
+    def test_forzar_invalida_archivos_cacheados(self):
+        from django.core.management import call_command
+
+        filtros = FiltrosReporte(year='2025', mes='3')
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('cerrar_mes', anio=2025, mes=3, stdout=io.StringIO())
+        self.assertEqual(cachear_archivo('excel_daem', filtros, lambda: b'v1'), b'v1')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('cerrar_mes', anio=2025, mes=3, forzar=True, stdout=io.StringIO())
+        self.assertEqual(cachear_archivo('excel_daem', filtros, lambda: b'v2'), b'v2')
+
+    def test_mes_cerrado_se_lee_del_resumen(self):
+        en_vivo = filas_mensuales(2025, 3)
+        hojas_en_vivo = [list(h.filas) for h in hojas_daem('2025', '3')]
+        cerrar_mes(2025, 3)
+
+        # Cambios posteriores al cierre no alteran el mes cerrado
+        SolicitudPermiso.objects.create(usuario=self.b, fecha_inicio=date(2025, 3, 25), dias_solicitados=1.0, estado='APROBADO')
+
+        with CaptureQueriesContext(connection) as ctx:
+            hojas = [list(h.filas) for h in hojas_daem('2025', '3')]
+            cerrado = filas_mensuales(2025, 3)
+        tablas = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('permisos_solicitudpermiso', tablas)
+        self.assertNotIn('licencias_licenciamedica', tablas)
+        self.assertNotIn('JOIN', tablas)
+
+        self.assertEqual(hojas, hojas_en_vivo)
+        self.assertEqual(
+            [(f['run'], f['dias_solicitados'], f['fecha_desde']) for f in cerrado],
+            [(f['run'], f['dias_solicitados'], f['fecha_desde']) for f in en_vivo],
+        )
+        # El mes abierto sigue calculándose en vivo
+        self.assertEqual(len(filas_mensuales(2025, 4)), 0)
@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import ReportesView, PDFIndividualView, PDFColectivoView, ExportarExcelView, ReporteMensualDiasAdministrativosView, ExportarDAEMExcelView
+from .views import ReportesView, PDFIndividualView, PDFColectivoView, PDFIndividualesZipView, ExportarExcelView, ReporteMensualDiasAdministrativosView, ExportarDAEMExcelView
 
 urlpatterns = [
     path('', ReportesView.as_view(), name='reportes'),
     path('pdf/individual/<int:usuario_id>/', PDFIndividualView.as_view(), name='reportes_pdf_individual'),
+    path('pdf/individuales/', PDFIndividualesZipView.as_view(), name='reportes_pdf_individuales_zip'),
     path('pdf/colectivo/', PDFColectivoView.as_view(), name='reportes_pdf_colectivo'),
     path('pdf/mensual/dias-administrativos/', ReporteMensualDiasAdministrativosView.as_view(), name='reportes_mensual_dias_administrativos'),
     path('excel/', ExportarExcelView.as_view(), name='reportes_excel'),
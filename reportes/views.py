@@ -1,17 +1,23 @@
 from django.views.generic import TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Sum, Q
 from django.http import HttpResponse
+from django.shortcuts import redirect
+from django.core.cache import cache
 from django.template.loader import render_to_string
-from weasyprint import HTML
-from permisos.models import SolicitudPermiso
-from licencias.models import LicenciaMedica
-from users.models import CustomUser
 from core.services import BusinessDayCalculator
-import openpyxl
+from core.pdf import render_pdf, submit_pdf_job
+from core.jobs import submit_job
+from core.excel import libro_bytes, respuesta_excel
+from .services import (
+    FiltrosReporte, obtener_reporte, obtener_detalles, anios_disponibles, nombre_mes, cachear_archivo, clave_archivo,
+    html_individual, generar_zip_individuales, hoja_reporte_detallado, hojas_daem,
+    filas_mensuales,
+)
 from datetime import datetime
 from django.utils.timezone import now
 
+ROLES_REPORTES = ['DIRECTOR', 'SECRETARIA', 'ADMIN', 'DIRECTIVO']
+
 class ReportesView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     """Vista unificada y minimalista de reportes"""
     template_name = 'reportes/reportes.html'
@@ -23,107 +29,22 @@ class ReportesView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Obtener parámetros de filtro
-        search = self.request.GET.get('search', '')
-        year = self.request.GET.get('year', '')
-        mes = self.request.GET.get('mes', '')
-        fecha_inicio = self.request.GET.get('fecha_inicio', '')
-        fecha_fin = self.request.GET.get('fecha_fin', '')
-        sort_by = self.request.GET.get('sort', 'name')
-        
-        # Base queryset: incluir todos los funcionarios del sistema
-        funcionarios = CustomUser.objects.filter(role__in=['FUNCIONARIO', 'DIRECTOR', 'DIRECTIVO', 'SECRETARIA', 'ADMIN'])
-        
-        # Filtro de búsqueda por nombre o RUN
-        if search:
-            funcionarios = funcionarios.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(run__icontains=search)
-            )
-        
-        # Preparar datos de cada funcionario
-        empleados_data = []
-        for functorio in funcionarios:
-            # Obtener permisos aprobados
-            permisos = SolicitudPermiso.objects.filter(
-                usuario=functorio,
-                estado='APROBADO'
-            )
-            
-            # Aplicar filtros de fecha/año
-            if year:
-                permisos = permisos.filter(fecha_inicio__year=year)
-            if mes:
-                permisos = permisos.filter(fecha_inicio__month=mes)
-            if fecha_inicio:
-                permisos = permisos.filter(fecha_inicio__gte=fecha_inicio)
-            if fecha_fin:
-                permisos = permisos.filter(fecha_inicio__lte=fecha_fin)
-            
-            dias_usados = permisos.aggregate(Sum('dias_solicitados'))['dias_solicitados__sum'] or 0
-            
-            # Obtener licencias médicas
-            licencias = LicenciaMedica.objects.filter(usuario=functorio)
-            
-            if year:
-                licencias = licencias.filter(fecha_inicio__year=year)
-            if mes:
-                licencias = licencias.filter(fecha_inicio__month=mes)
-            if fecha_inicio:
-                licencias = licencias.filter(fecha_inicio__gte=fecha_inicio)
-            if fecha_fin:
-                licencias = licencias.filter(fecha_inicio__lte=fecha_fin)
-            
-            total_licencias = licencias.count()
-            dias_licencias = licencias.aggregate(Sum('dias'))['dias__sum'] or 0
-            
-            empleados_data.append({
-                'funcionario': functorio,
-                'dias_disponibles': functorio.dias_disponibles,
-                'dias_usados': dias_usados,
-                'total_licencias': total_licencias,
-                'dias_licencias': dias_licencias,
-            })
-        
-        # Aplicar ordenamiento
-        if sort_by == 'name':
-            empleados_data.sort(key=lambda x: (x['funcionario'].first_name, x['funcionario'].last_name))
-        elif sort_by == 'name_desc':
-            empleados_data.sort(key=lambda x: (x['funcionario'].first_name, x['funcionario'].last_name), reverse=True)
-        elif sort_by == 'dias':
-            empleados_data.sort(key=lambda x: x['dias_disponibles'], reverse=True)
-        elif sort_by == 'dias_asc':
-            empleados_data.sort(key=lambda x: x['dias_disponibles'])
-        elif sort_by == 'dias_usados':
-            empleados_data.sort(key=lambda x: x['dias_usados'], reverse=True)
-        elif sort_by == 'dias_usados_asc':
-            empleados_data.sort(key=lambda x: x['dias_usados'])
-        elif sort_by == 'licencias':
-            empleados_data.sort(key=lambda x: x['total_licencias'], reverse=True)
-        elif sort_by == 'licencias_asc':
-            empleados_data.sort(key=lambda x: x['total_licencias'])
-        elif sort_by == 'dias_licencias':
-            empleados_data.sort(key=lambda x: x['dias_licencias'], reverse=True)
-        elif sort_by == 'dias_licencias_asc':
-            empleados_data.sort(key=lambda x: x['dias_licencias'])
+        filtros = FiltrosReporte.from_request(self.request, ordenable=True)
         
-        context['empleados_data'] = empleados_data
+        # Totales por funcionario calculados y ordenados en una sola consulta (memoizada)
+        context['empleados_data'] = obtener_reporte(filtros)
         context['filtros'] = {
-            'search': search,
-            'year': year,
-            'mes': mes,
-            'fecha_inicio': fecha_inicio,
-            'fecha_fin': fecha_fin,
+            'search': filtros.search,
+            'year': filtros.year,
+            'mes': filtros.mes,
+            'fecha_inicio': filtros.fecha_inicio,
+            'fecha_fin': filtros.fecha_fin,
         }
         
         # Años disponibles para filtro
-        from datetime import datetime
-        permisos_years = set(SolicitudPermiso.objects.dates('fecha_inicio', 'year').values_list('fecha_inicio', flat=True))
-        licencias_years = set(LicenciaMedica.objects.dates('fecha_inicio', 'year').values_list('fecha_inicio', flat=True))
-        all_years = sorted(set([d.year for d in permisos_years] + [d.year for d in licencias_years]), reverse=True)
+        all_years = anios_disponibles()
         context['years'] = all_years if all_years else [datetime.now().year]
-        context['current_sort'] = sort_by
+        context['current_sort'] = filtros.sort
         
         return context
 
@@ -135,69 +56,36 @@ class PDFIndividualView(LoginRequiredMixin, UserPassesTestMixin, View):
         return self.request.user.role in ['DIRECTOR', 'SECRETARIA', 'ADMIN', 'DIRECTIVO']
 
     def get(self, request, usuario_id):
-        try:
-            functorio = CustomUser.objects.get(pk=usuario_id)
-        except CustomUser.DoesNotExist:
+        filtros = FiltrosReporte.from_request(request)
+        detalle = obtener_detalles(filtros, [usuario_id]).get(usuario_id)
+        if detalle is None:
             return HttpResponse("Funcionario no encontrado", status=404)
         
-        # Obtener parámetros de filtro
-        year = request.GET.get('year', '')
-        mes = request.GET.get('mes', '')
-        fecha_inicio = request.GET.get('fecha_inicio', '')
-        fecha_fin = request.GET.get('fecha_fin', '')
-        
-        # Obtener permisos
-        permisos = SolicitudPermiso.objects.filter(
-            usuario=functorio,
-            estado='APROBADO'
-        ).order_by('-fecha_inicio')
-        
-        if year:
-            permisos = permisos.filter(fecha_inicio__year=year)
-        if mes:
-            permisos = permisos.filter(fecha_inicio__month=mes)
-        if fecha_inicio:
-            permisos = permisos.filter(fecha_inicio__gte=fecha_inicio)
-        if fecha_fin:
-            permisos = permisos.filter(fecha_inicio__lte=fecha_fin)
-        
-        dias_usados = permisos.aggregate(Sum('dias_solicitados'))['dias_solicitados__sum'] or 0
-        
-        # Obtener licencias
-        licencias = LicenciaMedica.objects.filter(usuario=functorio).order_by('-fecha_inicio')
-        
-        if year:
-            licencias = licencias.filter(fecha_inicio__year=year)
-        if mes:
-            licencias = licencias.filter(fecha_inicio__month=mes)
-        if fecha_inicio:
-            licencias = licencias.filter(fecha_inicio__gte=fecha_inicio)
-        if fecha_fin:
-            licencias = licencias.filter(fecha_inicio__lte=fecha_fin)
-        
-        html_string = render_to_string('reportes/pdf_individual.html', {
-            'functorio': functorio,
-            'permisos': permisos,
-            'licencias': licencias,
-            'dias_usados': dias_usados,
-            'total_dias_licencias': licencias.aggregate(Sum('dias'))['dias__sum'] or 0,
-            'year': year,
-            'mes': mes,
-            'mes_nombre': {1: 'Enero', 2: 'Febrero', 3: 'Marzo', 4: 'Abril', 5: 'Mayo', 6: 'Junio', 7: 'Julio', 8: 'Agosto', 9: 'Septiembre', 10: 'Octubre', 11: 'Noviembre', 12: 'Diciembre'}.get(int(mes) if mes else 0, ''),
-            'fecha_inicio': fecha_inicio,
-            'fecha_fin': fecha_fin,
-            'fecha_exportacion': now().strftime('%d/%m/%Y %H:%M'),
-            'director': CustomUser.objects.filter(role='DIRECTOR').first(),
-        })
-
-        html = HTML(string=html_string)
-        result = html.write_pdf()
+        result = cachear_archivo('pdf_individual', filtros, lambda: self.generar_pdf(filtros, detalle), usuario_id)
 
         response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'inline; filename=reporte_{functorio.run}.pdf'
+        response['Content-Disposition'] = f'inline; filename=reporte_{detalle.funcionario.run}.pdf'
         response.write(result)
         return response
 
+    def generar_pdf(self, filtros, detalle):
+        return render_pdf(html_individual(filtros, detalle))
+
+
+class PDFIndividualesZipView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Generar en segundo plano un ZIP con el Pdf individual de cada empleado"""
+
+    def test_func(self):
+        return self.request.user.role in ROLES_REPORTES
+
+    def get(self, request):
+        filtros = FiltrosReporte.from_request(request)
+        job_id = submit_job(
+            'zip_individuales', generar_zip_individuales, filtros,
+            owner=request.user, roles=ROLES_REPORTES,
+        )
+        return redirect('job_wait', job_id=job_id)
+
 
 class PDFColectivoView(LoginRequiredMixin, UserPassesTestMixin, View):
     """Generar Pdf de todos los empleados filtrados"""
@@ -206,84 +94,44 @@ class PDFColectivoView(LoginRequiredMixin, UserPassesTestMixin, View):
         return self.request.user.role in ['DIRECTOR', 'SECRETARIA', 'ADMIN', 'DIRECTIVO']
 
     def get(self, request):
-        # Obtener parámetros de filtro
-        search = request.GET.get('search', '')
-        year = request.GET.get('year', '')
-        mes = request.GET.get('mes', '')
-        fecha_inicio = request.GET.get('fecha_inicio', '')
-        fecha_fin = request.GET.get('fecha_fin', '')
-        
-        # Filtrar funcionarios - EXCLUIR ADMIN
-        funcionarios = CustomUser.objects.filter(role__in=['FUNCIONARIO', 'DIRECTOR', 'DIRECTIVO', 'SECRETARIA'])
-        if search:
-            funcionarios = funcionarios.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(run__icontains=search)
+        filtros = FiltrosReporte.from_request(request)
+        cache_key = clave_archivo('pdf_colectivo', filtros)
+        result = cache.get(cache_key)
+
+        if result is None:
+            # El reporte colectivo puede tardar: se genera en segundo plano y
+            # la página de espera abre el PDF cuando está listo
+            job_id = submit_pdf_job(
+                lambda: self.generar_html(filtros),
+                'reporte_colectivo.pdf',
+                owner=request.user,
+                roles=ROLES_REPORTES,
+                cache_key=cache_key,
             )
-        
-        # Preparar datos
-        empleados_data = []
-        total_dias_disponibles = 0
-        total_licencias = 0
-        
-        for functorio in funcionarios.order_by('first_name', 'last_name'):
-            permisos = SolicitudPermiso.objects.filter(usuario=functorio, estado='APROBADO')
-            if year:
-                permisos = permisos.filter(fecha_inicio__year=year)
-            if mes:
-                permisos = permisos.filter(fecha_inicio__month=mes)
-            if fecha_inicio:
-                permisos = permisos.filter(fecha_inicio__gte=fecha_inicio)
-            if fecha_fin:
-                permisos = permisos.filter(fecha_inicio__lte=fecha_fin)
-            
-            licencias = LicenciaMedica.objects.filter(usuario=functorio)
-            if year:
-                licencias = licencias.filter(fecha_inicio__year=year)
-            if mes:
-                licencias = licencias.filter(fecha_inicio__month=mes)
-            if fecha_inicio:
-                licencias = licencias.filter(fecha_inicio__gte=fecha_inicio)
-            if fecha_fin:
-                licencias = licencias.filter(fecha_inicio__lte=fecha_fin)
-            
-            dias_usados = permisos.aggregate(Sum('dias_solicitados'))['dias_solicitados__sum'] or 0
-            dias_lic = licencias.aggregate(Sum('dias'))['dias__sum'] or 0
-            total_lic = licencias.count()
-            
-            total_dias_disponibles += float(functorio.dias_disponibles)
-            total_licencias += total_lic
-            
-            empleados_data.append({
-                'funcionario': functorio,
-                'dias_disponibles': functorio.dias_disponibles,
-                'dias_usados': dias_usados,
-                'total_licencias': total_lic,
-                'dias_licencias': dias_lic,
-            })
+            return redirect('job_wait', job_id=job_id)
+
+        response = HttpResponse(content_type='application/pdf')
+        response['Content-Disposition'] = 'inline; filename=reporte_colectivo.pdf'
+        response.write(result)
+        return response
+
+    def generar_html(self, filtros):
+        # Mismo conjunto de datos que la vista HTML - EXCLUIR ADMIN
+        empleados_data = [fila for fila in obtener_reporte(filtros) if fila.funcionario.role != 'ADMIN']
         
         html_string = render_to_string('reportes/pdf_colectivo.html', {
             'empleados_data': empleados_data,
-            'year': year,
-            'mes': mes,
-            'mes_nombre': {1: 'Enero', 2: 'Febrero', 3: 'Marzo', 4: 'Abril', 5: 'Mayo', 6: 'Junio', 7: 'Julio', 8: 'Agosto', 9: 'Septiembre', 10: 'Octubre', 11: 'Noviembre', 12: 'Diciembre'}.get(mes, ''),
-            'fecha_inicio': fecha_inicio,
-            'fecha_fin': fecha_fin,
+            'year': filtros.year,
+            'mes': filtros.mes,
+            'mes_nombre': nombre_mes(filtros.mes),
+            'fecha_inicio': filtros.fecha_inicio,
+            'fecha_fin': filtros.fecha_fin,
             'total_funcionarios': len(empleados_data),
-            'total_dias_disponibles': total_dias_disponibles,
-            'total_licencias': total_licencias,
+            'total_dias_disponibles': sum(float(fila.dias_disponibles) for fila in empleados_data),
+            'total_licencias': sum(fila.total_licencias for fila in empleados_data),
             'fecha_exportacion': now().strftime('%d/%m/%Y %H:%M'),
-            'director': CustomUser.objects.filter(role='DIRECTOR').first(),
         })
-
-        html = HTML(string=html_string)
-        result = html.write_pdf()
-
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = 'inline; filename=reporte_colectivo.pdf'
-        response.write(result)
-        return response
+        return html_string
 
 
 class ExportarExcelView(LoginRequiredMixin, UserPassesTestMixin, View):
@@ -293,69 +141,16 @@ class ExportarExcelView(LoginRequiredMixin, UserPassesTestMixin, View):
         return self.request.user.role in ['DIRECTOR', 'SECRETARIA', 'ADMIN', 'DIRECTIVO']
 
     def get(self, request):
-        # Obtener parámetros de filtro
-        search = request.GET.get('search', '')
-        year = request.GET.get('year', '')
-        mes = request.GET.get('mes', '')
-        fecha_inicio = request.GET.get('fecha_inicio', '')
-        fecha_fin = request.GET.get('fecha_fin', '')
-        
-        # Filtrar funcionarios
-        funcionarios = CustomUser.objects.filter(role__in=['FUNCIONARIO', 'DIRECTOR', 'DIRECTIVO', 'SECRETARIA', 'ADMIN'])
-        if search:
-            funcionarios = funcionarios.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(run__icontains=search)
-            )
-        
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Reporte Detallado"
-        
-        # Encabezados
-        ws.append(['Nombre', 'RUN', 'Rol', 'Días Disponibles', 'Días Usados', 'Días Licencia', 'Total Licencias'])
+        filtros = FiltrosReporte.from_request(request)
+        contenido = cachear_archivo('excel', filtros, lambda: self.generar_excel(filtros))
         
-        # Preparar datos
-        for functorio in funcionarios.order_by('first_name', 'last_name'):
-            permisos = SolicitudPermiso.objects.filter(usuario=functorio, estado='APROBADO')
-            if year:
-                permisos = permisos.filter(fecha_inicio__year=year)
-            if mes:
-                permisos = permisos.filter(fecha_inicio__month=mes)
-            if fecha_inicio:
-                permisos = permisos.filter(fecha_inicio__gte=fecha_inicio)
-            if fecha_fin:
-                permisos = permisos.filter(fecha_inicio__lte=fecha_fin)
-            
-            licencias = LicenciaMedica.objects.filter(usuario=functorio)
-            if year:
-                licencias = licencias.filter(fecha_inicio__year=year)
-            if mes:
-                licencias = licencias.filter(fecha_inicio__month=mes)
-            if fecha_inicio:
-                licencias = licencias.filter(fecha_inicio__gte=fecha_inicio)
-            if fecha_fin:
-                licencias = licencias.filter(fecha_inicio__lte=fecha_fin)
-            
-            dias_usados = permisos.aggregate(Sum('dias_solicitados'))['dias_solicitados__sum'] or 0
-            dias_licencia = licencias.aggregate(Sum('dias'))['dias__sum'] or 0
-            
-            ws.append([
-                functorio.get_full_name(),
-                functorio.run,
-                functorio.get_role_display(),
-                functorio.dias_disponibles,
-                dias_usados,
-                dias_licencia,
-                licencias.count()
-            ])
-        
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        response = HttpResponse(contenido, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
         response['Content-Disposition'] = 'attachment; filename=reporte_detallado.xlsx'
-        wb.save(response)
         return response
 
+    def generar_excel(self, filtros):
+        return libro_bytes([hoja_reporte_detallado(filtros)])
+
 class ReporteMensualDiasAdministrativosView(LoginRequiredMixin, UserPassesTestMixin, View):
     """Generar Pdf mensual de resumen de días administrativos"""
     
@@ -374,48 +169,31 @@ class ReporteMensualDiasAdministrativosView(LoginRequiredMixin, UserPassesTestMi
             year = datetime.now().year
             mes = datetime.now().month
         
-        # Obtener todos los permisos aprobados del mes
-        permisos = SolicitudPermiso.objects.filter(
-            estado='APROBADO',
-            fecha_inicio__year=year,
-            fecha_inicio__month=mes
-        ).select_related('usuario').order_by('created_at', 'fecha_inicio')
-        
-        # Preparar datos para el reporte - cada permiso es una fila
-        empleados_data = []
-        
-        for permiso in permisos:
-            empleados_data.append({
-                'funcionario': permiso.usuario,
-                'run': permiso.usuario.run,
-                'nombre_completo': permiso.usuario.get_full_name() or permiso.usuario.username,
-                'dias_solicitados': permiso.dias_solicitados,
-                'dias_disponibles': permiso.usuario.dias_disponibles if permiso.usuario.dias_disponibles else 0,
-                'fecha_desde': permiso.fecha_inicio,
-                'fecha_hasta': permiso.fecha_termino,
-                'fecha_solicitud': permiso.created_at,
-            })
+        filtros = FiltrosReporte(year=str(year), mes=str(mes))
+        result = cachear_archivo('pdf_mensual', filtros, lambda: self.generar_pdf(year, mes))
+
+        response = HttpResponse(content_type='application/pdf')
+        response['Content-Disposition'] = f'inline; filename=reporte_dias_administrativos_{year}_{mes:02d}.pdf'
+        response.write(result)
+        return response
+
+    def generar_pdf(self, year, mes):
+        # Un elemento por permiso aprobado del mes (desde el cierre si el mes está cerrado)
+        empleados_data = filas_mensuales(year, mes)
         
         # Generar Pdf
         html_string = render_to_string('reportes/reporte_mensual_dias_administrativos.html', {
             'empleados_data': empleados_data,
             'year': year,
             'mes': mes,
-            'mes_nombre': {1: 'Enero', 2: 'Febrero', 3: 'Marzo', 4: 'Abril', 5: 'Mayo', 6: 'Junio', 7: 'Julio', 8: 'Agosto', 9: 'Septiembre', 10: 'Octubre', 11: 'Noviembre', 12: 'Diciembre'}.get(mes, ''),
+            'mes_nombre': nombre_mes(mes),
             'total_funcionarios': len(empleados_data),
             'total_dias': sum(e['dias_solicitados'] for e in empleados_data),
             'fecha_exportacion': now().strftime('%d/%m/%Y %H:%M'),
-            'director': CustomUser.objects.filter(role='DIRECTOR').first(),
             'establecimiento': 'Dirección de Educación Municipal Los Lagos',
         })
 
-        html = HTML(string=html_string)
-        result = html.write_pdf()
-
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'inline; filename=reporte_dias_administrativos_{year}_{mes:02d}.pdf'
-        response.write(result)
-        return response
+        return render_pdf(html_string)
 
 class ExportarDAEMExcelView(LoginRequiredMixin, UserPassesTestMixin, View):
     """Exportar reporte DAEM a Excel (Multi-pestaña)"""
@@ -427,88 +205,9 @@ class ExportarDAEMExcelView(LoginRequiredMixin, UserPassesTestMixin, View):
         year = request.GET.get('year', '')
         mes = request.GET.get('mes', '')
         
-        wb = openpyxl.Workbook()
-        
-        # Pestaña 1: Nómina
-        ws_nomina = wb.active
-        ws_nomina.title = "Nómina"
-        ws_nomina.append(['N°', 'Funcionario', 'RUN', 'Cargo'])
-        for col in ['A']:
-            ws_nomina.column_dimensions[col].width = 10
-        for col in ['B', 'C', 'D']:
-            ws_nomina.column_dimensions[col].width = 30
-
-        funcionarios = CustomUser.objects.filter(role__in=['FUNCIONARIO', 'DIRECTOR', 'DIRECTIVO', 'SECRETARIA', 'ADMIN']).order_by('first_name', 'last_name')
-        for i, f in enumerate(funcionarios, 1):
-            ws_nomina.append([i, f.get_full_name() or f.username, f.run, f.get_funcion_display() or ""])
-            
-        # Pestaña 2: Permisos Administrativos
-        ws_permisos = wb.create_sheet(title="Permisos Administrativos")
-        ws_permisos.append(['N°', 'Funcionario', 'RUN', 'Días Solicitados', 'Fecha Desde', 'Fecha Hasta', 'Fecha Solicitud'])
-        for col in ['A']:
-            ws_permisos.column_dimensions[col].width = 10
-        for col in ['B', 'C', 'D', 'E', 'F', 'G']:
-            ws_permisos.column_dimensions[col].width = 25
-
-        permisos = SolicitudPermiso.objects.filter(estado='APROBADO', usuario__in=funcionarios).select_related('usuario').order_by('usuario__first_name', 'usuario__last_name', 'fecha_inicio')
-        if year:
-            permisos = permisos.filter(fecha_inicio__year=year)
-        if mes:
-            permisos = permisos.filter(fecha_inicio__month=mes)
-            
-        for i, p in enumerate(permisos, 1):
-            ws_permisos.append([
-                i,
-                p.usuario.get_full_name() or p.usuario.username,
-                p.usuario.run,
-                float(p.dias_solicitados),
-                p.fecha_inicio.strftime("%d-%m-%Y") if p.fecha_inicio else "",
-                p.fecha_termino.strftime("%d-%m-%Y") if p.fecha_termino else "",
-                p.created_at.strftime("%d-%m-%Y") if p.created_at else ""
-            ])
-
-        # Pestaña 3: Licencias Médicas
-        ws_licencias = wb.create_sheet(title="Licencias Médicas")
-        ws_licencias.append(['N°', 'Funcionario', 'RUN', 'Tipo de Licencia', 'Días', 'Fecha Desde', 'Fecha Hasta'])
-        for col in ['A']:
-            ws_licencias.column_dimensions[col].width = 10
-        for col in ['B', 'C', 'D', 'E', 'F', 'G']:
-            ws_licencias.column_dimensions[col].width = 25
-
-        licencias = LicenciaMedica.objects.filter(usuario__in=funcionarios).select_related('usuario').order_by('usuario__first_name', 'usuario__last_name', 'fecha_inicio')
-        if year:
-            licencias = licencias.filter(fecha_inicio__year=year)
-        if mes:
-            licencias = licencias.filter(fecha_inicio__month=mes)
-            
-        for i, lic in enumerate(licencias, 1):
-            ws_licencias.append([
-                i,
-                lic.usuario.get_full_name() or lic.usuario.username,
-                lic.usuario.run,
-                lic.get_tipo_licencia_display(),
-                lic.dias,
-                lic.fecha_inicio.strftime("%d-%m-%Y") if lic.fecha_inicio else "",
-                lic.fecha_termino.strftime("%d-%m-%Y") if lic.fecha_termino else ""
-            ])
-
-        # Pestañas estilo (Header en negrita)
-        from openpyxl.styles import Font, PatternFill
-        header_font = Font(bold=True, color="FFFFFF")
-        fill = PatternFill(start_color="4F46E5", end_color="4F46E5", fill_type="solid")
-        
-        for ws in [ws_nomina, ws_permisos, ws_licencias]:
-            for cell in ws[1]:
-                cell.font = header_font
-                cell.fill = fill
-
-        # Generar archivo
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
         filename = f"reporte_daem"
         if mes and year:
             filename += f"_{mes}_{year}"
         elif year:
             filename += f"_{year}"
-        response['Content-Disposition'] = f'attachment; filename={filename}.xlsx'
-        wb.save(response)
-        return response
+        return respuesta_excel(hojas_daem(year, mes), f'{filename}.xlsx')
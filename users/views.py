@@ -12,16 +12,16 @@ from django.core.management import call_command
 from django import forms
 from .models import CustomUser
 from .forms import UserCreateForm, UserEditForm, BulkUserImportForm
-import openpyxl
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 import random
 import string
 from io import BytesIO
 
+from core.lazy import importar_diferido
 from core.security import audit_log
 from admin_dashboard.utils import registrar_log, get_client_ip
 
+openpyxl = importar_diferido('openpyxl')
+
 from django.db.models import Q
 
 class UserListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
@@ -270,7 +270,7 @@ class BulkUserImportView(LoginRequiredMixin, UserPassesTestMixin, FormView):
 
 def download_template(request):
     """Generar y descargar plantilla Excel para importación"""
-    wb = Workbook()
+    wb = openpyxl.Workbook()
     ws = wb.active
     ws.title = "Usuarios"
     